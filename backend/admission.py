@@ -0,0 +1,227 @@
+import asyncio
+import math
+import re
+import time
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, Optional
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from config import settings
+
+# Admission control in front of the /api routes. Once the threadpool behind the sync
+# routes is saturated, every extra request only waits longer for a thread, until the
+# gateway times it out after the work has been done anyway. Here each route class
+# (reads, writes, bulk imports and exports) gets its own concurrency limit, so a burst of
+# one class cannot starve the others, and a short bounded queue in front of it. A request
+# that finds the queue full, or waits past its deadline, is answered 503 with a
+# Retry-After straight away, so the requests that are admitted still finish in time.
+#
+# The limit of a class adapts to the latency its requests see (AIMD): when a request
+# takes longer than the class's latency target the limit is cut by a tenth, at most once
+# per target interval, since the requests already running were admitted under the old
+# limit; while requests are fast and the limit is fully used it grows by about one per
+# limit's worth of requests, back up to the configured maximum.
+
+BACKOFF = 0.9
+# Retry-After for a shed request: the estimated time to drain the queue, within bounds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 30
+
+BULK_POSTS = re.compile(r"^/api/(?:events|offers|event-offers)/bulk$")
+EXPORT_PATHS = re.compile(r"^/api/export/[^/]+$")
+# POST only because the ids do not fit a URL
+READ_POSTS = re.compile(r"^/api/(?:events|offers)/batch$")
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+SHED_BODY = b'{"detail":"Server is overloaded, retry later"}'
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """read, write or bulk; None for requests that are always let through (/health,
+    /metrics, the docs and long-lived streams)."""
+    if not path.startswith("/api/") or path in settings.admission_exempt_paths:
+        return None
+    if (method == "POST" and BULK_POSTS.match(path)) or EXPORT_PATHS.match(path):
+        return "bulk"
+    if method in READ_METHODS or (method == "POST" and READ_POSTS.match(path)):
+        return "read"
+    return "write"
+
+
+class AdaptiveLimiter:
+    """Concurrency limit with a bounded, deadline-bound wait queue for one route class.
+    Not thread-safe: acquire and release are called from the event loop."""
+
+    def __init__(
+        self,
+        name: str,
+        max_limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        latency_target: float,
+        min_limit: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.clock = clock
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.latency = 0.0  # moving average of admitted requests
+        self._last_decrease = float("-inf")
+        self.counters = Counter()
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if need be; False means shed the request."""
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+            return True
+        if len(self.waiters) >= self.queue_size:
+            self.counters["shed_queue_full"] += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.counters["queued"] += 1
+        try:
+            # A slot is handed over by release(), already counted in in_flight
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counters["shed_timeout"] += 1
+            return False
+        except asyncio.CancelledError:
+            # The client went away; a slot handed over in the meantime goes to the next one
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._admit_waiters()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                self._discard(waiter)
+        self.counters["admitted"] += 1
+        return True
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, latency: float) -> None:
+        self.in_flight -= 1
+        self._observe(latency)
+        self._admit_waiters()
+
+    def _admit_waiters(self) -> None:
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+
+    def _observe(self, latency: float) -> None:
+        self.latency = latency if not self.latency else 0.9 * self.latency + 0.1 * latency
+        if latency > self.latency_target:
+            now = self.clock()
+            if now - self._last_decrease >= self.latency_target and self.limit > self.min_limit:
+                self.limit = max(float(self.min_limit), self.limit * BACKOFF)
+                self._last_decrease = now
+                self.counters["decreased"] += 1
+        elif self.in_flight + 1 >= int(self.limit) and self.limit < self.max_limit:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self.counters["increased"] += 1
+
+    def retry_after(self) -> int:
+        drain = (self.latency or self.latency_target) * (len(self.waiters) + 1) / max(1, int(self.limit))
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(drain)))
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit), "max_limit": self.max_limit, "in_flight": self.in_flight, "waiting": len(self.waiters),
+            "latency_ms": round(self.latency * 1000, 2),
+            **{key: self.counters[key] for key in ("admitted", "queued", "shed_queue_full", "shed_timeout", "decreased", "increased")},
+        }
+
+
+class AdmissionController:
+    def __init__(self, limiters: Dict[str, AdaptiveLimiter]):
+        self.limiters = limiters
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        return cls({
+            name: AdaptiveLimiter(
+                name, limit, settings.admission_queue_size[name], settings.admission_queue_timeout_seconds[name],
+                settings.admission_latency_target_seconds[name],
+            )
+            for name, limit in settings.admission_max_concurrency.items()
+        })
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+class AdmissionMiddleware:
+    """Plain ASGI middleware, like metrics.MetricsMiddleware. Runs before routing, so
+    requests are classed by method and path."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http":
+            name = route_class(scope["method"], scope["path"])
+            limiter = self.controller.limiters.get(name) if name is not None else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        if not await limiter.acquire():
+            await send({
+                "type": "http.response.start", "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"), (b"content-length", str(len(SHED_BODY)).encode()),
+                    (b"retry-after", str(limiter.retry_after()).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": SHED_BODY})
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - started)
+
+
+class AdmissionCollector:
+    """Limits, queue depth and shed counts per route class, for /metrics."""
+
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+
+    def collect(self):
+        limit = GaugeMetricFamily("admission_limit", "Current concurrency limit", labels=["class"])
+        in_flight = GaugeMetricFamily("admission_in_flight", "Admitted requests being served", labels=["class"])
+        queued = GaugeMetricFamily("admission_queued", "Requests waiting for admission", labels=["class"])
+        shed = CounterMetricFamily("admission_shed", "Requests answered 503 without being served", labels=["class", "reason"])
+        for name, limiter in self.controller.limiters.items():
+            limit.add_metric([name], int(limiter.limit))
+            in_flight.add_metric([name], limiter.in_flight)
+            queued.add_metric([name], len(limiter.waiters))
+            shed.add_metric([name, "queue_full"], limiter.counters["shed_queue_full"])
+            shed.add_metric([name, "timeout"], limiter.counters["shed_timeout"])
+        yield from (limit, in_flight, queued, shed)
+
+
+admission_controller = AdmissionController.from_settings()
+REGISTRY.register(AdmissionCollector(admission_controller))
+
+
+def install(app: FastAPI, controller: AdmissionController = admission_controller) -> None:
+    app.add_middleware(AdmissionMiddleware, controller=controller)
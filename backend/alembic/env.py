@@ -12,6 +12,10 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from database import Base
 from models.event_offer import Event, Offer, event_offer_association
+from models.occurrence import EventOccurrence, OccurrenceAction
+from models.change import EntityChange
+from models.outbox import OutboxMessage
+from models.search import search_table
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -26,6 +30,14 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+# The FTS5 search tables and their shadow tables come from models/search.py, not the
+# metadata, so autogenerate must not propose dropping them
+SEARCH_TABLES = tuple(search_table(name) for name in ("events", "offers"))
+
+
+def include_name(name, type_, parent_names):
+    return type_ != "table" or not name.startswith(SEARCH_TABLES)
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -48,6 +60,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -63,6 +76,12 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # The app's startup (lifecycle.upgrade_schema) hands over its own connection
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations_on(connection)
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -70,12 +89,16 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
+        run_migrations_on(connection)
+
 
-        with context.begin_transaction():
-            context.run_migrations()
+def run_migrations_on(connection) -> None:
+    context.configure(
+        connection=connection, target_metadata=target_metadata, include_name=include_name
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,57 @@
+"""Add event_occurrences and occurrence_actions tables
+
+Revision ID: 5c2e8f41a7b3
+Revises: d12ef65d99b6
+Create Date: 2026-10-18 10:12:40.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8f41a7b3'
+down_revision: Union[str, Sequence[str], None] = 'd12ef65d99b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('event_occurrences',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('event_id', sa.String(), nullable=False),
+        sa.Column('event_code', sa.String(), nullable=False),
+        sa.Column('queue_name', sa.String(), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_event_occurrences_event_id'), 'event_occurrences', ['event_id'], unique=False)
+
+    op.create_table('occurrence_actions',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('occurrence_id', sa.String(), nullable=False),
+        sa.Column('offer_id', sa.String(), nullable=False),
+        sa.Column('action_type', sa.String(), nullable=False),
+        sa.Column('target_system', sa.String(), nullable=False),
+        sa.Column('due_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['occurrence_id'], ['event_occurrences.id'], ),
+        sa.ForeignKeyConstraint(['offer_id'], ['offers.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_occurrence_actions_occurrence_id'), 'occurrence_actions', ['occurrence_id'], unique=False)
+    op.create_index(op.f('ix_occurrence_actions_due_at'), 'occurrence_actions', ['due_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_occurrence_actions_due_at'), table_name='occurrence_actions')
+    op.drop_index(op.f('ix_occurrence_actions_occurrence_id'), table_name='occurrence_actions')
+    op.drop_table('occurrence_actions')
+    op.drop_index(op.f('ix_event_occurrences_event_id'), table_name='event_occurrences')
+    op.drop_table('event_occurrences')
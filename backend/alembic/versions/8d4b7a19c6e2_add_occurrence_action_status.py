@@ -0,0 +1,34 @@
+"""Track scheduler state on occurrence_actions
+
+Revision ID: 8d4b7a19c6e2
+Revises: 5c2e8f41a7b3
+Create Date: 2026-10-18 11:03:12.470921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4b7a19c6e2'
+down_revision: Union[str, Sequence[str], None] = '5c2e8f41a7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('occurrence_actions') as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(), server_default='pending', nullable=False))
+        batch_op.add_column(sa.Column('fired_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_occurrence_actions_status_due_at', ['status', 'due_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('occurrence_actions') as batch_op:
+        batch_op.drop_index('ix_occurrence_actions_status_due_at')
+        batch_op.drop_column('fired_at')
+        batch_op.drop_column('status')
@@ -0,0 +1,53 @@
+"""Add entity_changes log for the change feed
+
+Revision ID: a8c41e7f3d95
+Revises: f3b8d1a6c92e
+Create Date: 2026-10-18 21:14:03.552817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c41e7f3d95'
+down_revision: Union[str, Sequence[str], None] = 'f3b8d1a6c92e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# What already exists is the first change of every entity, so a sync from 0 returns it all
+BACKFILL = (
+    ("event", "SELECT id, '' FROM events ORDER BY id"),
+    ("offer", "SELECT id, '' FROM offers ORDER BY id"),
+    ("link", "SELECT event_id, offer_id FROM event_offer ORDER BY event_id, offer_id"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('entity_changes',
+    sa.Column('seq', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.String(), nullable=False),
+    sa.Column('linked_id', sa.String(), server_default='', nullable=False),
+    sa.Column('op', sa.String(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('seq'),
+    sqlite_autoincrement=True
+    )
+    op.create_index('ux_entity_changes_entity', 'entity_changes', ['kind', 'entity_id', 'linked_id'], unique=True)
+    op.create_index('ix_entity_changes_op_changed_at', 'entity_changes', ['op', 'changed_at'], unique=False)
+    for kind, source in BACKFILL:
+        op.execute(
+            f"INSERT INTO entity_changes (kind, entity_id, linked_id, op, changed_at) "
+            f"SELECT '{kind}', keys.*, 'upserted', CURRENT_TIMESTAMP FROM ({source}) AS keys"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_entity_changes_op_changed_at', table_name='entity_changes')
+    op.drop_index('ux_entity_changes_entity', table_name='entity_changes')
+    op.drop_table('entity_changes')
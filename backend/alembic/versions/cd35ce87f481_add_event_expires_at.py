@@ -0,0 +1,42 @@
+"""Add events.expires_at for the expiry sweeper
+
+Revision ID: cd35ce87f481
+Revises: a8c41e7f3d95
+Create Date: 2026-10-18 23:02:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd35ce87f481'
+down_revision: Union[str, Sequence[str], None] = 'a8c41e7f3d95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# created_at + lifetime_hours for the events that have a lifetime, as the write paths set
+# it; on SQLite in the text format SQLAlchemy stores DateTime in
+BACKFILL = {
+    "sqlite": "strftime('%Y-%m-%d %H:%M:%f000', created_at, '+' || lifetime_hours || ' hours')",
+    "postgresql": "created_at + make_interval(hours => lifetime_hours)",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('events', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_events_expires_at', 'events', ['expires_at'], unique=False,
+        sqlite_where=sa.text('expires_at IS NOT NULL'), postgresql_where=sa.text('expires_at IS NOT NULL'),
+    )
+    op.execute(f"UPDATE events SET expires_at = {BACKFILL[op.get_bind().dialect.name]} WHERE lifetime_hours > 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_events_expires_at', table_name='events')
+    # Not a batch (copy and swap) on SQLite, which would lose the search index triggers
+    op.drop_column('events', 'expires_at')
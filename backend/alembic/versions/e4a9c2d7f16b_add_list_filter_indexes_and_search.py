@@ -0,0 +1,58 @@
+"""Add list filter indexes and full-text search
+
+Revision ID: e4a9c2d7f16b
+Revises: b7e3c95d2f48
+Create Date: 2026-10-18 17:05:12.402911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c2d7f16b'
+down_revision: Union[str, Sequence[str], None] = 'b7e3c95d2f48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCHABLE = ('events', 'offers')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_events_queue_name_id', 'events', ['queue_name', 'id'], unique=False)
+    op.create_index('ix_events_disable_all_campaigns_id', 'events', ['disable_all_campaigns', 'id'], unique=False)
+    op.create_index('ix_events_lifetime_hours_id', 'events', ['lifetime_hours', 'id'], unique=False)
+    op.create_index('ix_offers_target_system_id', 'offers', ['target_system', 'id'], unique=False)
+    op.create_index('ix_offers_target_system_priority_id', 'offers', ['target_system', 'priority', 'id'], unique=False)
+    op.create_index('ix_offers_priority_id', 'offers', ['priority', 'id'], unique=False)
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # FTS5 external-content tables over name/description, kept in sync by triggers
+    for table in SEARCHABLE:
+        fts = f'{table}_fts'
+        insert_new = f"INSERT INTO {fts}(rowid, name, description) VALUES (new.rowid, new.name, new.description);"
+        delete_old = f"INSERT INTO {fts}({fts}, rowid, name, description) VALUES ('delete', old.rowid, old.name, old.description);"
+        op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5(name, description, content='{table}', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')")
+        op.execute(f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN {insert_new} END")
+        op.execute(f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN {delete_old} END")
+        op.execute(f"CREATE TRIGGER {fts}_update AFTER UPDATE OF name, description ON {table} BEGIN {delete_old} {insert_new} END")
+        # Index the rows already there
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        for table in SEARCHABLE:
+            for trigger in ('insert', 'delete', 'update'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{trigger}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+    op.drop_index('ix_offers_priority_id', table_name='offers')
+    op.drop_index('ix_offers_target_system_priority_id', table_name='offers')
+    op.drop_index('ix_offers_target_system_id', table_name='offers')
+    op.drop_index('ix_events_lifetime_hours_id', table_name='events')
+    op.drop_index('ix_events_disable_all_campaigns_id', table_name='events')
+    op.drop_index('ix_events_queue_name_id', table_name='events')
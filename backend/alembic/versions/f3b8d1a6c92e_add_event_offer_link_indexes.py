@@ -0,0 +1,30 @@
+"""Add covering indexes for event_offer link lists
+
+Revision ID: f3b8d1a6c92e
+Revises: e4a9c2d7f16b
+Create Date: 2026-10-18 19:42:37.118604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d1a6c92e'
+down_revision: Union[str, Sequence[str], None] = 'e4a9c2d7f16b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_event_offer_offer_id_event_id', 'event_offer', ['offer_id', 'event_id', 'delay_minutes', 'action_type'], unique=False)
+    op.create_index('ix_event_offer_action_type_event_id', 'event_offer', ['action_type', 'event_id', 'offer_id', 'delay_minutes'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_event_offer_action_type_event_id', table_name='event_offer')
+    op.drop_index('ix_event_offer_offer_id_event_id', table_name='event_offer')
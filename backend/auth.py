@@ -0,0 +1,176 @@
+import hashlib
+import json
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JOSEError, JWTError, jwk, jwt
+from config import settings
+
+# Keycloak access tokens are verified in-process: signature against the realm JWKS
+# (downloaded once, refreshed when a token names an unknown kid, i.e. after key
+# rotation) plus issuer/expiry claims. Verified claims are kept for a short while keyed
+# by the token hash, so repeat requests with the same token skip the RSA check too.
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class KeysUnavailable(Exception):
+    """The JWKS could not be downloaded or read, so no token can be checked against it."""
+
+
+def realm_url() -> str:
+    return f"{settings.keycloak_server_url}/realms/{settings.keycloak_realm}"
+
+
+def fetch_keycloak_jwks() -> dict:
+    with urllib.request.urlopen(f"{realm_url()}/protocol/openid-connect/certs", timeout=5) as response:
+        return json.load(response)
+
+
+class JWKSCache:
+    def __init__(self, fetch: Callable[[], dict], min_refresh_seconds: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        self._fetch = fetch
+        self._min_refresh_seconds = min_refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys: Dict[str, object] = {}
+        self._last_fetch: Optional[float] = None
+        self._fetch_error: Optional[str] = None
+
+    def get(self, kid: str):
+        return self._keys.get(kid)
+
+    def refresh(self) -> bool:
+        # Rate limited so tokens with made-up kids cannot turn into a JWKS download each
+        with self._lock:
+            now = self._clock()
+            if self._last_fetch is not None and now - self._last_fetch < self._min_refresh_seconds:
+                # Until the next attempt, a failed download keeps failing the same way
+                if self._fetch_error is not None:
+                    raise KeysUnavailable(self._fetch_error)
+                return False
+            self._last_fetch = now
+            try:
+                keys = {}
+                for key in self._fetch().get("keys", []):
+                    # Keycloak also publishes an encryption key (use=enc) under the same JWKS
+                    if key.get("kid") and key.get("kty") == "RSA" and key.get("use", "sig") == "sig":
+                        keys[key["kid"]] = jwk.construct(key, key.get("alg", "RS256"))
+            except (OSError, ValueError, AttributeError, TypeError, JOSEError) as exc:
+                # Network errors (URLError is an OSError), invalid JSON, a malformed key set;
+                # the keys from the last good download stay in use
+                self._fetch_error = f"{type(exc).__name__}: {exc}"
+                raise KeysUnavailable(self._fetch_error) from exc
+            self._fetch_error = None
+            self._keys = keys
+            return True
+
+
+class TokenVerifier:
+    def __init__(self, jwks: JWKSCache, issuer: str, audience: Optional[str] = None,
+                 cache_ttl_seconds: float = 60.0, cache_size: int = 10000, clock: Callable[[], float] = time.time):
+        self.jwks = jwks
+        self.issuer = issuer
+        self.audience = audience
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_size = cache_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+    def cached(self, token: str) -> Optional[dict]:
+        entry = self._cache.get(hashlib.sha256(token.encode()).digest())
+        if entry is None or entry[1] <= self._clock():
+            return None
+        return entry[0]
+
+    def verify(self, token: str) -> dict:
+        claims = self.cached(token)
+        if claims is not None:
+            return claims
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except JWTError as exc:
+            raise InvalidToken(str(exc)) from exc
+        key = self.jwks.get(kid)
+        if key is None and self.jwks.refresh():
+            key = self.jwks.get(kid)
+        if key is None:
+            raise InvalidToken("Unknown signing key")
+
+        try:
+            claims = jwt.decode(
+                token, key, algorithms=["RS256"], issuer=self.issuer, audience=self.audience,
+                options={"verify_aud": self.audience is not None, "verify_at_hash": False},
+            )
+        except JWTError as exc:
+            raise InvalidToken(str(exc)) from exc
+
+        if claims.get("exp") is None:
+            # jwt.decode only checks exp when present; a token that never expires is not accepted
+            raise InvalidToken("Token has no expiry")
+        expires_at = min(float(claims["exp"]), self._clock() + self.cache_ttl_seconds)
+        with self._lock:
+            self._cache[hashlib.sha256(token.encode()).digest()] = (claims, expires_at)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+
+token_verifier = TokenVerifier(
+    JWKSCache(fetch_keycloak_jwks, settings.jwks_min_refresh_seconds),
+    issuer=settings.keycloak_issuer or realm_url(),
+    audience=settings.keycloak_audience,
+    cache_ttl_seconds=settings.token_cache_ttl_seconds,
+    cache_size=settings.token_cache_size,
+)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def realm_roles(claims: dict) -> set:
+    return set(claims.get("realm_access", {}).get("roles", []))
+
+
+def check_roles(claims: dict, roles) -> None:
+    missing = set(roles) - realm_roles(claims)
+    if missing:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Missing realm roles: {', '.join(sorted(missing))}")
+
+
+# Dependencies
+async def get_current_claims(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
+    if credentials is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    token = credentials.credentials
+    try:
+        # Cache hits stay on the event loop; a full check may need to download the JWKS
+        return token_verifier.cached(token) or await run_in_threadpool(token_verifier.verify, token)
+    except InvalidToken as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {exc}", headers={"WWW-Authenticate": "Bearer"})
+    except KeysUnavailable:
+        # Keycloak is unreachable: the token may well be valid, so not a 401
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Token signing keys unavailable",
+                            headers={"Retry-After": str(int(settings.jwks_min_refresh_seconds))})
+
+
+def require_roles(*roles: str):
+    async def dependency(claims: dict = Depends(get_current_claims)) -> dict:
+        check_roles(claims, roles)
+        return claims
+    return dependency
+
+
+async def authorize(request: Request, claims: dict = Depends(get_current_claims)) -> dict:
+    check_roles(claims, settings.auth_read_roles if request.method in SAFE_METHODS else settings.auth_write_roles)
+    return claims
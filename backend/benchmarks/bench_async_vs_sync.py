@@ -0,0 +1,110 @@
+"""Requests/sec of the sync (threadpool) and async (AsyncSession) routes at high concurrency.
+
+Starts a local uvicorn per DB_MODE against the same seeded SQLite file and hammers
+the list and detail endpoints with concurrent httpx clients.
+
+    python benchmarks/bench_async_vs_sync.py --concurrency 200 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed(db_path: str, events: int) -> None:
+    from sqlalchemy import create_engine
+    from migrations import create_schema
+    from models.event_offer import Event
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    create_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(Event.__table__.insert(), [
+            {"id": f"event-{i}", "code": f"EVENT{i:06d}", "name": f"Event {i}", "description": "benchmark"}
+            for i in range(events)
+        ])
+    engine.dispose()
+
+
+def start_server(mode: str, db_path: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_MODE=mode, DATABASE_URL=f"sqlite:///{db_path}")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"uvicorn ({mode}) did not start")
+
+
+async def hammer(base_url: str, paths, total: int, concurrency: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    counter = iter(range(total))
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                response = await client.get(paths[i % len(paths)])
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {"requests": total, "errors": errors, "seconds": round(elapsed, 3), "rps": round(total / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=1000)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(db_path, args.events)
+    paths = ["/api/events/?limit=20"] + [f"/api/events/event-{i}" for i in range(0, args.events, max(1, args.events // 50))]
+
+    results = {}
+    for mode in ("sync", "async"):
+        port = free_port()
+        proc = start_server(mode, db_path, port)
+        try:
+            # Warm up connections and SQLite page cache before measuring
+            asyncio.run(hammer(f"http://127.0.0.1:{port}", paths, 200, 20))
+            results[mode] = asyncio.run(hammer(f"http://127.0.0.1:{port}", paths, args.requests, args.concurrency))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    results["async_vs_sync"] = round(results["async"]["rps"] / results["sync"]["rps"], 2)
+    print(json.dumps({"concurrency": args.concurrency, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Per-request cost of Keycloak token verification: full RS256 check vs verified-token cache hit.
+
+Uses a locally generated RSA key set in place of Keycloak's JWKS.
+
+    python benchmarks/bench_auth.py --tokens 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from auth import JWKSCache, TokenVerifier
+
+ISSUER = "http://keycloak.bench/realms/myrealm"
+
+
+def key_set():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    public_jwk = {**jwk.construct(pem, "RS256").public_key().to_dict(), "kid": "bench", "use": "sig"}
+    return pem, {"keys": [public_jwk]}
+
+
+def per_call_us(fn, items):
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {"p50_us": round(statistics.median(samples) * 1e6, 1), "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=2000)
+    args = parser.parse_args()
+
+    pem, jwks = key_set()
+    now = int(time.time())
+    tokens = [
+        jwt.encode({"sub": f"user-{i}", "iss": ISSUER, "iat": now, "exp": now + 600, "realm_access": {"roles": ["user"]}},
+                   pem, algorithm="RS256", headers={"kid": "bench"})
+        for i in range(args.tokens)
+    ]
+
+    verifier = TokenVerifier(JWKSCache(lambda: jwks), issuer=ISSUER, cache_size=args.tokens)
+    verifier.verify(tokens[0])  # JWKS download + key construction, outside the measurement
+    verifier = TokenVerifier(verifier.jwks, issuer=ISSUER, cache_size=args.tokens)
+
+    print(json.dumps({
+        "tokens": args.tokens,
+        "full_verification": per_call_us(verifier.verify, tokens),
+        "cache_hit": per_call_us(verifier.verify, tokens),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
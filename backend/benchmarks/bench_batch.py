@@ -0,0 +1,103 @@
+"""Batch lookups by id against the fan-out of single GETs they replace.
+
+For each batch size, random ids from a catalogue of --events events (one in ten of them
+unknown) are resolved three ways through the app in-process (httpx.ASGITransport, so no
+network cost, which flatters the fan-out):
+  sequential  one GET /api/events/{id} after another
+  concurrent  the same GETs all in flight at once (asyncio.gather)
+  batch       one POST /api/events/batch
+with the read cache off and with a warm in-process cache. The report is the median
+wall time per resolved set over --rounds rounds.
+
+    python benchmarks/bench_batch.py --events 20000 --sizes 10,50,200 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["METRICS_ENABLED"] = "false"
+
+import httpx
+
+import catalogue
+
+
+async def sequential(client, ids):
+    for entity_id in ids:
+        await client.get(f"/api/events/{entity_id}")
+
+
+async def concurrent(client, ids):
+    await asyncio.gather(*(client.get(f"/api/events/{entity_id}") for entity_id in ids))
+
+
+async def batch(client, ids):
+    response = await client.post("/api/events/batch", json={"ids": ids})
+    assert response.status_code == 200, response.text
+
+
+async def run(args, database: str) -> dict:
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    from main import app
+    from services.cache import InProcessCache, NullCache, configure_cache
+
+    rng = random.Random(args.seed)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for cache in ("none", "memory"):
+            for size in args.sizes:
+                samples = {"sequential": [], "concurrent": [], "batch": []}
+                for round_ in range(args.rounds):
+                    ids = [
+                        catalogue.event_id(rng.randrange(args.events)) if rng.random() >= 0.1 else f"unknown-{round_}-{i}"
+                        for i in range(size)
+                    ]
+                    for name, resolve in (("sequential", sequential), ("concurrent", concurrent), ("batch", batch)):
+                        configure_cache(NullCache() if cache == "none" else InProcessCache())
+                        if cache == "memory":
+                            # Warm: what a second screen showing the same ids would see
+                            await resolve(client, ids)
+                        started = time.perf_counter()
+                        await resolve(client, ids)
+                        samples[name].append(time.perf_counter() - started)
+                results[f"cache {cache}, {size} ids"] = {
+                    f"{name}_ms": round(statistics.median(values) * 1000, 2) for name, values in samples.items()
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--sizes", default="10,50,200", help="comma-separated batch sizes")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--catalogue-dir", default=os.path.join(tempfile.gettempdir(), "event-offer-catalogues"))
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+
+    os.makedirs(args.catalogue_dir, exist_ok=True)
+    source = os.path.join(args.catalogue_dir, f"batch-{args.events}-{args.seed}.db")
+    catalogue.generate(source, args.events, 1, 0, 0.0, args.seed)
+    workdir = tempfile.mkdtemp()
+    database = os.path.join(workdir, "batch.db")
+    shutil.copyfile(source, database)
+    try:
+        results = asyncio.run(run(args, database))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps({"events": args.events, "rounds": args.rounds, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Import throughput of the bulk NDJSON endpoints vs one POST per row.
+
+Drives the ASGI app in-process against a temporary SQLite file.
+
+    python benchmarks/bench_bulk_import.py --offers 50000 --links 500000 --single-rows 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx
+
+from database import Base, engine
+from main import app
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def ndjson(rows) -> bytes:
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+
+async def single_rows(client: httpx.AsyncClient, count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        response = await client.post("/api/offers/", json={"id": f"single-{i}", "code": f"SINGLE{i}", "name": "Offer"})
+        assert response.status_code == 201, response.text
+    return count / (time.perf_counter() - started)
+
+
+async def bulk(client: httpx.AsyncClient, path: str, rows) -> float:
+    body = ndjson(rows)
+    started = time.perf_counter()
+    response = await client.post(path, content=body, headers=NDJSON, timeout=None)
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200 and response.json()["rejected"] == 0, response.text[:500]
+    return len(rows) / elapsed
+
+
+async def run(args):
+    Base.metadata.create_all(engine)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        single_rps = await single_rows(client, args.single_rows)
+
+        events = [{"id": f"event-{i}", "code": f"EVENT{i}", "name": "Event"} for i in range(args.events)]
+        offers = [{"id": f"offer-{i}", "code": f"OFFER{i}", "name": "Offer", "priority": i % 10} for i in range(args.offers)]
+        links = [
+            {"event_id": f"event-{i % args.events}", "offer_id": f"offer-{(i * 7919) % args.offers}", "delay_minutes": i % 60}
+            for i in range(args.links)
+        ]
+        event_rps = await bulk(client, "/api/events/bulk", events)
+        offer_rps = await bulk(client, "/api/offers/bulk", offers)
+        link_rps = await bulk(client, "/api/event-offers/bulk", links)
+        offer_update_rps = await bulk(client, "/api/offers/bulk", offers)
+
+    return {
+        "single_row_offers_per_sec": round(single_rps, 1),
+        "bulk_events_per_sec": round(event_rps, 1),
+        "bulk_offers_per_sec": round(offer_rps, 1),
+        "bulk_offer_updates_per_sec": round(offer_update_rps, 1),
+        "bulk_links_per_sec": round(link_rps, 1),
+        "bulk_vs_single_offers": round(offer_rps / single_rps, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--offers", type=int, default=50000)
+    parser.add_argument("--links", type=int, default=500000)
+    parser.add_argument("--single-rows", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
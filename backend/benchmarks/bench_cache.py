@@ -0,0 +1,83 @@
+"""Latency of event/offer reads through the read-through cache vs straight CRUD queries.
+
+    python benchmarks/bench_cache.py --events 10000 --reads 20000 --hot 1000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from crud import event_offer as crud
+from models.base import Base
+from models.event_offer import Event
+from schemas.event_offer import EventUpdate
+from services.cache import InProcessCache, configure_cache, entity_cache
+
+
+def seed(engine, events: int) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Event.__table__.insert(), [
+            {"id": f"event-{i}", "code": f"EVENT{i}", "name": f"Event {i}"} for i in range(events)
+        ])
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50_us": round(statistics.median(samples) * 1e6, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 2),
+    }
+
+
+def measure(fn, keys):
+    samples = []
+    for key in keys:
+        started = time.perf_counter()
+        fn(key)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--hot", type=int, default=1000, help="number of distinct ids being read")
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    seed(engine, args.events)
+    ids = [f"event-{rng.randrange(args.hot)}" for _ in range(args.reads)]
+    pages = [rng.randrange(args.hot // args.page_size or 1) * args.page_size for _ in range(args.reads // 10)]
+    configure_cache(InProcessCache(max_entries=args.hot * 2, ttl_seconds=3600))
+
+    with Session(engine) as db:
+        results = {
+            "uncached_get": measure(lambda key: crud.get_event(db, key), ids),
+            "cached_get": measure(lambda key: crud.get_cached_event(db, key), ids),
+            "uncached_list": measure(lambda skip: crud.get_events(db, skip, args.page_size), pages),
+            "cached_list": measure(lambda skip: crud.get_cached_events(db, skip, args.page_size), pages),
+        }
+        # Every write retires cached list pages; single-id entries for other ids survive
+        crud.update_event(db, "event-0", EventUpdate(code="EVENT0", name="Renamed"))
+        results["cached_get_after_write"] = measure(lambda key: crud.get_cached_event(db, key), ids[:2000])
+
+    print(json.dumps({
+        "events": args.events, "hot_ids": args.hot, **results, "cache": entity_cache.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
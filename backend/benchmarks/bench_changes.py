@@ -0,0 +1,131 @@
+"""Delta sync through the change feed against downloading the whole catalogue again.
+
+For each catalogue size in --sizes (events; half as many offers, --links-per-event links
+per event), a copy of the catalogue gets --changes writes through the crud layer (event
+and offer updates, new links, deletions), then a client that had synced before them
+catches up two ways:
+  delta  GET /api/changes pages from its last seq (crud.get_changes)
+  full   every keyset page of /api/events/, /api/offers/ and /api/event-offers/
+both with the read cache off. The report is the median time over --rounds rounds and the
+rows each transferred: the delta follows the number of changes, the full sync the size of
+the catalogue.
+
+    python benchmarks/bench_changes.py --sizes 10000,100000 --changes 10,100,1000 --rounds 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+import catalogue
+from crud import event_offer as crud
+from models.change import EntityChange
+from pagination import next_cursor
+from schemas.event_offer import EventOfferCreate, EventUpdate, OfferUpdate
+from services.cache import NullCache, configure_cache
+
+PAGE = 1000
+
+
+def write_changes(db: Session, events: int, offers: int, count: int, round_: int) -> None:
+    for i in range(count):
+        kind, n = i % 4, (round_ * count + i) * 7919
+        if kind == 0:
+            e = n % events
+            crud.update_event(db, catalogue.event_id(e), EventUpdate(code=f"EVENT{e:07d}", name=f"Renamed {round_}"))
+        elif kind == 1:
+            o = n % offers
+            crud.update_offer(db, catalogue.offer_id(o), OfferUpdate(code=catalogue.offer_code(o), name=f"Renamed {round_}"))
+        elif kind == 2:
+            # Reserved offers are never linked by the catalogue, so these links are new
+            crud.create_event_offer_association(db, EventOfferCreate(
+                event_id=catalogue.event_id(n % events), offer_id=catalogue.offer_id(offers - 1 - (round_ * count + i) % (offers // 10))))
+        else:
+            crud.delete_event_offer_association(db, catalogue.event_id(n % events), catalogue.offer_id((n // 3) % offers))
+
+
+def delta(db: Session, since: int) -> int:
+    rows = 0
+    while True:
+        page = crud.get_changes(db, since, PAGE)
+        rows += len(page["changes"])
+        since = page["last_seq"]
+        if not page["has_more"]:
+            return rows
+
+
+def full(db: Session) -> int:
+    rows = 0
+    for read, key in ((crud.get_event_rows, None), (crud.get_offer_rows, None), (crud.get_event_offer_rows, crud.link_cursor_key)):
+        cursor = None
+        while True:
+            page = read(db, 0, PAGE, cursor)
+            rows += len(page)
+            cursor = next_cursor(page, PAGE, key)
+            if cursor is None:
+                break
+    return rows
+
+
+def run_size(args, events: int) -> dict:
+    offers = max(10, events // 2)
+    source = os.path.join(args.catalogue_dir, f"changes-{events}-{offers}-{args.links_per_event}-{args.seed}.db")
+    catalogue.generate(source, events, offers, args.links_per_event, 0.1, args.seed)
+    workdir = tempfile.mkdtemp()
+    database = os.path.join(workdir, "changes.db")
+    shutil.copyfile(source, database)
+    results = {}
+    try:
+        engine = create_engine(f"sqlite:///{database}")
+        with Session(engine) as db:
+            full_samples = []
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                full_rows = full(db)
+                full_samples.append(time.perf_counter() - started)
+            results["full"] = {"rows": full_rows, "median_ms": round(statistics.median(full_samples) * 1000, 2)}
+            for round_offset, count in enumerate(args.changes):
+                samples = []
+                for round_ in range(args.rounds):
+                    since = db.execute(select(func.max(EntityChange.seq))).scalar()
+                    write_changes(db, events, offers, count, round_offset * args.rounds + round_)
+                    started = time.perf_counter()
+                    delta_rows = delta(db, since)
+                    samples.append(time.perf_counter() - started)
+                results[f"delta, {count} changes"] = {"rows": delta_rows, "median_ms": round(statistics.median(samples) * 1000, 2)}
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated catalogue sizes, in events")
+    parser.add_argument("--changes", default="10,100,1000", help="comma-separated numbers of writes to catch up on")
+    parser.add_argument("--links-per-event", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--catalogue-dir", default=os.path.join(tempfile.gettempdir(), "event-offer-catalogues"))
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+    args.changes = [int(count) for count in args.changes.split(",")]
+
+    os.makedirs(args.catalogue_dir, exist_ok=True)
+    configure_cache(NullCache())
+    results = {f"{events} events": run_size(args, events) for events in args.sizes}
+    print(json.dumps({"links_per_event": args.links_per_event, "rounds": args.rounds, "page": PAGE, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
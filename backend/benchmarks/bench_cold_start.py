@@ -0,0 +1,137 @@
+"""Cold start: time from process launch to the first successful request.
+
+Each variant launches a fresh process against a copy of a seeded catalogue (already at the
+current revision) and polls GET /api/events/ every few milliseconds until it answers 200:
+  alembic_then_uvicorn  the former container command, `alembic upgrade head && uvicorn`,
+                        with the startup check and warm-up off
+  upgrade_on_startup    uvicorn alone with SCHEMA_ON_STARTUP=upgrade (the container now)
+  verify_no_warm        uvicorn with the revision check only
+  verify_warm_reads     the revision check, pool, statement and list-page warm-up
+  verify_warm           all of that and the resolution index (the default)
+Reported, median over --rounds launches: launch to first 200, launch to /ready, and the
+latency of the first and of the tenth answered request, which shows what the warm-up moves
+out of the first requests.
+
+    python benchmarks/bench_cold_start.py --events 20000 --rounds 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import catalogue
+from bench_async_vs_sync import free_port
+
+VARIANTS = {
+    "alembic_then_uvicorn": {"SCHEMA_ON_STARTUP": "off", "WARM_ON_STARTUP": "false", "WARM_RESOLUTION_INDEX": "false"},
+    "upgrade_on_startup": {"SCHEMA_ON_STARTUP": "upgrade"},
+    "verify_no_warm": {"SCHEMA_ON_STARTUP": "verify", "WARM_ON_STARTUP": "false", "WARM_RESOLUTION_INDEX": "false"},
+    "verify_warm_reads": {"SCHEMA_ON_STARTUP": "verify", "WARM_RESOLUTION_INDEX": "false"},
+    "verify_warm": {"SCHEMA_ON_STARTUP": "verify"},
+}
+POLL_SECONDS = 0.005
+
+
+def alembic_ini(workdir: str, database: str) -> str:
+    """alembic.ini pointed at the copy, with the script location made absolute."""
+    with open(os.path.join(BACKEND_DIR, "alembic.ini")) as source:
+        lines = source.read().splitlines()
+    for index, line in enumerate(lines):
+        if line.startswith("sqlalchemy.url"):
+            lines[index] = f"sqlalchemy.url = sqlite:///{database}"
+        elif line.startswith("script_location"):
+            lines[index] = f"script_location = {os.path.join(BACKEND_DIR, 'alembic')}"
+    path = os.path.join(workdir, "alembic.ini")
+    with open(path, "w") as ini:
+        ini.write("\n".join(lines) + "\n")
+    return path
+
+
+def launch(variant: str, workdir: str, database: str, port: int) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", DB_MODE="async", METRICS_ENABLED="false", **VARIANTS[variant])
+    serve = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+    if variant == "alembic_then_uvicorn":
+        migrate = f"{sys.executable} -m alembic -c {alembic_ini(workdir, database)} upgrade head"
+        command = ["sh", "-c", f"{migrate} && exec {' '.join(serve)}"]
+    else:
+        command = serve
+    started = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            first = poll(client, "/api/events/", started, proc)
+            ready = poll(client, "/ready", started, proc) if variant != "alembic_then_uvicorn" else None
+            latencies = []
+            for _ in range(10):
+                request_started = time.perf_counter()
+                client.get("/api/events/", params={"limit": 100}).raise_for_status()
+                latencies.append(time.perf_counter() - request_started)
+        return {"first_200": first[0], "first_request": first[1], "ready": ready and ready[0], "tenth_request": latencies[-1]}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def poll(client: httpx.Client, path: str, started: float, proc: subprocess.Popen):
+    """(launch to the first 200, latency of that request)"""
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        request_started = time.perf_counter()
+        try:
+            if client.get(path, params={"limit": 100}).status_code == 200:
+                now = time.perf_counter()
+                return now - started, now - request_started
+        except httpx.TransportError:
+            pass
+        time.sleep(POLL_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--catalogue-dir", default=os.path.join(tempfile.gettempdir(), "event-offer-catalogues"))
+    args = parser.parse_args()
+    variants = args.variants.split(",")
+
+    os.makedirs(args.catalogue_dir, exist_ok=True)
+    source = os.path.join(args.catalogue_dir, f"cold-start-{args.events}-{args.seed}.db")
+    catalogue.generate(source, args.events, max(10, args.events // 2), 3, 0.1, args.seed)
+    workdir = tempfile.mkdtemp()
+    samples = {variant: [] for variant in variants}
+    try:
+        for round_ in range(args.rounds):
+            # Rotate the order so no variant always launches right after another one
+            for variant in variants[round_ % len(variants):] + variants[:round_ % len(variants)]:
+                database = os.path.join(workdir, f"{variant}.db")
+                shutil.copyfile(source, database)
+                samples[variant].append(launch(variant, workdir, database, free_port()))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    def median_ms(variant: str, key: str):
+        values = [sample[key] for sample in samples[variant] if sample[key] is not None]
+        return round(statistics.median(values) * 1000, 1) if values else None
+
+    results = {
+        variant: {f"{key}_ms": median_ms(variant, key) for key in ("first_200", "ready", "first_request", "tenth_request")}
+        for variant in variants
+    }
+    print(json.dumps({"events": args.events, "rounds": args.rounds, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
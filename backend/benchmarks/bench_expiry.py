@@ -0,0 +1,166 @@
+"""Foreground latency while the expiry sweeper deletes a backlog, by sweep batch size.
+
+Each run seeds a fresh file SQLite (production profile: WAL, one writer connection) with
+--events events, --expired-ratio of them already expired, and --links links per event,
+then sweeps every expired event with one --batch-sizes value ("all" is a single
+transaction, the unbatched delete) while --threads foreground threads read pages of
+unexpired events and every --write-every'th request renames one. Reported per batch size:
+the sweep's duration, events deleted per second and longest batch (the longest the writer
+was held), and the foreground read and write latency percentiles, next to the same
+foreground load with no sweep running.
+
+    python benchmarks/bench_expiry.py --events 100000 --expired-ratio 0.5 --batch-sizes 100,500,2000,all
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from crud import event_offer as crud
+from database import RoutingSession, WRITER_POOL_OPTIONS, use_sqlite_profile
+from models.base import Base, utcnow
+from models.event_offer import Event, Offer, event_offer_association
+from pagination import encode_cursor
+from schemas.event_offer import EventUpdate
+from services.cache import NullCache, configure_cache
+from services.expiry import ExpirySweeper
+
+OFFERS = 200
+SEED_CHUNK = 20000
+
+
+def setup(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite:///{path}"
+    reader = create_engine(url, connect_args={"check_same_thread": False}, pool_size=args.threads + 1, max_overflow=-1)
+    writer = create_engine(url, connect_args={"check_same_thread": False}, **WRITER_POOL_OPTIONS)
+    use_sqlite_profile(reader)
+    use_sqlite_profile(writer, writer=True)
+    Base.metadata.create_all(writer)
+    rng = random.Random(args.seed)
+    now = utcnow()
+    live = []
+    with writer.begin() as conn:
+        conn.execute(insert(Offer.__table__), [{"id": f"offer-{i}", "code": f"O{i}", "name": "Offer"} for i in range(OFFERS)])
+        for start in range(0, args.events, SEED_CHUNK):
+            events, links = [], []
+            for i in range(start, min(start + SEED_CHUNK, args.events)):
+                expired = rng.random() < args.expired_ratio
+                events.append({
+                    "id": f"event-{i:07d}", "code": f"E{i:07d}", "name": f"Event {i}", "lifetime_hours": 1,
+                    "created_at": now, "updated_at": now, "expires_at": now + timedelta(hours=-1 if expired else 1),
+                })
+                links += [{"event_id": f"event-{i:07d}", "offer_id": f"offer-{offer}"} for offer in rng.sample(range(OFFERS), args.links)]
+                if not expired:
+                    live.append(i)
+            conn.execute(insert(Event.__table__), events)
+            conn.execute(insert(event_offer_association), links)
+    session = sessionmaker(bind=reader, autoflush=False, class_=RoutingSession, info={"writer": writer})
+    return reader, writer, session, live
+
+
+def foreground(session, live, write_every, seed_value, stop, reads, writes):
+    rng = random.Random(seed_value)
+    requests = 0
+    while not stop():
+        requests += 1
+        started = time.perf_counter()
+        with session() as db:
+            if requests % write_every == 0:
+                i = rng.choice(live)
+                crud.update_event(db, f"event-{i:07d}", EventUpdate(code=f"E{i:07d}", name=str(started)))
+                writes.append(time.perf_counter() - started)
+            else:
+                crud.get_events(db, limit=100, cursor=encode_cursor(f"event-{rng.choice(live):07d}"))
+                reads.append(time.perf_counter() - started)
+
+
+def percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples) * 1000, 2),
+        "p99_ms": round(samples[min(len(samples) - 1, len(samples) * 99 // 100)] * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2),
+    }
+
+
+def load(session, live, args, stop) -> dict:
+    reads, writes = [], []
+    threads = [
+        threading.Thread(target=foreground, args=(session, live, args.write_every, args.seed + n, stop, reads, writes))
+        for n in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    return {"threads": threads, "reads": reads, "writes": writes}
+
+
+def finish(running: dict) -> dict:
+    for thread in running["threads"]:
+        thread.join()
+    return {"reads": percentiles(running["reads"]), "writes": percentiles(running["writes"])}
+
+
+def run(args, batch_size: str) -> dict:
+    reader, writer, session, live = setup(args)
+    try:
+        expired = args.events - len(live)
+        # The same foreground load alone, for as long as a short sweep takes
+        deadline = time.perf_counter() + args.baseline_seconds
+        baseline = finish(load(session, live, args, lambda: time.perf_counter() > deadline))
+
+        sweeper = ExpirySweeper(session, batch_size=expired + 1 if batch_size == "all" else int(batch_size), pause_seconds=args.pause)
+        done = threading.Event()
+        running = load(session, live, args, done.is_set)
+        summary = asyncio.run(sweeper.sweep())
+        done.set()
+        during = finish(running)
+        return {
+            "sweep": {**summary, "max_batch_ms": round(sweeper.max_batch_seconds * 1000, 1)},
+            "baseline": baseline,
+            "during_sweep": during,
+        }
+    finally:
+        reader.dispose()
+        writer.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--expired-ratio", type=float, default=0.5)
+    parser.add_argument("--links", type=int, default=3, help="links per event")
+    parser.add_argument("--batch-sizes", default="100,500,2000,all")
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds between batches")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--write-every", type=int, default=5)
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # Every page read goes to the database
+    configure_cache(NullCache())
+    results = {batch_size: run(args, batch_size) for batch_size in args.batch_sizes.split(",")}
+    print(json.dumps({
+        "events": args.events, "expired_ratio": args.expired_ratio, "links_per_event": args.links,
+        "threads": args.threads, "pause_seconds": args.pause, "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
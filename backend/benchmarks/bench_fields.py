@@ -0,0 +1,129 @@
+"""Bytes on the wire and latency of full against sparse-fieldset event reads.
+
+Seeds --events events whose descriptions average --description-bytes, then walks every
+keyset page of GET /api/events/?limit=--page-size and posts the same ids to
+/api/events/batch, once with the full representation and once per fieldset in --fields
+(the dropdowns ask for id,code,name). Requests go through httpx against the app in
+process with the read cache off, so every page runs its SELECT. Reported per variant:
+response bytes per page and the median and p95 time per page over --rounds rounds.
+
+    python benchmarks/bench_fields.py --events 20000 --page-size 500 --description-bytes 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ["METRICS_ENABLED"] = "false"
+os.environ["ADMISSION_ENABLED"] = "false"
+os.environ["CACHE_BACKEND"] = "none"
+
+import httpx
+
+from database import Base, engine
+from main import app
+from models.event_offer import Event
+
+
+def seed(events: int, description_bytes: int, seed_: int) -> None:
+    rng = random.Random(seed_)
+    words = ["offer", "campaign", "weekend", "loyalty", "points", "members", "season", "bonus"]
+
+    def description() -> str:
+        size = rng.randint(description_bytes // 2, description_bytes * 3 // 2)
+        text = []
+        while sum(map(len, text)) + len(text) < size:
+            text.append(rng.choice(words))
+        return " ".join(text)
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Event.__table__.insert(), [
+            {"id": f"event-{i:07d}", "code": f"EVENT{i:07d}", "name": f"Event {i}", "description": description()}
+            for i in range(events)
+        ])
+
+
+async def walk(client: httpx.AsyncClient, page_size: int, fields: str, samples: list) -> int:
+    """Every page of the list once; returns the bytes received."""
+    received, cursor = 0, None
+    while True:
+        params = {"limit": page_size, **({"fields": fields} if fields else {}), **({"cursor": cursor} if cursor else {})}
+        started = time.perf_counter()
+        response = await client.get("/api/events/", params=params)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+        received += len(response.content)
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return received
+
+
+async def batches(client: httpx.AsyncClient, ids: list, page_size: int, fields: str, samples: list) -> int:
+    received = 0
+    for start in range(0, len(ids), page_size):
+        started = time.perf_counter()
+        response = await client.post("/api/events/batch", params={"fields": fields} if fields else {}, json={"ids": ids[start:start + page_size]})
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+        received += len(response.content)
+    return received
+
+
+def summary(received: int, pages: int, samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "bytes_per_page": received // pages,
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "p95_ms": round(samples[int(len(samples) * 0.95)] * 1000, 2),
+    }
+
+
+async def run(args) -> dict:
+    seed(args.events, args.description_bytes, args.seed)
+    ids = [f"event-{i:07d}" for i in range(args.events)]
+    random.Random(args.seed).shuffle(ids)
+    pages = -(-args.events // args.page_size)
+    variants = [""] + args.fields
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await walk(client, args.page_size, "", [])
+        for endpoint, read in (("list", lambda fields, samples: walk(client, args.page_size, fields, samples)),
+                               ("batch", lambda fields, samples: batches(client, ids, args.page_size, fields, samples))):
+            samples = {fields: [] for fields in variants}
+            received = {}
+            for round_ in range(args.rounds):
+                # Alternate the order so neither variant always runs on a warmer page cache
+                for fields in (variants if round_ % 2 == 0 else variants[::-1]):
+                    received[fields] = await read(fields, samples[fields])
+            results[endpoint] = {fields or "full": summary(received[fields], pages, samples[fields]) for fields in variants}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--description-bytes", type=int, default=2000, help="average description length")
+    parser.add_argument("--fields", default="id,code,name", help="semicolon-separated fieldsets to compare with the full rows")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    args.fields = args.fields.split(";")
+    results = asyncio.run(run(args))
+    print(json.dumps({
+        "events": args.events, "page_size": args.page_size, "description_bytes": args.description_bytes,
+        "rounds": args.rounds, "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Query plans and latency of the list filters and full-text search at catalogue scale.
+
+Builds (or reuses) a catalogue of --events events and --offers offers with
+benchmarks/catalogue.py, then for each filter prints SQLite's EXPLAIN QUERY PLAN and
+the median time of a page of --limit rows built by the crud layer's filters. Catalogue
+values are spread evenly (any filter finds a page within the first few hundred ids) and
+names draw on a dozen words, so each word matches about a quarter of the rows. One row
+in RARE_EVERY is therefore rewritten with a rare queue_name / target_system and a
+"Limited edition" description, for selective filters and searches.
+The same queries then run with the filter indexes dropped and with search done by LIKE
+instead of FTS5, for comparison. The catalogue is copied first, so dropping indexes
+never touches the cached one.
+
+    python benchmarks/bench_filters.py --events 1000000 --offers 1000000 --repeat 20
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import catalogue
+from crud import event_offer as crud
+from models.event_offer import Event, Offer
+from pagination import encode_cursor
+from schemas.event_offer import EventFilter, OfferFilter
+
+FILTER_INDEXES = [
+    "ix_events_queue_name_id", "ix_events_disable_all_campaigns_id", "ix_events_lifetime_hours_id",
+    "ix_offers_target_system_id", "ix_offers_target_system_priority_id", "ix_offers_priority_id",
+]
+RARE_EVERY = 1000
+# A session stand-in that makes crud._search take its LIKE branch on SQLite
+LIKE_SEARCH = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name="like")))
+
+
+def cases(events: int):
+    middle = encode_cursor(catalogue.event_id(events // 2))
+    return [
+        ("events queue_name", Event, EventFilter(queue_name="queue-3"), None),
+        ("events queue_name, keyset page", Event, EventFilter(queue_name="queue-3"), middle),
+        ("events rare queue_name", Event, EventFilter(queue_name="rare"), None),
+        ("events disable_all_campaigns", Event, EventFilter(disable_all_campaigns=True), None),
+        ("events lifetime_hours range", Event, EventFilter(min_lifetime_hours=24, max_lifetime_hours=72), None),
+        ("events lifetime_hours exact", Event, EventFilter(min_lifetime_hours=168, max_lifetime_hours=168), None),
+        ("events queue_name + lifetime_hours", Event, EventFilter(queue_name="queue-3", min_lifetime_hours=168), None),
+        ("offers target_system", Offer, OfferFilter(target_system="sms"), None),
+        ("offers rare target_system", Offer, OfferFilter(target_system="rare"), None),
+        ("offers target_system + priority range", Offer, OfferFilter(target_system="sms", min_priority=9), None),
+        ("offers target_system + priority exact", Offer, OfferFilter(target_system="sms", min_priority=7, max_priority=7), None),
+        ("offers priority range", Offer, OfferFilter(min_priority=10), None),
+        ("events search common word", Event, EventFilter(q="gold"), None),
+        ("events search rare word", Event, EventFilter(q="limited"), None),
+        ("events search two words + queue_name", Event, EventFilter(q="gold bonus", queue_name="queue-3"), None),
+        ("offers search prefix", Offer, OfferFilter(q="loy"), None),
+    ]
+
+
+def statement(db, model, filters, limit: int, cursor):
+    columns = crud.EVENT_COLUMNS if model is Event else crud.OFFER_COLUMNS
+    apply = crud._filter_events if model is Event else crud._filter_offers
+    return crud._page(apply(db, select(*columns), filters), model, 0, limit, cursor)
+
+
+def measure(engine, db, stmt, repeat: int) -> dict:
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+    rows = len(db.execute(stmt).all())
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.execute(stmt).all()
+        samples.append(time.perf_counter() - started)
+    return {"rows": rows, "median_ms": round(statistics.median(samples) * 1000, 3), "plan": plan}
+
+
+def run_all(engine, args, like: bool = False) -> dict:
+    results = {}
+    with Session(engine) as db:
+        for name, model, filters, cursor in cases(args.events):
+            if like and not filters.q:
+                continue
+            stmt = statement(LIKE_SEARCH if like else db, model, filters, args.limit, cursor)
+            results[name] = measure(engine, db, stmt, args.repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--offers", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--catalogue-dir", default=os.path.join(tempfile.gettempdir(), "event-offer-catalogues"))
+    args = parser.parse_args()
+
+    os.makedirs(args.catalogue_dir, exist_ok=True)
+    source = os.path.join(args.catalogue_dir, f"filters-{args.events}-{args.offers}-{args.seed}.db")
+    started = time.perf_counter()
+    catalogue.generate(source, args.events, args.offers, 0, 0.0, args.seed)
+    catalogue_seconds = time.perf_counter() - started
+    workdir = tempfile.mkdtemp()
+    database = os.path.join(workdir, "filters.db")
+    shutil.copyfile(source, database)
+    try:
+        engine = create_engine(f"sqlite:///{database}")
+        with engine.begin() as conn:
+            for table, column in (("events", "queue_name"), ("offers", "target_system")):
+                conn.exec_driver_sql(
+                    f"UPDATE {table} SET description = 'Limited edition', {column} = 'rare' WHERE rowid % {RARE_EVERY} = 0"
+                )
+        indexed = run_all(engine, args)
+        like = run_all(engine, args, like=True)
+        with engine.begin() as conn:
+            for index in FILTER_INDEXES:
+                conn.exec_driver_sql(f"DROP INDEX {index}")
+        # New connections, so no cached statement still refers to the dropped indexes
+        engine.dispose()
+        engine = create_engine(f"sqlite:///{database}")
+        unindexed = {name: result for name, result in run_all(engine, args).items() if "search" not in name}
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps({
+        "events": args.events, "offers": args.offers, "limit": args.limit, "repeat": args.repeat,
+        "catalogue_seconds": round(catalogue_seconds, 1),
+        "indexed": indexed,
+        "search_with_like": like,
+        "without_filter_indexes": unindexed,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Sustained event-occurrence ingest rate through the batch endpoint and the pipeline.
+
+Drives the ASGI app in-process against a temporary SQLite file (production profile).
+"accepted" is the rate the endpoint takes occurrences at; "persisted" includes
+waiting until the workers have written every occurrence and its offer actions.
+
+    python benchmarks/bench_ingest.py --occurrences 200000 --batch 1000 --events 1000 --queues 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ.setdefault("SQLITE_PROFILE", "production")
+
+import httpx
+
+from database import Base, engine
+from main import app
+from models.event_offer import Event, Offer, event_offer_association
+from services.ingest import ingest_pipeline
+
+
+def seed(events: int, offers: int, links_per_event: int, queues: int) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Event.__table__.insert(), [
+            {"id": f"event-{i}", "code": f"EVENT{i}", "name": "Event", "queue_name": f"queue-{i % queues}", "lifetime_hours": 24}
+            for i in range(events)
+        ])
+        conn.execute(Offer.__table__.insert(), [{"id": f"offer-{i}", "code": f"OFFER{i}", "name": "Offer"} for i in range(offers)])
+        conn.execute(event_offer_association.insert(), [
+            {"event_id": f"event-{e}", "offer_id": f"offer-{(e * 31 + k) % offers}", "delay_minutes": k * 5}
+            for e in range(events) for k in range(links_per_event)
+        ])
+
+
+async def run(args):
+    seed(args.events, args.offers, args.links_per_event, args.queues)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        batches = [
+            json.dumps([{"event_code": f"EVENT{(b * args.batch + i) % args.events}"} for i in range(args.batch)]).encode()
+            for b in range(args.occurrences // args.batch)
+        ]
+        throttled = 0
+        started = time.perf_counter()
+        for body in batches:
+            while True:
+                response = await client.post("/api/occurrences/batch", content=body, headers={"Content-Type": "application/json"})
+                if response.status_code != 429:
+                    break
+                # Backpressure: give the workers a moment, as a client honouring Retry-After would
+                throttled += 1
+                await asyncio.sleep(0.01)
+            assert response.status_code == 202, response.text[:500]
+        accepted_seconds = time.perf_counter() - started
+        await ingest_pipeline.drain()
+        persisted_seconds = time.perf_counter() - started
+        stats = ingest_pipeline.stats()
+        await ingest_pipeline.stop()
+
+    total = len(batches) * args.batch
+    print(json.dumps({
+        "occurrences": total, "batch": args.batch, "queues": args.queues,
+        "accepted_per_second": round(total / accepted_seconds),
+        "persisted_per_second": round(total / persisted_seconds),
+        "actions_written": stats["actions"], "db_batches": stats["batches"],
+        "throttled_requests": throttled,
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--occurrences", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--offers", type=int, default=500)
+    parser.add_argument("--links-per-event", type=int, default=3)
+    parser.add_argument("--queues", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Query plans and latency of the event_offer link lists on a multi-million-row link table.
+
+Builds (or reuses) a catalogue with benchmarks/catalogue.py: --events events with
+--links-per-event links each, to offers whose popularity is skewed, so the first offers
+carry tens of thousands of links and the last linkable ones a handful. For each case it
+prints SQLite's EXPLAIN QUERY PLAN and the median time of a page of --limit links built
+by the crud layer, plus a single-link lookup. The same queries then run with the link
+list indexes dropped (the composite primary key stays), for comparison. The catalogue is
+copied first, so dropping indexes never touches the cached one.
+
+    python benchmarks/bench_links.py --events 150000 --offers 50000 --links-per-event 20 --repeat 20
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import catalogue
+from crud import event_offer as crud
+from models.event_offer import event_offer_association
+from pagination import encode_cursor
+from schemas.event_offer import EventOfferFilter
+
+LINK_INDEXES = ["ix_event_offer_offer_id_event_id", "ix_event_offer_action_type_event_id"]
+
+
+def cases(args, popular: str, rare: str):
+    middle = catalogue.event_id(args.events // 2)
+    return [
+        ("links of one event", EventOfferFilter(event_id=middle), None),
+        ("links of the most linked offer", EventOfferFilter(offer_id=popular), None),
+        ("links of the most linked offer, keyset page", EventOfferFilter(offer_id=popular), encode_cursor([middle, popular])),
+        ("links of a rarely linked offer", EventOfferFilter(offer_id=rare), None),
+        ("most linked offer + action_type", EventOfferFilter(offer_id=popular, action_type="disable"), None),
+        ("action_type", EventOfferFilter(action_type="disable"), None),
+        ("action_type, keyset page", EventOfferFilter(action_type="disable"), encode_cursor([middle, popular])),
+        ("all links, keyset page", None, encode_cursor([middle, popular])),
+    ]
+
+
+def measure(engine, db, stmt, repeat: int) -> dict:
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+    rows = len(db.execute(stmt).all())
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.execute(stmt).all()
+        samples.append(time.perf_counter() - started)
+    return {"rows": rows, "median_ms": round(statistics.median(samples) * 1000, 3), "plan": plan}
+
+
+def run_all(engine, args, popular: str, rare: str) -> dict:
+    results = {}
+    with Session(engine) as db:
+        for name, filters, cursor in cases(args, popular, rare):
+            results[name] = measure(engine, db, crud._link_statement(db, 0, args.limit, cursor, filters), args.repeat)
+        link = select(event_offer_association).where(*crud._link_filter(catalogue.event_id(args.events // 2), popular))
+        results["one link by (event_id, offer_id), absent"] = measure(engine, db, link, args.repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=150000)
+    parser.add_argument("--offers", type=int, default=50000)
+    parser.add_argument("--links-per-event", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--catalogue-dir", default=os.path.join(tempfile.gettempdir(), "event-offer-catalogues"))
+    args = parser.parse_args()
+
+    os.makedirs(args.catalogue_dir, exist_ok=True)
+    source = os.path.join(args.catalogue_dir, f"links-{args.events}-{args.offers}-{args.links_per_event}-{args.seed}.db")
+    started = time.perf_counter()
+    catalogue.generate(source, args.events, args.offers, args.links_per_event, 0.1, args.seed)
+    catalogue_seconds = time.perf_counter() - started
+    workdir = tempfile.mkdtemp()
+    database = os.path.join(workdir, "links.db")
+    shutil.copyfile(source, database)
+    try:
+        engine = create_engine(f"sqlite:///{database}")
+        with engine.connect() as conn:
+            links = conn.exec_driver_sql("SELECT count(*) FROM event_offer").scalar()
+            popular, rare = (
+                conn.exec_driver_sql(f"SELECT offer_id FROM event_offer GROUP BY offer_id ORDER BY count(*) {order}, offer_id LIMIT 1").scalar()
+                for order in ("DESC", "ASC")
+            )
+        indexed = run_all(engine, args, popular, rare)
+        with engine.begin() as conn:
+            for index in LINK_INDEXES:
+                conn.exec_driver_sql(f"DROP INDEX {index}")
+        # New connections, so no cached statement still refers to the dropped indexes
+        engine.dispose()
+        engine = create_engine(f"sqlite:///{database}")
+        unindexed = run_all(engine, args, popular, rare)
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps({
+        "events": args.events, "offers": args.offers, "links": links, "limit": args.limit, "repeat": args.repeat,
+        "most_linked_offer": popular, "rarely_linked_offer": rare,
+        "catalogue_seconds": round(catalogue_seconds, 1),
+        "indexed": indexed,
+        "without_link_indexes": unindexed,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Outbox delivery throughput, lag and coalescing against a local HTTP stand-in.
+
+Link updates are written through crud.event_offer (each adds its outbox message in the
+same transaction) from a thread at a fixed rate while the dispatcher delivers to a
+uvicorn stand-in for the target systems over real HTTP. Updates pick their link from a
+small hot set, so repeated changes to one link coalesce. --rate 0 writes flat out; with
+the production profile that keeps the single writer connection busy and the
+dispatcher's acknowledgements queue behind it, so lag then mostly measures that queue.
+
+    python benchmarks/bench_outbox.py --changes 20000 --rate 500 --targets 4 --hot-links 500 --latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ.setdefault("SQLITE_PROFILE", "production")
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from config import settings
+from crud import event_offer as crud
+from database import Base, SessionLocal, engine
+from models.event_offer import Event, Offer, event_offer_association
+from schemas.event_offer import EventOfferUpdate
+from services.outbox import OutboxDispatcher
+
+
+def seed(targets: int, links: int) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Event.__table__.insert(), [{"id": "event-1", "code": "EVENT1", "name": "Event"}])
+        conn.execute(Offer.__table__.insert(), [
+            {"id": f"offer-{i}", "code": f"OFFER{i}", "name": "Offer", "target_system": f"target-{i % targets}"}
+            for i in range(links)
+        ])
+        conn.execute(event_offer_association.insert(), [{"event_id": "event-1", "offer_id": f"offer-{i}"} for i in range(links)])
+
+
+def stand_in(latency: float, received: list) -> FastAPI:
+    target = FastAPI()
+
+    @target.post("/{target_system}")
+    async def receive(target_system: str, request: Request):
+        await asyncio.sleep(latency)
+        received.append(len(json.loads(await request.body())["messages"]))
+        return Response(status_code=204)
+
+    return target
+
+
+def serve(app: FastAPI) -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return port
+
+
+def write_changes(changes: int, rate: float, links: int, timings: dict) -> None:
+    rng = random.Random(42)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        for i in range(changes):
+            if rate:
+                ahead = started + i / rate - time.perf_counter()
+                if ahead > 0:
+                    time.sleep(ahead)
+            crud.update_event_offer_association(db, "event-1", f"offer-{rng.randrange(links)}", EventOfferUpdate(delay_minutes=i % 60))
+    timings["write_seconds"] = time.perf_counter() - started
+
+
+async def run(args):
+    seed(args.targets, args.hot_links)
+    received = []
+    port = serve(stand_in(args.latency_ms / 1000, received))
+    # The writes only record messages for targets with a URL
+    settings.outbox_default_url = f"http://127.0.0.1:{port}/{{target_system}}"
+    dispatcher = OutboxDispatcher(
+        SessionLocal, default_url=settings.outbox_default_url,
+        batch_size=args.batch_size, concurrency=args.concurrency, poll_seconds=0.05,
+    )
+    timings = {}
+    writer = threading.Thread(target=write_changes, args=(args.changes, args.rate, args.hot_links, timings))
+    started = time.perf_counter()
+    writer.start()
+    await dispatcher.start()
+    while writer.is_alive() or dispatcher.pending()["pending"]:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    await dispatcher.stop()
+    stats = dispatcher.stats()
+
+    print(json.dumps({
+        "changes": args.changes, "rate": args.rate, "targets": args.targets, "hot_links": args.hot_links,
+        "latency_ms": args.latency_ms, "batch_size": args.batch_size, "concurrency": args.concurrency,
+        "writes_per_second": round(args.changes / timings["write_seconds"]),
+        "delivered_per_second": round(stats["delivered"] / elapsed),
+        "delivered": stats["delivered"], "sent": stats["sent"], "coalesced": stats["coalesced"],
+        "http_requests": len(received), "failed_batches": stats["failed_batches"],
+        "lag_seconds": stats["lag_seconds"],
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--changes", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=500.0, help="link updates per second, 0 for as fast as possible")
+    parser.add_argument("--targets", type=int, default=4)
+    parser.add_argument("--hot-links", type=int, default=500, help="links the updates are spread over")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stand-in response time")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1, help="batches in flight per target")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Goodput past saturation with and without admission control.
+
+Starts a local uvicorn (DB_MODE=sync, read cache off) against a copy of a seeded
+catalogue, measures its capacity with a closed loop, then offers open-loop Poisson
+traffic at multiples of it (--loads): pages of events with one write in ten,
+each request given up by the client after --deadline seconds, as a gateway would. The
+same runs are repeated with ADMISSION_ENABLED=false. Goodput counts the requests
+answered 2xx within the deadline; shed counts the 503s, which come back at once with a
+Retry-After. Without admission control the threadpool queue grows with the overload and
+goodput collapses once queueing alone exceeds the deadline.
+
+    python benchmarks/bench_overload.py --events 20000 --loads 0.5,1,2,4 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import catalogue
+from bench_async_vs_sync import free_port
+from pagination import encode_cursor
+
+PAGE = 200
+
+
+def start_server(database: str, port: int, admission: bool) -> subprocess.Popen:
+    env = dict(
+        os.environ, DB_MODE="sync", DATABASE_URL=f"sqlite:///{database}", SQLITE_PROFILE="production", CACHE_BACKEND="none",
+        METRICS_ENABLED="false",
+        ADMISSION_ENABLED="true" if admission else "false",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--backlog", "4096"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def request(port: int, rng: random.Random, events: int):
+    index = rng.randrange(events)
+    if rng.random() < 0.1:
+        body = json.dumps({"code": f"EVENT{index:07d}", "name": f"Renamed {rng.random()}"})
+        return send(port, "PUT", f"/api/events/{catalogue.event_id(index)}", body)
+    # A page of events rather than a single one, so the server does more work per request
+    # than the client and the server is what saturates
+    return send(port, "GET", f"/api/events/?limit={PAGE}&cursor={encode_cursor(catalogue.event_id(index))}")
+
+
+async def send(port: int, method: str, path: str, body: str = "") -> int:
+    """One request on its own connection. A bare HTTP/1.1 exchange instead of httpx, which
+    costs the client about as much CPU as a request costs the server, so on a small
+    machine the client would saturate first. Returns the status code."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        payload = body.encode()
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        await reader.read()
+        return status
+    finally:
+        writer.close()
+
+
+async def capacity(port: int, events: int, seconds: float, concurrency: int = 8) -> float:
+    rng = random.Random(0)
+    done = 0
+    stop = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < stop:
+            await request(port, rng, events)
+            done += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / (time.perf_counter() - started)
+
+
+async def offer(port: int, events: int, rate: float, seconds: float, deadline: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    outcomes = {"good": 0, "shed": 0, "timeout": 0, "error": 0}
+    latencies = []
+
+    async def one():
+        started = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(request(port, rng, events), deadline)
+        except asyncio.TimeoutError:
+            outcomes["timeout"] += 1
+            return
+        except OSError:
+            outcomes["error"] += 1
+            return
+        if status == 503:
+            outcomes["shed"] += 1
+        elif status >= 300:
+            outcomes["error"] += 1
+        else:
+            outcomes["good"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    started = time.perf_counter()
+    next_at = started
+    while next_at - started < seconds:
+        next_at += rng.expovariate(rate)
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        tasks.append(asyncio.ensure_future(one()))
+    # Rates over the wall time actually taken, in case the client fell behind
+    offered = len(tasks) / (time.perf_counter() - started)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "offered_rps": round(offered, 1),
+        "goodput_rps": round(outcomes["good"] / elapsed, 1),
+        **outcomes,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--loads", default="0.5,1,2,4", help="comma-separated multiples of the measured capacity")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--deadline", type=float, default=2.0, help="client timeout per request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--catalogue-dir", default=os.path.join(tempfile.gettempdir(), "event-offer-catalogues"))
+    args = parser.parse_args()
+    loads = [float(load) for load in args.loads.split(",")]
+
+    os.makedirs(args.catalogue_dir, exist_ok=True)
+    source = os.path.join(args.catalogue_dir, f"overload-{args.events}-{args.seed}.db")
+    catalogue.generate(source, args.events, 1, 0, 0.0, args.seed)
+    workdir = tempfile.mkdtemp()
+    results = {}
+    try:
+        rated = None
+        for admission in (False, True):
+            database = os.path.join(workdir, f"overload-{admission}.db")
+            shutil.copyfile(source, database)
+            port = free_port()
+            proc = start_server(database, port, admission)
+            try:
+                measured = asyncio.run(capacity(port, args.events, min(5.0, args.seconds)))
+                rated = rated or measured
+                runs = {"capacity_rps": round(measured, 1)}
+                for load in loads:
+                    runs[f"{load}x"] = asyncio.run(offer(port, args.events, rated * load, args.seconds, args.deadline, args.seed))
+                    # Let whatever the server still holds drain before the next load
+                    time.sleep(args.deadline * 2)
+                results["admission" if admission else "no_admission"] = runs
+            finally:
+                proc.terminate()
+                proc.wait()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps({"events": args.events, "seconds": args.seconds, "deadline": args.deadline, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Page latency of offset vs keyset (cursor) pagination from page 1 to page 10,000.
+
+    python benchmarks/bench_pagination.py --rows 1000000 --limit 100
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from crud.event_offer import get_events
+from models.base import Base
+from models.event_offer import Event
+from pagination import encode_cursor
+
+
+def seed(engine, rows: int, batch: int = 50000) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, batch):
+            conn.execute(Event.__table__.insert(), [
+                {"id": f"event-{i:09d}", "code": f"EVENT{i:09d}", "name": f"Event {i}"}
+                for i in range(start, min(start + batch, rows))
+            ])
+
+
+def time_page(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    seed(engine, args.rows)
+
+    last_page = args.rows // args.limit
+    pages = [p for p in (1, 10, 100, 1000, 10000) if p <= last_page]
+    results = []
+    with Session(engine) as db:
+        for page in pages:
+            skip = (page - 1) * args.limit
+            # The cursor a client would hold after reading the previous page
+            cursor = None
+            if skip:
+                last_id = db.execute(select(Event.id).order_by(Event.id).offset(skip - 1).limit(1)).scalar_one()
+                cursor = encode_cursor(last_id)
+            results.append({
+                "page": page,
+                "offset_ms": round(time_page(lambda: get_events(db, skip=skip, limit=args.limit), args.repeat), 3),
+                "keyset_ms": round(time_page(lambda: get_events(db, limit=args.limit, cursor=cursor), args.repeat), 3),
+            })
+
+    print(json.dumps({"rows": args.rows, "limit": args.limit, "pages": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
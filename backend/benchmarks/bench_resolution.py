@@ -0,0 +1,101 @@
+"""Latency of "which offers fire for event X" from the in-memory index vs a DB join.
+
+    python benchmarks/bench_resolution.py --events 10000 --offers 5000 --links-per-event 20
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from models.base import Base
+from models.event_offer import Event, Offer, event_offer_association
+from services.resolution_index import ResolutionIndex
+
+
+def seed(engine, events: int, offers: int, links_per_event: int, rng: random.Random) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Event.__table__.insert(), [
+            {"id": f"event-{i}", "code": f"EVENT{i}", "name": f"Event {i}"} for i in range(events)
+        ])
+        conn.execute(Offer.__table__.insert(), [
+            {"id": f"offer-{i}", "code": f"OFFER{i}", "name": f"Offer {i}", "priority": rng.randint(1, 10)}
+            for i in range(offers)
+        ])
+        conn.execute(event_offer_association.insert(), [
+            {"event_id": f"event-{e}", "offer_id": f"offer-{o}", "delay_minutes": rng.randint(0, 120),
+             "action_type": rng.choice(["enable", "disable"])}
+            for e in range(events) for o in rng.sample(range(offers), links_per_event)
+        ])
+
+
+def db_resolve(db: Session, code: str):
+    stmt = (
+        select(Offer.id, Offer.code, Offer.priority, Offer.target_system,
+               event_offer_association.c.delay_minutes, event_offer_association.c.action_type)
+        .join(event_offer_association, event_offer_association.c.offer_id == Offer.id)
+        .join(Event, Event.id == event_offer_association.c.event_id)
+        .where(Event.code == code)
+        .order_by(Offer.priority)
+    )
+    return db.execute(stmt).all()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50_us": round(statistics.median(samples) * 1e6, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 2),
+    }
+
+
+def measure(fn, codes):
+    samples = []
+    for code in codes:
+        started = time.perf_counter()
+        fn(code)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--offers", type=int, default=5000)
+    parser.add_argument("--links-per-event", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    seed(engine, args.events, args.offers, args.links_per_event, rng)
+    codes = [f"EVENT{rng.randrange(args.events)}" for _ in range(args.lookups)]
+
+    index = ResolutionIndex(sessionmaker(bind=engine))
+    started = time.perf_counter()
+    index.get(codes[0])
+    load_seconds = time.perf_counter() - started
+
+    cold = measure(index.get, codes)
+    warm = measure(index.get, codes)
+    with Session(engine) as db:
+        database = measure(lambda code: db_resolve(db, code), codes[:2000])
+
+    print(json.dumps({
+        "events": args.events, "offers": args.offers, "links": args.events * args.links_per_event,
+        "index_load_seconds": round(load_seconds, 3),
+        "index_first_lookup": cold, "index_warm": warm, "database_join": database,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Insert/fire/cancel rates and memory per pending timer of the offer-action timing wheel.
+
+A heapq of (tick, seq, action) tuples is measured alongside for reference.
+
+    python benchmarks/bench_scheduler.py --timers 1000000 --horizon-minutes 1440
+"""
+import argparse
+import gc
+import heapq
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.scheduler import ScheduledAction, TimingWheel
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_actions(count: int, horizon: int, offers: int, rng: random.Random):
+    offer_ids = [f"offer-{i}" for i in range(offers)]
+    actions = []
+    for i in range(count):
+        action = ScheduledAction(f"{i:032x}", offer_ids[i % offers], "event-1", "enable", "default_system", START)
+        action.tick = rng.randrange(1, horizon)
+        actions.append(action)
+    return actions
+
+
+def rate(count: int, seconds: float) -> int:
+    return round(count / seconds) if seconds else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timers", type=int, default=1000000)
+    parser.add_argument("--horizon-minutes", type=int, default=1440, help="delays spread over this many minutes")
+    parser.add_argument("--offers", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    horizon = args.horizon_minutes * 60
+    actions = make_actions(args.timers, horizon, args.offers, rng)
+
+    # Memory: only what the wheel itself adds on top of the action objects
+    gc.collect()
+    tracemalloc.start()
+    wheel = TimingWheel(now=0)
+    started = time.perf_counter()
+    for action in actions:
+        wheel.add(action)
+    insert_seconds = time.perf_counter() - started
+    wheel_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    action_bytes = sys.getsizeof(actions[0]) + sys.getsizeof(actions[0].occurrence_id)
+
+    cancelled = actions[: args.timers // 10]
+    started = time.perf_counter()
+    for action in cancelled:
+        wheel.cancel(action)
+    cancel_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fired = 0
+    for tick in range(0, horizon + 1, 60):
+        fired += len(wheel.advance(tick))
+    fire_seconds = time.perf_counter() - started
+    assert fired == args.timers - len(cancelled), fired
+
+    heap, started = [], time.perf_counter()
+    for seq, action in enumerate(actions):
+        heapq.heappush(heap, (action.tick, seq, action))
+    heap_insert_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    while heap:
+        heapq.heappop(heap)
+    heap_pop_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "timers": args.timers, "horizon_minutes": args.horizon_minutes,
+        "wheel_insert_per_second": rate(args.timers, insert_seconds),
+        "wheel_cancel_per_second": rate(len(cancelled), cancel_seconds),
+        "wheel_fire_per_second": rate(fired, fire_seconds),
+        "wheel_bytes_per_timer": round(wheel_bytes / args.timers, 1),
+        "action_bytes_per_timer": action_bytes,
+        "heap_insert_per_second": rate(args.timers, heap_insert_seconds),
+        "heap_pop_per_second": rate(args.timers, heap_pop_seconds),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Serialization cost of a list page: response_model validation vs orjson over row dicts.
+
+Reported per 1,000 rows, best of --rounds, for:
+  serialize  encoding an already loaded page to JSON bytes: the ORM objects through
+             FastAPI's response_model validation and JSONResponse (the old path), cached
+             row objects through the same validation (validate_list_responses), and the
+             row dicts through orjson (the default)
+  request    GET /api/events/?limit=--page-size end to end through httpx with the page
+             served from the read cache, so the difference is serialization alone
+
+    python benchmarks/bench_serialization.py --page-size 1000 --pages 50 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ["METRICS_ENABLED"] = "false"
+
+import httpx
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from config import settings
+from crud import event_offer as crud
+from database import SessionLocal, engine
+from main import app
+from migrations import create_schema
+from models.event_offer import Event
+from serialization import dump_rows
+from services.cache import as_row
+
+
+def list_route_field():
+    for route in app.routes:
+        if getattr(route, "path", None) == "/api/events/" and "GET" in route.methods:
+            return route.response_field
+    raise RuntimeError("GET /api/events/ not mounted")
+
+
+async def serve(client: httpx.AsyncClient, url: str, pages: int) -> None:
+    for _ in range(pages):
+        response = await client.get(url)
+        assert response.status_code == 200, response.status_code
+
+
+async def run(args):
+    create_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(Event.__table__.insert(), [
+            {"id": f"event-{i:07d}", "code": f"EVENT{i}", "name": f"Event {i}", "description": "Benchmark event" if i % 2 else None}
+            for i in range(args.page_size)
+        ])
+    field = list_route_field()
+    with SessionLocal() as db:
+        orm_rows = crud.get_events(db, 0, args.page_size)
+        rows = crud.get_event_rows(db, 0, args.page_size)
+    objects = [as_row(values) for values in rows]
+
+    async def validated(page):
+        content = await serialize_response(field=field, response_content=page)
+        return JSONResponse(content).body
+
+    assert json.loads(await validated(orm_rows)) == json.loads(dump_rows(rows))
+
+    # serialize_response is a coroutine, so each variant awaits its pages in one loop
+    async def pages_of(encode):
+        started = time.perf_counter()
+        for _ in range(args.pages):
+            await encode()
+        return time.perf_counter() - started
+
+    timings = {"orm_validated": [], "rows_validated": [], "rows_orjson": []}
+    for _ in range(args.rounds):
+        timings["orm_validated"].append(await pages_of(lambda: validated(orm_rows)))
+        timings["rows_validated"].append(await pages_of(lambda: validated(objects)))
+        started = time.perf_counter()
+        for _ in range(args.pages):
+            dump_rows(rows)
+        timings["rows_orjson"].append(time.perf_counter() - started)
+    total_rows = args.pages * args.page_size
+    serialize = {name: round(min(values) / total_rows * 1e6, 3) for name, values in timings.items()}
+
+    url = f"/api/events/?limit={args.page_size}"
+    request = {"validated": [], "orjson": []}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            await serve(client, url, 3)
+            for round_ in range(args.rounds):
+                for validate in ((False, True) if round_ % 2 == 0 else (True, False)):
+                    settings.validate_list_responses = validate
+                    started = time.perf_counter()
+                    await serve(client, url, args.pages)
+                    request["validated" if validate else "orjson"].append(time.perf_counter() - started)
+    settings.validate_list_responses = False
+
+    print(json.dumps({
+        "page_size": args.page_size,
+        "pages": args.pages,
+        "rounds": args.rounds,
+        "serialize_ms_per_1000_rows": serialize,
+        "request_ms_per_1000_rows": {name: round(min(values) / total_rows * 1e6, 3) for name, values in request.items()},
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
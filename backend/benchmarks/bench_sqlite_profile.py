@@ -0,0 +1,110 @@
+"""Mixed read/write throughput on file SQLite: default settings vs the production profile.
+
+    python benchmarks/bench_sqlite_profile.py --threads 16 --seconds 10 --write-ratio 0.2
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from crud import event_offer as crud
+from database import RoutingSession, WRITER_POOL_OPTIONS, use_sqlite_profile
+from models.base import Base
+from models.event_offer import Event
+from schemas.event_offer import EventUpdate
+from services.cache import NullCache, configure_cache
+
+
+def seed(engine, events: int) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Event.__table__.insert(), [
+            {"id": f"event-{i}", "code": f"EVENT{i}", "name": f"Event {i}"} for i in range(events)
+        ])
+
+
+def session_factory(profile: str, threads: int, busy_timeout: float):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite:///{path}"
+    connect_args = {"check_same_thread": False, "timeout": busy_timeout}
+    engine = create_engine(url, connect_args=connect_args, pool_size=threads, max_overflow=-1)
+    if profile == "default":
+        return engine, sessionmaker(bind=engine, autoflush=False)
+    writer = create_engine(url, connect_args=connect_args, **WRITER_POOL_OPTIONS)
+    use_sqlite_profile(engine)
+    use_sqlite_profile(writer, writer=True)
+    return engine, sessionmaker(bind=engine, autoflush=False, class_=RoutingSession, info={"writer": writer})
+
+
+def worker(factory, events, write_ratio, deadline, seed_value, out):
+    rng = random.Random(seed_value)
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        event_id = f"event-{rng.randrange(events)}"
+        started = time.perf_counter()
+        try:
+            with factory() as db:
+                if rng.random() < write_ratio:
+                    crud.update_event(db, event_id, EventUpdate(code=event_id.replace("event-", "EVENT"), name=str(started)))
+                else:
+                    crud.get_event(db, event_id)
+                    crud.get_events(db, skip=rng.randrange(events - 100), limit=100)
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    out.append((latencies, errors))
+
+
+def run(profile, args):
+    engine, factory = session_factory(profile, args.threads, args.busy_timeout)
+    seed(engine, args.events)
+    out = []
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=worker, args=(factory, args.events, args.write_ratio, deadline, i, out))
+        for i in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies = sorted(sample for samples, _ in out for sample in samples)
+    return {
+        "ops_per_second": round(len(latencies) / args.seconds, 1),
+        "lock_errors": sum(errors for _, errors in out),
+        "p50_ms": round(statistics.median(latencies) * 1e3, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1e3, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--busy-timeout", type=float, default=5.0, help="driver lock wait (s); 5.0 is the sqlite3 default")
+    args = parser.parse_args()
+
+    # Measure the database, not the read cache
+    configure_cache(NullCache())
+    print(json.dumps({
+        "threads": args.threads, "write_ratio": args.write_ratio,
+        "default": run("default", args), "production": run("production", args),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
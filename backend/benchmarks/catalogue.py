@@ -0,0 +1,155 @@
+"""Seeded synthetic catalogue of events, offers and event_offer links in a SQLite file.
+
+The same arguments always produce the same rows. Offer popularity is skewed, so a few
+offers carry many links. The last --reserved-offers fraction of offers is never
+linked, which lets load scenarios create links that cannot collide. A <database>.json
+file next to the database records the arguments, so a matching catalogue is reused
+instead of being rebuilt.
+
+    python benchmarks/catalogue.py --database /tmp/catalogue.db --events 100000 --offers 50000 --links-per-event 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, literal, select
+
+from migrations import create_schema
+from models.change import EntityChange
+from models.event_offer import Event, Offer, event_offer_association
+
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+QUEUES = [f"queue-{i}" for i in range(8)]
+TARGET_SYSTEMS = ["crm", "sms", "email", "push", "web", "pos"]
+DELAYS = [0, 0, 0, 5, 15, 60, 240, 1440]
+WORDS = "spring summer autumn winter gold silver bonus loyalty welcome weekend flash club".split()
+CHUNK = 20000
+# Recorded with the arguments: bump it when the schema changes so older catalogues are rebuilt
+FORMAT = 5
+
+
+def event_id(index: int) -> str:
+    return f"event-{index:07d}"
+
+
+def offer_id(index: int) -> str:
+    return f"offer-{index:07d}"
+
+
+def offer_code(index: int) -> str:
+    return f"OFFER{index:07d}"
+
+
+def linkable_offers(offers: int, reserved_offers: float) -> int:
+    return max(1, int(offers * (1 - reserved_offers)))
+
+
+def _name(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(3)).title()
+
+
+def _insert(conn, table, rows) -> None:
+    for start in range(0, len(rows), CHUNK):
+        conn.execute(table.insert(), rows[start:start + CHUNK])
+
+
+def generate(database: str, events: int, offers: int, links_per_event: int, reserved_offers: float = 0.1, seed: int = 1) -> dict:
+    """Build the catalogue (or reuse a matching one) and return its parameters."""
+    params = {
+        "events": events, "offers": offers, "links_per_event": links_per_event,
+        "reserved_offers": reserved_offers, "seed": seed, "format": FORMAT,
+    }
+    meta_path = f"{database}.json"
+    if os.path.exists(database) and os.path.exists(meta_path):
+        with open(meta_path) as meta:
+            if json.load(meta) == params:
+                return params
+        os.remove(database)
+    elif os.path.exists(database):
+        os.remove(database)
+
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{database}")
+
+    @event.listens_for(engine, "connect")
+    def bulk_load_pragmas(dbapi_connection, connection_record):
+        # A throwaway build: no need to survive a crash half way
+        dbapi_connection.execute("PRAGMA journal_mode=OFF")
+        dbapi_connection.execute("PRAGMA synchronous=OFF")
+
+    # Stamped with the current revision, so the app starts on it
+    create_schema(engine)
+    linkable = linkable_offers(offers, reserved_offers)
+    with engine.begin() as conn:
+        _insert(conn, Event.__table__, [
+            {
+                "id": event_id(i), "code": f"EVENT{i:07d}", "name": _name(rng),
+                "lifetime_hours": rng.choice([0, 24, 72, 168]), "disable_all_campaigns": rng.random() < 0.02,
+                "queue_name": rng.choice(QUEUES),
+                "created_at": EPOCH + timedelta(seconds=i), "updated_at": EPOCH + timedelta(seconds=i),
+            }
+            for i in range(events)
+        ])
+        _insert(conn, Offer.__table__, [
+            {
+                "id": offer_id(i), "code": offer_code(i), "name": _name(rng),
+                "priority": rng.randint(1, 10), "target_system": rng.choice(TARGET_SYSTEMS),
+                "created_at": EPOCH + timedelta(seconds=i), "updated_at": EPOCH + timedelta(seconds=i),
+            }
+            for i in range(offers)
+        ])
+        per_event = min(links_per_event, linkable)
+        for start in range(0, events, CHUNK):
+            links = []
+            for e in range(start, min(start + CHUNK, events)):
+                chosen = set()
+                while len(chosen) < per_event:
+                    # Squaring skews towards low indexes: popular offers get most links
+                    chosen.add(int(linkable * rng.random() ** 2))
+                links.extend(
+                    {"event_id": event_id(e), "offer_id": offer_id(o), "delay_minutes": rng.choice(DELAYS),
+                     "action_type": "disable" if rng.random() < 0.1 else "enable"}
+                    for o in sorted(chosen)
+                )
+            _insert(conn, event_offer_association, links)
+        # Every entity's first change, as the entity_changes migration backfills them
+        log, link = EntityChange.__table__, event_offer_association.c
+        for kind, keys in (
+            ("event", select(Event.id, literal("")).order_by(Event.id)),
+            ("offer", select(Offer.id, literal("")).order_by(Offer.id)),
+            ("link", select(link.event_id, link.offer_id).order_by(link.event_id, link.offer_id)),
+        ):
+            keys = keys.subquery()
+            conn.execute(log.insert().from_select(
+                ["kind", "entity_id", "linked_id", "op", "changed_at"],
+                select(literal(kind), *keys.c, literal("upserted"), literal(EPOCH, log.c.changed_at.type)),
+            ))
+    engine.dispose()
+    with open(meta_path, "w") as meta:
+        json.dump(params, meta)
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--offers", type=int, default=50000)
+    parser.add_argument("--links-per-event", type=int, default=20)
+    parser.add_argument("--reserved-offers", type=float, default=0.1, help="fraction of offers left without links")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    params = generate(args.database, args.events, args.offers, args.links_per_event, args.reserved_offers, args.seed)
+    print(json.dumps({**params, "links": args.events * min(args.links_per_event, linkable_offers(args.offers, args.reserved_offers)),
+                      "seconds": round(time.perf_counter() - started, 1)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
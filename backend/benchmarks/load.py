@@ -0,0 +1,250 @@
+"""Load scenarios against a synthetic catalogue, compared with a stored baseline.
+
+Scenarios:
+  list     GET /api/events/ pages of 50 from the first 200 pages
+  detail   GET /api/events/{id} for random catalogue events
+  create   POST /api/events/ with new events
+  link     POST /api/event-offers/ linking random events to the offers the catalogue
+           leaves unlinked
+  update   PUT /api/offers/{id} changing a random offer's priority
+
+The catalogue (benchmarks/catalogue.py) is built once per size and copied for each run,
+so every run starts from the same rows. The app is driven in-process through
+httpx.ASGITransport (lifespan included), or with --uvicorn as a separate local uvicorn
+process. Each scenario runs --concurrency clients until --requests requests (after
+--warmup) have completed. The report is JSON with throughput and p50/p95/p99 latency per
+scenario.
+
+With --baseline, the run fails (exit status 1) when a scenario's p95 rises, or its
+throughput falls, by more than --tolerance, or when it has errors the baseline did not.
+Baselines only hold for the machine and settings they were recorded with.
+--save-baseline records one.
+
+    python benchmarks/load.py --scale full --concurrency 16 --requests 5000
+    python benchmarks/load.py --scale small --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+import catalogue
+
+SCALES = {
+    "small": {"events": 5000, "offers": 2500, "links_per_event": 10},
+    "medium": {"events": 20000, "offers": 10000, "links_per_event": 20},
+    "full": {"events": 100000, "offers": 50000, "links_per_event": 20},
+}
+SCENARIOS = ("list", "detail", "create", "link", "update")
+
+
+class Scenario:
+    """Builds the requests of one scenario; ``request(n)`` returns (method, url, json body)."""
+
+    def __init__(self, name: str, size: dict, rng: random.Random):
+        self.name = name
+        self.size = size
+        self.rng = rng
+        self.first_free_offer = catalogue.linkable_offers(size["offers"], size["reserved_offers"])
+        self.linked = set()
+
+    def request(self, n: int):
+        rng, size = self.rng, self.size
+        if self.name == "list":
+            return "GET", f"/api/events/?skip={rng.randrange(200) * 50}&limit=50", None
+        if self.name == "detail":
+            return "GET", f"/api/events/{catalogue.event_id(rng.randrange(size['events']))}", None
+        if self.name == "create":
+            return "POST", "/api/events/", {"id": f"load-event-{n}", "code": f"LOAD{n}", "name": "Load Event"}
+        if self.name == "link":
+            while True:
+                pair = (rng.randrange(size["events"]), rng.randrange(self.first_free_offer, size["offers"]))
+                if pair not in self.linked:
+                    self.linked.add(pair)
+                    break
+            return "POST", "/api/event-offers/", {
+                "event_id": catalogue.event_id(pair[0]), "offer_id": catalogue.offer_id(pair[1]), "delay_minutes": 15,
+            }
+        if self.name == "update":
+            offer = rng.randrange(size["offers"])
+            return "PUT", f"/api/offers/{catalogue.offer_id(offer)}", {
+                "code": catalogue.offer_code(offer), "name": "Updated Offer", "priority": rng.randint(1, 10),
+            }
+        raise ValueError(self.name)
+
+
+def percentile(values: list, fraction: float) -> float:
+    # Nearest rank on sorted values
+    return values[max(0, min(len(values) - 1, math.ceil(fraction * len(values)) - 1))]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, warmup: int, concurrency: int) -> dict:
+    issued, latencies, errors = 0, [], 0
+
+    async def worker():
+        nonlocal issued, errors
+        while issued < warmup + requests:
+            n = issued
+            issued += 1
+            method, url, body = scenario.request(n)
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            elapsed = time.perf_counter() - started
+            if n >= warmup:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    # Warmup requests finish first, so the window from the start overstates it only slightly
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / seconds, 1),
+        **{f"p{p}_ms": round(percentile(latencies, p / 100) * 1000, 2) for p in (50, 95, 99)},
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def run_in_process(database: str, scenarios, args, size) -> dict:
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    from main import app
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+            for name in scenarios:
+                results[name] = await run_scenario(client, Scenario(name, size, random.Random(args.seed)), args.requests, args.warmup, args.concurrency)
+    return results
+
+
+async def run_uvicorn(database: str, scenarios, args, size) -> dict:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"},
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+            for _ in range(300):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            results = {}
+            for name in scenarios:
+                results[name] = await run_scenario(client, Scenario(name, size, random.Random(args.seed)), args.requests, args.warmup, args.concurrency)
+            return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    if baseline["config"] != report["config"]:
+        return [f"baseline was recorded with {baseline['config']}, this run used {report['config']}"]
+    regressions = []
+    for name, result in report["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput_rps']}/s vs baseline {base['throughput_rps']}/s")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: {result['errors']} errors vs baseline {base['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--events", type=int, help="override the scale's event count")
+    parser.add_argument("--offers", type=int, help="override the scale's offer count")
+    parser.add_argument("--links-per-event", type=int, help="override the scale's links per event")
+    parser.add_argument("--reserved-offers", type=float, default=0.1)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated, run in this order")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests before each scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--uvicorn", action="store_true", help="serve from a local uvicorn process instead of in-process")
+    parser.add_argument("--catalogue-dir", default=os.path.join(tempfile.gettempdir(), "event-offer-catalogues"))
+    parser.add_argument("--baseline", help="fail when this run regresses against the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95/throughput change")
+    parser.add_argument("--save-baseline", help="write this run's report to the given file")
+    args = parser.parse_args()
+
+    size = dict(SCALES[args.scale], reserved_offers=args.reserved_offers)
+    for key in ("events", "offers", "links_per_event"):
+        if getattr(args, key) is not None:
+            size[key] = getattr(args, key)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    os.makedirs(args.catalogue_dir, exist_ok=True)
+    source = os.path.join(args.catalogue_dir, "catalogue-{events}-{offers}-{links_per_event}-{reserved_offers}-{seed}.db".format(seed=args.seed, **size))
+    started = time.perf_counter()
+    catalogue.generate(source, size["events"], size["offers"], size["links_per_event"], size["reserved_offers"], args.seed)
+    catalogue_seconds = time.perf_counter() - started
+    workdir = tempfile.mkdtemp()
+    database = os.path.join(workdir, "load.db")
+    shutil.copyfile(source, database)
+
+    try:
+        runner = run_uvicorn if args.uvicorn else run_in_process
+        results = asyncio.run(runner(database, scenarios, args, size))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "config": {
+            **size, "seed": args.seed, "concurrency": args.concurrency, "requests": args.requests,
+            "warmup": args.warmup, "mode": "uvicorn" if args.uvicorn else "in-process",
+        },
+        "catalogue_seconds": round(catalogue_seconds, 1),
+        "scenarios": results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as out:
+            json.dump(report, out, indent=2)
+            out.write("\n")
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as stored:
+            regressions = compare(report, json.load(stored), args.tolerance)
+        report["regressions"] = regressions
+    print(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
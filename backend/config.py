@@ -0,0 +1,135 @@
+from typing import Dict, List, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Database URL - using SQLite for simplicity
+    database_url: str = "sqlite:///./app.db"
+    # Derived from database_url when not set (sqlite -> aiosqlite, postgresql -> asyncpg)
+    async_database_url: Optional[str] = None
+    # "async" serves the API from AsyncSession routes, "sync" from the threadpool routes
+    db_mode: str = "async"
+    # Sync routes keep their connection checked out while FastAPI validates the response
+    # in another worker thread, so a pool smaller than the threadpool can deadlock
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    # Startup (lifecycle.py): "verify" refuses to start unless the database is at the
+    # Alembic revision the code expects, "upgrade" migrates it there first (one process
+    # only: concurrent workers would race), "off" skips the check
+    schema_on_startup: str = "verify"
+    # Connections opened per pool before the first request, whether the hot read
+    # statements and the first list pages are loaded then too, and whether the resolution
+    # index is (all events, offers and links: the bulk of the startup time on a large
+    # catalogue, which the first /api/resolve call pays for otherwise)
+    warm_pool_connections: int = 4
+    warm_on_startup: bool = True
+    warm_resolution_index: bool = True
+    # "production" turns on WAL and the pragmas below for file-backed SQLite and sends all
+    # writes through one serialized writer connection; "default" leaves SQLite as is
+    sqlite_profile: str = "default"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+    # How long a write waits for the writer connection before failing
+    sqlite_writer_timeout: float = 30.0
+    # Read-through cache for event/offer reads: "memory" (per process) or "none"
+    cache_backend: str = "memory"
+    cache_max_entries: int = 10000
+    cache_ttl_seconds: float = 30.0
+
+    # List pages are serialized straight from row dicts to JSON bytes (orjson); true sends
+    # them through the response_model validation instead, e.g. to debug a schema mismatch
+    validate_list_responses: bool = False
+
+    # Rows per transaction for the bulk import endpoints
+    bulk_chunk_size: int = 500
+    # Batch lookups by id: ids per request, and ids per IN (...) query (well below
+    # SQLite's limit on bound parameters)
+    batch_max_ids: int = 1000
+    batch_chunk_size: int = 500
+    # Change feed (GET /api/changes and its event stream): changes per page, how long
+    # deletions stay in the log, how often it is compacted, and how often an open stream
+    # looks for commits made by other processes
+    changes_page_size: int = 1000
+    changes_retention_seconds: float = 7 * 24 * 3600
+    changes_compact_seconds: float = 3600.0
+    changes_poll_seconds: float = 1.0
+
+    # Event expiry: an event with a lifetime expires lifetime_hours after its creation and
+    # reads leave it out from then on (false turns both that and the sweeper off). Every
+    # expiry_sweep_seconds the sweeper deletes expired events and their links, at most
+    # expiry_batch_size events per transaction and expiry_batch_pause_seconds apart, so
+    # foreground writes wait for one short batch at most.
+    expiry_enabled: bool = True
+    expiry_sweep_seconds: float = 60.0
+    expiry_batch_size: int = 500
+    expiry_batch_pause_seconds: float = 0.05
+
+    # Event-occurrence ingest: one bounded queue per Event.queue_name; a full queue
+    # answers 429. Workers persist up to ingest_batch_size occurrences per transaction,
+    # waiting at most ingest_batch_wait_seconds for a batch to fill.
+    ingest_queue_size: int = 50000
+    ingest_batch_size: int = 1000
+    ingest_batch_wait_seconds: float = 0.02
+    ingest_workers_per_queue: int = 1
+    # Delayed offer actions: timing-wheel resolution and shape (slots ** levels ticks
+    # before a timer waits in the overflow set; 64 ** 4 seconds is about 194 days)
+    scheduler_tick_seconds: float = 1.0
+    scheduler_wheel_slots: int = 64
+    scheduler_wheel_levels: int = 4
+    # Outbox delivery to Offer.target_system: each target's messages are POSTed to its URL in
+    # outbox_target_urls, or to outbox_default_url with {target_system} filled in; targets
+    # with neither get no messages at all. Each target is delivered to by its own loop, with
+    # up to outbox_target_concurrency batches of outbox_batch_size in flight (1 keeps its
+    # messages in order), and a failed batch holds its target back for
+    # outbox_backoff_seconds, doubling per attempt up to outbox_max_backoff_seconds.
+    outbox_target_urls: Dict[str, str] = {}
+    outbox_default_url: Optional[str] = None
+    outbox_batch_size: int = 200
+    outbox_fetch_size: int = 5000
+    outbox_target_concurrency: int = 1
+    outbox_poll_seconds: float = 0.5
+    outbox_backoff_seconds: float = 1.0
+    outbox_max_backoff_seconds: float = 300.0
+    outbox_timeout_seconds: float = 10.0
+
+    # Admission control for /api requests, per route class (read, write, bulk): at most
+    # admission_max_concurrency requests of a class run at once, up to admission_queue_size
+    # more wait for admission_queue_timeout_seconds, and the rest get 503 + Retry-After.
+    # A class whose requests take longer than admission_latency_target_seconds lowers its
+    # own limit, and raises it back towards the maximum once they are fast again. The
+    # default maximums add up to less than the 40 threads that run the sync routes.
+    admission_enabled: bool = True
+    admission_max_concurrency: Dict[str, int] = {"read": 24, "write": 8, "bulk": 2}
+    admission_queue_size: Dict[str, int] = {"read": 32, "write": 16, "bulk": 4}
+    admission_queue_timeout_seconds: Dict[str, float] = {"read": 0.5, "write": 1.0, "bulk": 10.0}
+    admission_latency_target_seconds: Dict[str, float] = {"read": 0.25, "write": 0.5, "bulk": 10.0}
+    # Long-lived responses, which would hold a slot for as long as the client stays
+    admission_exempt_paths: List[str] = ["/api/changes/stream"]
+
+    # Prometheus /metrics plus the request/SQL instrumentation behind it
+    metrics_enabled: bool = True
+    # Statements at least this slow are logged (logger "sql.slow") with the route that
+    # issued them; None turns the log off
+    slow_query_seconds: Optional[float] = None
+
+    # Keycloak access-token verification (done locally against the realm JWKS)
+    auth_enabled: bool = False
+    keycloak_server_url: str = "http://keycloak:8080"
+    keycloak_realm: str = "myrealm"
+    keycloak_client_id: str = "fastapi-client"
+    # Tokens carry the issuer the client saw (e.g. localhost:8080), which may differ from keycloak_server_url
+    keycloak_issuer: Optional[str] = None
+    keycloak_audience: Optional[str] = None
+    # Realm roles required on top of a valid token, split by safe (read) and unsafe (write) methods
+    auth_read_roles: List[str] = []
+    auth_write_roles: List[str] = []
+    # Minimum gap between JWKS downloads triggered by an unknown kid
+    jwks_min_refresh_seconds: float = 10.0
+    token_cache_ttl_seconds: float = 60.0
+    token_cache_size: int = 10000
+
+
+settings = Settings()
@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# config.settings is read once at import, so the throwaway test database has to be
+# chosen before any test module (or anything it imports) loads config.py
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+# The tests build their tables with create_all, unstamped, so app startup skips the
+# revision check (test_lifecycle turns it back on)
+os.environ.setdefault("SCHEMA_ON_STARTUP", "off")
@@ -1,10 +1,217 @@
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete
-from typing import List, Optional
+from sqlalchemy import select, insert, update, delete, case, exists, false, func, literal, literal_column, or_, table, text, tuple_
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+from config import settings
+from models.base import utcnow
+from models.change import EntityChange
 from models.event_offer import Event, Offer, event_offer_association
-from schemas.event_offer import EventCreate, EventUpdate, OfferCreate, OfferUpdate, EventOfferCreate, EventOfferUpdate
+from models.search import search_table
+from schemas import event_offer as schemas
+from schemas.event_offer import EventCreate, EventUpdate, EventFilter, OfferCreate, OfferUpdate, OfferFilter, EventOfferCreate, EventOfferUpdate, EventOfferFilter
+from etag import PreconditionFailed, check_if_match
+from fieldsets import Fieldset
+from pagination import decode_cursor, decode_key_cursor
+from services.cache import as_row, entity_cache
+from services.changes import HORIZON_KIND, ChangesCompacted, read_horizon, record_changes
+from services.resolution_index import resolution_index
+from services.outbox import enqueue_event_deleted, enqueue_events_deleted, enqueue_link, enqueue_link_deleted, enqueue_links, enqueue_offer, enqueue_offers
+from services.scheduler import action_scheduler
+import re
 import uuid
 
+def _page(stmt, model, skip: int, limit: int, cursor: Optional[str]):
+    stmt = stmt.order_by(model.id).limit(limit)
+    if cursor is not None:
+        # Keyset pagination: seek past the last id instead of scanning `skip` rows
+        return stmt.where(model.id > decode_cursor(cursor))
+    return stmt.offset(skip)
+
+def _values(entity) -> Optional[dict]:
+    if entity is None:
+        return None
+    return {column.key: getattr(entity, column.key) for column in entity.__table__.columns}
+
+def _response_columns(model, schema) -> list:
+    # Selected in the response schema's field order, so a row dict serializes exactly like
+    # the validated model would
+    return [model.__table__.c[name] for name in schema.model_fields]
+
+EVENT_COLUMNS = _response_columns(Event, schemas.Event)
+OFFER_COLUMNS = _response_columns(Offer, schemas.Offer)
+
+def _projected(columns: list, fields: Optional[Fieldset]) -> list:
+    # Only a sparse fieldset's columns go into the SELECT
+    if fields is None:
+        return columns
+    return [column for column in columns if column.key in fields.selected]
+
+def _row_page(db: Session, stmt, model, skip: int, limit: int, cursor: Optional[str]) -> List[dict]:
+    return [dict(row) for row in db.execute(_page(stmt, model, skip, limit, cursor)).mappings()]
+
+def _list_params(skip: int, limit: int, cursor: Optional[str], filters: Optional[BaseModel], fields: Optional[Fieldset] = None) -> tuple:
+    # Cache key of a list page; unfiltered pages keep the plain (skip, limit, cursor) key,
+    # and a sparse fieldset's page is cached apart from the full one
+    active = filters.model_dump(exclude_none=True) if filters is not None else {}
+    params = (skip, limit, cursor, tuple(sorted(active.items()))) if active else (skip, limit, cursor)
+    return params + (str(fields),) if fields is not None else params
+
+def _search_terms(q: Optional[str]) -> List[str]:
+    # Words as the FTS5 tokenizer sees them; anything else only separates them
+    return re.findall(r"\w+", q or "")
+
+def _search(db: Session, stmt, model, q: Optional[str]):
+    terms = _search_terms(q)
+    if not terms:
+        return stmt
+    if db.get_bind().dialect.name != "sqlite":
+        # No FTS5 index: every word as a case-insensitive substring of name or description
+        return stmt.where(*(
+            or_(model.name.icontains(term, autoescape=True), model.description.icontains(term, autoescape=True))
+            for term in terms
+        ))
+    fts = search_table(model.__tablename__)
+    # Quoted so no word is read as an FTS5 operator; * makes each one a prefix
+    match = " ".join(f'"{term}"*' for term in terms)
+    rowids = select(literal_column("rowid")).select_from(table(fts)).where(text(f"{fts} MATCH :match").bindparams(match=match))
+    return stmt.where(literal_column(f"{model.__tablename__}.rowid").in_(rowids))
+
+def _between(db: Session, stmt, column, low: Optional[int], high: Optional[int]):
+    if low is not None and low == high:
+        # An equality reads the (column, id) index in page order
+        return stmt.where(column == low)
+    if db.get_bind().dialect.name == "sqlite":
+        # Without STAT4 statistics SQLite always takes the (column, id) index for a range and
+        # then sorts the whole range by id. These columns have few distinct values, so walking
+        # the id order until the page is full is cheaper; "+ 0" keeps the index out of it
+        column = column + 0
+    if low is not None:
+        stmt = stmt.where(column >= low)
+    if high is not None:
+        stmt = stmt.where(column <= high)
+    return stmt
+
+def _filter_events(db: Session, stmt, filters: Optional[EventFilter]):
+    if filters is None:
+        return stmt
+    if filters.queue_name is not None:
+        stmt = stmt.where(Event.queue_name == filters.queue_name)
+    if filters.disable_all_campaigns is not None:
+        stmt = stmt.where(Event.disable_all_campaigns == filters.disable_all_campaigns)
+    stmt = _between(db, stmt, Event.lifetime_hours, filters.min_lifetime_hours, filters.max_lifetime_hours)
+    return _search(db, stmt, Event, filters.q)
+
+def _filter_offers(db: Session, stmt, filters: Optional[OfferFilter]):
+    if filters is None:
+        return stmt
+    if filters.target_system is not None:
+        stmt = stmt.where(Offer.target_system == filters.target_system)
+    stmt = _between(db, stmt, Offer.priority, filters.min_priority, filters.max_priority)
+    return _search(db, stmt, Offer, filters.q)
+
+# Expiry. An event with a lifetime expires lifetime_hours after it was created; from then on
+# the reads, the writes, the export and the resolution index treat it (and its links) as
+# deleted, and services/expiry.py deletes it. Rows are checked as they are read, cached
+# entities included, but a cached list page is not read again: it can show an expired
+# event until its TTL runs out or the sweep invalidates it.
+def expiry_for(created_at: datetime, lifetime_hours: Optional[int]) -> Optional[datetime]:
+    return created_at + timedelta(hours=lifetime_hours) if lifetime_hours and lifetime_hours > 0 else None
+
+def _expiry_expression(db: Session, created_at, lifetime_hours):
+    # expiry_for in SQL, for the writes that keep an existing row's created_at
+    if db.get_bind().dialect.name == "sqlite":
+        # Written in the text format SQLAlchemy stores DateTime in, so it compares with the
+        # bound datetimes of the reads
+        expires_at = func.strftime("%Y-%m-%d %H:%M:%f000", created_at, literal("+").concat(lifetime_hours).concat(" hours"))
+    else:
+        expires_at = created_at + func.make_interval(0, 0, 0, 0, lifetime_hours)
+    return case((lifetime_hours > 0, expires_at), else_=None)
+
+def _expired(expires_at: Optional[datetime]) -> bool:
+    if expires_at is None or not settings.expiry_enabled:
+        return False
+    # SQLite hands DateTime(timezone=True) back naive; every stored time is UTC
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at <= utcnow()
+
+def _unexpired(stmt):
+    if not settings.expiry_enabled:
+        return stmt
+    return stmt.where(or_(Event.expires_at.is_(None), Event.expires_at > utcnow()))
+
+def _unexpired_links(stmt):
+    # Few events are expired at a time (the sweeper deletes them), so their ids are one
+    # range of ix_events_expires_at rather than a join from every link
+    if not settings.expiry_enabled:
+        return stmt
+    expired = select(Event.id).where(Event.expires_at <= utcnow())
+    return stmt.where(event_offer_association.c.event_id.not_in(expired))
+
+def _load_by_ids(db: Session, model, entity_ids: List[str], columns: Optional[list] = None) -> dict:
+    found = {}
+    for start in range(0, len(entity_ids), settings.batch_chunk_size):
+        stmt = select(*(columns or model.__table__.c)).where(model.id.in_(entity_ids[start:start + settings.batch_chunk_size]))
+        for row in db.execute(stmt).mappings():
+            found[row["id"]] = dict(row)
+    return found
+
+def _get_batch(db: Session, kind: str, model, entity_ids: List[str], columns: Optional[list] = None) -> Tuple[List[dict], List[str]]:
+    # Each id once, in request order; the cache holds the same entries as the single reads
+    wanted = list(dict.fromkeys(entity_ids))
+    if columns is None:
+        found = entity_cache.get_entities(kind, wanted, lambda missing: _load_by_ids(db, model, missing))
+    else:
+        found = _peek_entities(kind, wanted)
+        found.update(_load_by_ids(db, model, [entity_id for entity_id in wanted if entity_id not in found], columns))
+    # Expired events are reported missing, like deleted ones
+    found = {entity_id: values for entity_id, values in found.items() if not _expired(values.get("expires_at"))}
+    return [found[entity_id] for entity_id in wanted if entity_id in found], [entity_id for entity_id in wanted if entity_id not in found]
+
+def _peek_entities(kind: str, entity_ids: List[str]) -> dict:
+    # For sparse fieldsets: cached rows are used, but partial rows are never cached
+    found = {}
+    for entity_id in entity_ids:
+        values = entity_cache.peek_entity(kind, entity_id)
+        if values is not None:
+            found[entity_id] = values
+    return found
+
+def _get_projected(db: Session, kind: str, model, entity_id: str, columns: list):
+    cached = entity_cache.peek_entity(kind, entity_id)
+    if cached is not None:
+        return as_row(cached)
+    row = db.execute(select(*columns).where(model.id == entity_id)).mappings().first()
+    return as_row(dict(row)) if row is not None else None
+
+# Write paths issue one INSERT/UPDATE/DELETE ... RETURNING and let the unique constraints
+# reject duplicates; the extra lookups in _raise_* only run once a write has failed
+class DuplicateEntity(Exception):
+    pass
+
+class MissingReference(LookupError):
+    pass
+
+def _returning(db: Session, stmt) -> Optional[SimpleNamespace]:
+    row = db.execute(stmt.returning(*stmt.table.c)).mappings().first()
+    return as_row(dict(row)) if row is not None else None
+
+def _raise_duplicate(db: Session, model, entity_id: str, code: str):
+    name = model.__name__
+    if db.execute(select(model.id).where(model.id == entity_id)).first() is not None:
+        raise DuplicateEntity(f"{name} with this id already exists")
+    raise DuplicateEntity(f"{name} with this code already exists")
+
+def _raise_link_conflict(db: Session, event_id: str, offer_id: str):
+    if db.execute(_unexpired(select(Event.id).where(Event.id == event_id))).first() is None:
+        raise MissingReference("Event not found")
+    if db.execute(select(Offer.id).where(Offer.id == offer_id)).first() is None:
+        raise MissingReference("Offer not found")
+    raise DuplicateEntity("Event-Offer association already exists")
+
 # Event CRUD operations
 def get_event(db: Session, event_id: str) -> Optional[Event]:
     return db.execute(select(Event).where(Event.id == event_id)).scalar_one_or_none()
@@ -12,38 +219,140 @@ def get_event(db: Session, event_id: str) -> Optional[Event]:
 def get_event_by_code(db: Session, code: str) -> Optional[Event]:
     return db.execute(select(Event).where(Event.code == code)).scalar_one_or_none()
 
-def get_events(db: Session, skip: int = 0, limit: int = 100) -> List[Event]:
-    return db.execute(select(Event).offset(skip).limit(limit)).scalars().all()
+def get_events(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[EventFilter] = None) -> List[Event]:
+    return db.execute(_page(_unexpired(_filter_events(db, select(Event), filters)), Event, skip, limit, cursor)).scalars().all()
+
+# Cached reads return plain rows (attribute access, no ORM state) for the GET routes
+def get_cached_event(db: Session, event_id: str, fields: Optional[Fieldset] = None):
+    if fields is not None:
+        row = _get_projected(db, "event", Event, event_id, _projected(EVENT_COLUMNS, fields) + [Event.expires_at])
+    else:
+        row = as_row(entity_cache.get_entity("event", event_id, lambda: _values(get_event(db, event_id))))
+    return None if row is None or _expired(row.expires_at) else row
+
+def get_event_rows(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[EventFilter] = None, fields: Optional[Fieldset] = None) -> List[dict]:
+    # Column dicts shared with the cache: callers must not modify them
+    return entity_cache.get_list("event", _list_params(skip, limit, cursor, filters, fields), lambda: _row_page(
+        db, _unexpired(_filter_events(db, select(*_projected(EVENT_COLUMNS, fields)), filters)), Event, skip, limit, cursor))
+
+def get_cached_events(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[EventFilter] = None):
+    return [as_row(values) for values in get_event_rows(db, skip, limit, cursor, filters)]
+
+def get_events_by_ids(db: Session, event_ids: List[str], fields: Optional[Fieldset] = None) -> Tuple[List[dict], List[str]]:
+    return _get_batch(db, "event", Event, event_ids, _projected(EVENT_COLUMNS, fields) + [Event.expires_at] if fields is not None else None)
 
-def create_event(db: Session, event: EventCreate) -> Event:
-    db_event = Event(**event.model_dump())
-    db.add(db_event)
+def get_event_version(db: Session, event_id: str):
+    cached = entity_cache.peek_entity("event", event_id)
+    if cached is not None:
+        return None if _expired(cached["expires_at"]) else as_row(cached)
+    return db.execute(_unexpired(select(Event.id, Event.updated_at).where(Event.id == event_id))).first()
+
+def get_event_versions(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[EventFilter] = None, fields: Optional[Fieldset] = None):
+    # Same page as get_events, reduced to what the list ETag needs
+    cached = entity_cache.peek_list("event", _list_params(skip, limit, cursor, filters, fields))
+    if cached is not None:
+        return [as_row(values) for values in cached]
+    return db.execute(_page(_unexpired(_filter_events(db, select(Event.id, Event.updated_at), filters)), Event, skip, limit, cursor)).all()
+
+def create_event(db: Session, event: EventCreate) -> SimpleNamespace:
+    try:
+        now = utcnow()
+        db_event = _returning(db, insert(Event.__table__).values(
+            **event.model_dump(), created_at=now, updated_at=now, expires_at=expiry_for(now, event.lifetime_hours)))
+    except IntegrityError:
+        db.rollback()
+        _raise_duplicate(db, Event, event.id, event.code)
+    record_changes(db, events=[db_event.id])
     db.commit()
-    db.refresh(db_event)
+    entity_cache.invalidate("event", db_event.id)
+    resolution_index.event_changed(
+        db_event.id, db_event.code, db_event.disable_all_campaigns, db_event.queue_name, db_event.lifetime_hours, db_event.expires_at)
     return db_event
 
-def update_event(db: Session, event_id: str, event_update: EventUpdate) -> Optional[Event]:
-    db_event = get_event(db, event_id)
+def update_event(db: Session, event_id: str, event_update: EventUpdate, if_match: Optional[str] = None) -> Optional[SimpleNamespace]:
+    values = event_update.model_dump(exclude_unset=True)
+    if "lifetime_hours" in values:
+        # Counted from creation, so a new lifetime can expire the event straight away
+        values["expires_at"] = _expiry_expression(db, Event.created_at, literal(values["lifetime_hours"] or 0))
+    # An expired event is gone for writes as it is for reads
+    stmt = _unexpired(update(Event.__table__).where(Event.id == event_id)).values(**values)
+    if if_match is not None:
+        version = get_event_version(db, event_id)
+        if version is None:
+            return None
+        check_if_match(if_match, version.id, version.updated_at)
+        # Compare-and-set so a write landing between the check above and this statement
+        # still fails the precondition instead of being overwritten
+        stmt = stmt.where(Event.updated_at == version.updated_at)
+    try:
+        db_event = _returning(db, stmt)
+    except IntegrityError:
+        db.rollback()
+        raise DuplicateEntity("Event with this code already exists")
     if db_event is None:
+        db.rollback()
+        if if_match is not None:
+            raise PreconditionFailed(event_id)
         return None
     
-    update_data = event_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_event, key, value)
-    
+    record_changes(db, events=[db_event.id])
     db.commit()
-    db.refresh(db_event)
+    entity_cache.invalidate("event", db_event.id)
+    resolution_index.event_changed(
+        db_event.id, db_event.code, db_event.disable_all_campaigns, db_event.queue_name, db_event.lifetime_hours, db_event.expires_at)
     return db_event
 
-def delete_event(db: Session, event_id: str) -> bool:
-    db_event = get_event(db, event_id)
-    if db_event is None:
+def delete_event(db: Session, event_id: str, if_match: Optional[str] = None) -> bool:
+    stmt = delete(Event.__table__).where(Event.id == event_id)
+    if if_match is not None:
+        version = get_event_version(db, event_id)
+        if version is None:
+            return False
+        check_if_match(if_match, version.id, version.updated_at)
+        stmt = stmt.where(Event.updated_at == version.updated_at)
+    if _returning(db, stmt) is None:
+        db.rollback()
+        if if_match is not None:
+            raise PreconditionFailed(event_id)
         return False
     
-    db.delete(db_event)
+    # The links have no ON DELETE CASCADE, so they go in the same transaction, after their
+    # targets have been told
+    enqueue_event_deleted(db, event_id)
+    offer_ids = db.execute(
+        delete(event_offer_association).where(event_offer_association.c.event_id == event_id).returning(event_offer_association.c.offer_id)
+    ).scalars().all()
+    record_changes(db, "deleted", events=[event_id], links=[(event_id, offer_id) for offer_id in offer_ids])
     db.commit()
+    entity_cache.invalidate("event", event_id)
+    entity_cache.invalidate("link")
+    resolution_index.event_deleted(event_id)
+    action_scheduler.event_deleted(event_id)
     return True
 
+def delete_expired_events(db: Session, limit: int, now: Optional[datetime] = None) -> Tuple[List[str], int]:
+    """Deletes up to ``limit`` events that expired by ``now``, oldest first, with their links
+    and everything delete_event records, in one transaction. Returns the deleted ids and
+    how many links went with them."""
+    due = select(Event.id).where(Event.expires_at <= (now or utcnow())).order_by(Event.expires_at).limit(limit)
+    event_ids = db.execute(delete(Event.__table__).where(Event.id.in_(due)).returning(Event.id)).scalars().all()
+    if not event_ids:
+        db.rollback()
+        return [], 0
+    enqueue_events_deleted(db, event_ids)
+    links = db.execute(
+        delete(event_offer_association).where(event_offer_association.c.event_id.in_(event_ids))
+        .returning(event_offer_association.c.event_id, event_offer_association.c.offer_id)
+    ).tuples().all()
+    record_changes(db, "deleted", events=event_ids, links=links)
+    db.commit()
+    entity_cache.invalidate("event", *event_ids)
+    entity_cache.invalidate("link")
+    for event_id in event_ids:
+        resolution_index.event_deleted(event_id)
+        action_scheduler.event_deleted(event_id)
+    return event_ids, len(links)
+
 # Offer CRUD operations
 def get_offer(db: Session, offer_id: str) -> Optional[Offer]:
     return db.execute(select(Offer).where(Offer.id == offer_id)).scalar_one_or_none()
@@ -51,74 +360,454 @@ def get_offer(db: Session, offer_id: str) -> Optional[Offer]:
 def get_offer_by_code(db: Session, code: str) -> Optional[Offer]:
     return db.execute(select(Offer).where(Offer.code == code)).scalar_one_or_none()
 
-def get_offers(db: Session, skip: int = 0, limit: int = 100) -> List[Offer]:
-    return db.execute(select(Offer).offset(skip).limit(limit)).scalars().all()
+def get_offers(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[OfferFilter] = None) -> List[Offer]:
+    return db.execute(_page(_filter_offers(db, select(Offer), filters), Offer, skip, limit, cursor)).scalars().all()
+
+# Cached reads return plain rows (attribute access, no ORM state) for the GET routes
+def get_cached_offer(db: Session, offer_id: str, fields: Optional[Fieldset] = None):
+    if fields is not None:
+        return _get_projected(db, "offer", Offer, offer_id, _projected(OFFER_COLUMNS, fields))
+    return as_row(entity_cache.get_entity("offer", offer_id, lambda: _values(get_offer(db, offer_id))))
+
+def get_offer_rows(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[OfferFilter] = None, fields: Optional[Fieldset] = None) -> List[dict]:
+    # Column dicts shared with the cache: callers must not modify them
+    return entity_cache.get_list("offer", _list_params(skip, limit, cursor, filters, fields), lambda: _row_page(
+        db, _filter_offers(db, select(*_projected(OFFER_COLUMNS, fields)), filters), Offer, skip, limit, cursor))
+
+def get_cached_offers(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[OfferFilter] = None):
+    return [as_row(values) for values in get_offer_rows(db, skip, limit, cursor, filters)]
+
+def get_offers_by_ids(db: Session, offer_ids: List[str], fields: Optional[Fieldset] = None) -> Tuple[List[dict], List[str]]:
+    return _get_batch(db, "offer", Offer, offer_ids, _projected(OFFER_COLUMNS, fields) if fields is not None else None)
 
-def create_offer(db: Session, offer: OfferCreate) -> Offer:
-    db_offer = Offer(**offer.model_dump())
-    db.add(db_offer)
+def get_offer_version(db: Session, offer_id: str):
+    cached = entity_cache.peek_entity("offer", offer_id)
+    if cached is not None:
+        return as_row(cached)
+    return db.execute(select(Offer.id, Offer.updated_at).where(Offer.id == offer_id)).first()
+
+def get_offer_versions(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[OfferFilter] = None, fields: Optional[Fieldset] = None):
+    # Same page as get_offers, reduced to what the list ETag needs
+    cached = entity_cache.peek_list("offer", _list_params(skip, limit, cursor, filters, fields))
+    if cached is not None:
+        return [as_row(values) for values in cached]
+    return db.execute(_page(_filter_offers(db, select(Offer.id, Offer.updated_at), filters), Offer, skip, limit, cursor)).all()
+
+def create_offer(db: Session, offer: OfferCreate) -> SimpleNamespace:
+    try:
+        db_offer = _returning(db, insert(Offer.__table__).values(**offer.model_dump()))
+    except IntegrityError:
+        db.rollback()
+        _raise_duplicate(db, Offer, offer.id, offer.code)
+    enqueue_offer(db, db_offer)
+    record_changes(db, offers=[db_offer.id])
     db.commit()
-    db.refresh(db_offer)
+    entity_cache.invalidate("offer", db_offer.id)
+    resolution_index.offer_changed(db_offer.id, db_offer.code, db_offer.priority, db_offer.target_system)
     return db_offer
 
-def update_offer(db: Session, offer_id: str, offer_update: OfferUpdate) -> Optional[Offer]:
-    db_offer = get_offer(db, offer_id)
+def update_offer(db: Session, offer_id: str, offer_update: OfferUpdate, if_match: Optional[str] = None) -> Optional[SimpleNamespace]:
+    stmt = update(Offer.__table__).where(Offer.id == offer_id).values(**offer_update.model_dump(exclude_unset=True))
+    if if_match is not None:
+        version = get_offer_version(db, offer_id)
+        if version is None:
+            return None
+        check_if_match(if_match, version.id, version.updated_at)
+        # Compare-and-set so a write landing between the check above and this statement
+        # still fails the precondition instead of being overwritten
+        stmt = stmt.where(Offer.updated_at == version.updated_at)
+    try:
+        db_offer = _returning(db, stmt)
+    except IntegrityError:
+        db.rollback()
+        raise DuplicateEntity("Offer with this code already exists")
     if db_offer is None:
+        db.rollback()
+        if if_match is not None:
+            raise PreconditionFailed(offer_id)
         return None
     
-    update_data = offer_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_offer, key, value)
-    
+    enqueue_offer(db, db_offer)
+    record_changes(db, offers=[db_offer.id])
     db.commit()
-    db.refresh(db_offer)
+    entity_cache.invalidate("offer", db_offer.id)
+    resolution_index.offer_changed(db_offer.id, db_offer.code, db_offer.priority, db_offer.target_system)
     return db_offer
 
-def delete_offer(db: Session, offer_id: str) -> bool:
-    db_offer = get_offer(db, offer_id)
+def delete_offer(db: Session, offer_id: str, if_match: Optional[str] = None) -> bool:
+    stmt = delete(Offer.__table__).where(Offer.id == offer_id)
+    if if_match is not None:
+        version = get_offer_version(db, offer_id)
+        if version is None:
+            return False
+        check_if_match(if_match, version.id, version.updated_at)
+        stmt = stmt.where(Offer.updated_at == version.updated_at)
+    db_offer = _returning(db, stmt)
     if db_offer is None:
+        db.rollback()
+        if if_match is not None:
+            raise PreconditionFailed(offer_id)
         return False
     
-    db.delete(db_offer)
+    # The links have no ON DELETE CASCADE, so they go in the same transaction
+    event_ids = db.execute(
+        delete(event_offer_association).where(event_offer_association.c.offer_id == offer_id).returning(event_offer_association.c.event_id)
+    ).scalars().all()
+    enqueue_offer(db, db_offer, "deleted")
+    record_changes(db, "deleted", offers=[offer_id], links=[(event_id, offer_id) for event_id in event_ids])
     db.commit()
+    entity_cache.invalidate("offer", offer_id)
+    entity_cache.invalidate("link")
+    resolution_index.offer_deleted(offer_id)
+    action_scheduler.offer_deleted(offer_id)
     return True
 
 # Event-Offer association CRUD operations
+def _link_filter(event_id: str, offer_id: str):
+    return (event_offer_association.c.event_id == event_id, event_offer_association.c.offer_id == offer_id)
+
 def create_event_offer_association(db: Session, association: EventOfferCreate):
-    # Insert into association table
-    stmt = event_offer_association.insert().values(
-        event_id=association.event_id,
-        offer_id=association.offer_id,
-        delay_minutes=association.delay_minutes,
-        action_type=association.action_type
+    # INSERT ... SELECT guarded by EXISTS so a missing event/offer inserts nothing instead of
+    # needing a lookup per side first (SQLite does not enforce the foreign keys)
+    values = association.model_dump()
+    source = select(*(literal(value, event_offer_association.c[name].type) for name, value in values.items())).where(
+        _unexpired(exists().where(Event.id == association.event_id)),
+        exists().where(Offer.id == association.offer_id),
     )
-    db.execute(stmt)
+    stmt = insert(event_offer_association).from_select(list(values), source)
+    try:
+        inserted = _returning(db, stmt)
+    except IntegrityError:
+        db.rollback()
+        inserted = None
+    if inserted is None:
+        db.rollback()
+        _raise_link_conflict(db, association.event_id, association.offer_id)
+    enqueue_link(db, association)
+    record_changes(db, links=[(association.event_id, association.offer_id)])
     db.commit()
+    entity_cache.invalidate("link", f"{association.event_id}:{association.offer_id}")
+    resolution_index.link_changed(association.event_id, association.offer_id, association.delay_minutes, association.action_type)
     return association
 
 def update_event_offer_association(db: Session, event_id: str, offer_id: str, association_update: EventOfferUpdate):
     update_data = association_update.model_dump(exclude_unset=True)
-    if update_data:
-        stmt = update(event_offer_association).where(
-            event_offer_association.c.event_id == event_id and 
-            event_offer_association.c.offer_id == offer_id
-        ).values(**update_data)
-        db.execute(stmt)
-        db.commit()
-    return get_event_offer_association(db, event_id, offer_id)
+    if not update_data:
+        return get_event_offer_association(db, event_id, offer_id)
+    stmt = _unexpired_links(update(event_offer_association).where(*_link_filter(event_id, offer_id))).values(**update_data)
+    db_association = _returning(db, stmt)
+    if db_association is None:
+        db.rollback()
+        return None
+    enqueue_link(db, db_association)
+    record_changes(db, links=[(event_id, offer_id)])
+    db.commit()
+    entity_cache.invalidate("link", f"{event_id}:{offer_id}")
+    resolution_index.link_changed(event_id, offer_id, db_association.delay_minutes, db_association.action_type)
+    action_scheduler.link_changed(event_id, offer_id)
+    return db_association
 
 def delete_event_offer_association(db: Session, event_id: str, offer_id: str) -> bool:
-    stmt = delete(event_offer_association).where(
-        event_offer_association.c.event_id == event_id and 
-        event_offer_association.c.offer_id == offer_id
-    )
-    result = db.execute(stmt)
+    result = db.execute(delete(event_offer_association).where(*_link_filter(event_id, offer_id)))
+    if result.rowcount == 0:
+        db.rollback()
+        return False
+    enqueue_link_deleted(db, event_id, offer_id)
+    record_changes(db, "deleted", links=[(event_id, offer_id)])
     db.commit()
-    return result.rowcount > 0
+    entity_cache.invalidate("link", f"{event_id}:{offer_id}")
+    resolution_index.link_deleted(event_id, offer_id)
+    action_scheduler.link_deleted(event_id, offer_id)
+    return True
 
 def get_event_offer_association(db: Session, event_id: str, offer_id: str):
-    stmt = select(event_offer_association).where(
-        event_offer_association.c.event_id == event_id and 
-        event_offer_association.c.offer_id == offer_id
+    return db.execute(_unexpired_links(select(event_offer_association).where(*_link_filter(event_id, offer_id)))).first()
+
+# Link lists. Links of one offer are paged in (offer_id, event_id) order from the covering
+# ix_event_offer_offer_id_event_id index, every other page in primary key order; links of one
+# action_type come from ix_event_offer_action_type_event_id, also covering. The cursor
+# carries both ids of the last link whichever order the page used.
+def link_cursor_key(row) -> List[str]:
+    return [row["event_id"], row["offer_id"]]
+
+def _by_offer(filters: Optional[EventOfferFilter]) -> bool:
+    return filters is not None and filters.offer_id is not None and filters.event_id is None
+
+def _filter_links(db: Session, stmt, filters: Optional[EventOfferFilter]):
+    if filters is None:
+        return stmt
+    c = event_offer_association.c
+    if filters.event_id is not None:
+        stmt = stmt.where(c.event_id == filters.event_id)
+    if filters.offer_id is not None:
+        stmt = stmt.where(c.offer_id == filters.offer_id)
+    if filters.action_type is not None:
+        action_type = c.action_type
+        if _by_offer(filters) and db.get_bind().dialect.name == "sqlite":
+            # Without statistics SQLite prefers the action_type index and would read every link
+            # of that type; "|| ''" keeps the plan on the offer's range of its own index
+            action_type = action_type.concat("")
+        stmt = stmt.where(action_type == filters.action_type)
+    return stmt
+
+def _link_statement(db: Session, skip: int, limit: int, cursor: Optional[str], filters: Optional[EventOfferFilter]):
+    c = event_offer_association.c
+    key = [c.offer_id, c.event_id] if _by_offer(filters) else [c.event_id, c.offer_id]
+    stmt = _unexpired_links(_filter_links(db, select(*c), filters)).order_by(*key).limit(limit)
+    if cursor is None:
+        stmt = stmt.offset(skip)
+    else:
+        event_id, offer_id = decode_key_cursor(cursor, 2)
+        last = {"event_id": event_id, "offer_id": offer_id}
+        # Key columns pinned by the filters are left out of the comparison, which keeps it a
+        # seek within the pinned range (a row value over all of them only narrows the prefix)
+        free = [column for column in key if getattr(filters, column.key, None) is None]
+        if not free:
+            stmt = stmt.where(false())
+        elif len(free) == 1:
+            stmt = stmt.where(free[0] > last[free[0].key])
+        else:
+            stmt = stmt.where(tuple_(*free) > tuple_(*(last[column.key] for column in free)))
+    return stmt
+
+def _link_page(db: Session, skip: int, limit: int, cursor: Optional[str], filters: Optional[EventOfferFilter]) -> List[dict]:
+    result = db.execute(_link_statement(db, skip, limit, cursor, filters))
+    # The Table's columns come back keyed by quoted_name, a str subclass orjson rejects
+    keys = [str(key) for key in result.keys()]
+    return [dict(zip(keys, row)) for row in result]
+
+def get_event_offer_rows(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: Optional[EventOfferFilter] = None) -> List[dict]:
+    # Column dicts shared with the cache: callers must not modify them
+    return entity_cache.get_list("link", _list_params(skip, limit, cursor, filters), lambda: _link_page(db, skip, limit, cursor, filters))
+
+# Graph reads
+# Events with their offers (and the reverse) load the page of entities, then every link of
+# that page with the far side joined in one more query, so a page costs two queries however
+# many rows or links it has. The ORM relationships would lazy-load per row and cannot carry
+# the association's delay_minutes/action_type anyway.
+LINK_COLUMNS = (event_offer_association.c.delay_minutes, event_offer_association.c.action_type)
+
+def _attach_links(db: Session, entities, far_model, own_key, far_key, attribute: str) -> List[SimpleNamespace]:
+    rows = [as_row(_values(entity)) for entity in entities]
+    by_id = {row.id: row for row in rows}
+    for row in rows:
+        setattr(row, attribute, [])
+    if not by_id:
+        return rows
+    stmt = (
+        select(own_key, *far_model.__table__.c, *LINK_COLUMNS)
+        .join(far_model, far_model.id == far_key)
+        .where(own_key.in_(by_id))
+        .order_by(own_key, far_model.id)
     )
-    return db.execute(stmt).first()
\ No newline at end of file
+    if far_model is Event:
+        stmt = _unexpired(stmt)
+    for link in db.execute(stmt).mappings():
+        linked = dict(link)
+        getattr(by_id[linked.pop(own_key.key)], attribute).append(as_row(linked))
+    return rows
+
+def _events_with_offers(db: Session, events) -> List[SimpleNamespace]:
+    return _attach_links(db, events, Offer, event_offer_association.c.event_id,
+                         event_offer_association.c.offer_id, "offers")
+
+def _offers_with_events(db: Session, offers) -> List[SimpleNamespace]:
+    return _attach_links(db, offers, Event, event_offer_association.c.offer_id,
+                         event_offer_association.c.event_id, "events")
+
+def get_events_with_offers(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[SimpleNamespace]:
+    return _events_with_offers(db, get_events(db, skip, limit, cursor))
+
+def get_event_with_offers(db: Session, event_id: str) -> Optional[SimpleNamespace]:
+    event = get_event(db, event_id)
+    return _events_with_offers(db, [event])[0] if event is not None and not _expired(event.expires_at) else None
+
+def get_offers_with_events(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[SimpleNamespace]:
+    return _offers_with_events(db, get_offers(db, skip, limit, cursor))
+
+def get_offer_with_events(db: Session, offer_id: str) -> Optional[SimpleNamespace]:
+    offer = get_offer(db, offer_id)
+    return _offers_with_events(db, [offer])[0] if offer is not None else None
+
+def get_graph(db: Session) -> dict:
+    # Three flat queries, no joins: nodes once each plus the edge list
+    return {
+        "events": db.execute(_unexpired(select(*Event.__table__.c)).order_by(Event.id)).mappings().all(),
+        "offers": db.execute(select(*Offer.__table__.c).order_by(Offer.id)).mappings().all(),
+        "links": db.execute(_unexpired_links(select(event_offer_association)).order_by(
+            event_offer_association.c.event_id, event_offer_association.c.offer_id)).mappings().all(),
+    }
+
+# Bulk import operations
+# Each call upserts one chunk in a single transaction with one executemany INSERT ... ON
+# CONFLICT statement. Rows are (index, schema) pairs so results point back at the input.
+def _insert_for(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+def _upsert(db: Session, table, rows: List[dict], key_columns: List[str], update_columns: List[str], computed: Optional[dict] = None) -> None:
+    # ``computed`` maps more columns to a function of the excluded (proposed) row
+    stmt = _insert_for(db)(table)
+    set_ = {name: stmt.excluded[name] for name in update_columns}
+    for name, expression in (computed or {}).items():
+        set_[name] = expression(stmt.excluded)
+    if "updated_at" in table.c:
+        set_["updated_at"] = utcnow()
+    db.execute(stmt.on_conflict_do_update(index_elements=key_columns, set_=set_), rows)
+
+def _plan_entities(db: Session, model, rows: List[Tuple[int, BaseModel]]) -> Tuple[List[dict], dict]:
+    results, accepted, claimed_codes = [], {}, {}
+    existing_ids = set(db.execute(select(model.id).where(model.id.in_({row.id for _, row in rows}))).scalars())
+    code_owners = dict(db.execute(select(model.code, model.id).where(model.code.in_({row.code for _, row in rows}))).all())
+    for index, row in rows:
+        owner = claimed_codes.get(row.code, code_owners.get(row.code, row.id))
+        if owner != row.id:
+            results.append({"index": index, "id": row.id, "status": "rejected", "error": f"Code {row.code} already belongs to {owner}"})
+            continue
+        claimed_codes[row.code] = row.id
+        accepted[row.id] = row
+        results.append({"index": index, "id": row.id, "status": "updated" if row.id in existing_ids else "created"})
+        existing_ids.add(row.id)
+    return results, accepted
+
+def _bulk_upsert_entities(db: Session, model, rows: List[Tuple[int, BaseModel]], before_commit=None) -> Tuple[List[dict], List[BaseModel]]:
+    columns = [column for column in model.__table__.c.keys() if column not in ("created_at", "updated_at", "expires_at")]
+    for attempt in range(2):
+        results, accepted = _plan_entities(db, model, rows)
+        if not accepted:
+            return results, []
+        values = [row.model_dump() for row in accepted.values()]
+        computed = {}
+        if "expires_at" in model.__table__.c:
+            now = utcnow()
+            for row in values:
+                row.update(created_at=now, updated_at=now, expires_at=expiry_for(now, row["lifetime_hours"]))
+            # An existing row keeps its created_at, which its new lifetime counts from
+            computed["expires_at"] = lambda excluded: _expiry_expression(db, model.created_at, excluded.lifetime_hours)
+        try:
+            _upsert(db, model.__table__, values, ["id"], [c for c in columns if c != "id"], computed)
+            break
+        except IntegrityError:
+            # A concurrent writer took one of the codes after they were read above: plan
+            # the chunk again against the committed owners so those rows come back rejected
+            db.rollback()
+            if attempt:
+                raise
+    if before_commit is not None:
+        before_commit(db, list(accepted.values()))
+    db.commit()
+    return results, list(accepted.values())
+
+def _events_upserted(db: Session, rows: List[EventCreate]) -> None:
+    record_changes(db, events=[row.id for row in rows])
+
+def _offers_upserted(db: Session, rows: List[OfferCreate]) -> None:
+    enqueue_offers(db, rows)
+    record_changes(db, offers=[row.id for row in rows])
+
+def bulk_upsert_events(db: Session, rows: List[Tuple[int, EventCreate]]) -> List[dict]:
+    results, accepted = _bulk_upsert_entities(db, Event, rows, before_commit=_events_upserted)
+    entity_cache.invalidate("event", *(row.id for row in accepted))
+    if accepted and resolution_index.loaded:
+        # An updated row's expiry counts from its own created_at, so it is read back
+        expiry = dict(db.execute(select(Event.id, Event.expires_at).where(Event.id.in_([row.id for row in accepted]))).tuples().all())
+        for row in accepted:
+            resolution_index.event_changed(row.id, row.code, row.disable_all_campaigns, row.queue_name, row.lifetime_hours, expiry.get(row.id))
+    return results
+
+def bulk_upsert_offers(db: Session, rows: List[Tuple[int, OfferCreate]]) -> List[dict]:
+    results, accepted = _bulk_upsert_entities(db, Offer, rows, before_commit=_offers_upserted)
+    entity_cache.invalidate("offer", *(row.id for row in accepted))
+    for row in accepted:
+        resolution_index.offer_changed(row.id, row.code, row.priority, row.target_system)
+    return results
+
+def bulk_upsert_event_offer_associations(db: Session, rows: List[Tuple[int, EventOfferCreate]]) -> List[dict]:
+    table = event_offer_association
+    results, accepted = [], {}
+    event_ids = set(db.execute(_unexpired(select(Event.id).where(Event.id.in_({row.event_id for _, row in rows})))).scalars())
+    offer_ids = set(db.execute(select(Offer.id).where(Offer.id.in_({row.offer_id for _, row in rows}))).scalars())
+    existing = set(db.execute(
+        select(table.c.event_id, table.c.offer_id)
+        .where(tuple_(table.c.event_id, table.c.offer_id).in_({(row.event_id, row.offer_id) for _, row in rows}))
+    ).tuples())
+    for index, row in rows:
+        key = (row.event_id, row.offer_id)
+        link_id = f"{row.event_id}:{row.offer_id}"
+        if row.event_id not in event_ids:
+            results.append({"index": index, "id": link_id, "status": "rejected", "error": "Event not found"})
+        elif row.offer_id not in offer_ids:
+            results.append({"index": index, "id": link_id, "status": "rejected", "error": "Offer not found"})
+        else:
+            accepted[key] = row
+            results.append({"index": index, "id": link_id, "status": "updated" if key in existing else "created"})
+            existing.add(key)
+
+    if accepted:
+        _upsert(db, table, [row.model_dump() for row in accepted.values()], ["event_id", "offer_id"], ["delay_minutes", "action_type"])
+        enqueue_links(db, list(accepted.values()))
+        record_changes(db, links=list(accepted))
+        db.commit()
+        entity_cache.invalidate("link", *(f"{row.event_id}:{row.offer_id}" for row in accepted.values()))
+        for row in accepted.values():
+            resolution_index.link_changed(row.event_id, row.offer_id, row.delay_minutes, row.action_type)
+            action_scheduler.link_changed(row.event_id, row.offer_id)
+    return results
+
+# Change feed
+# Each entity appears once, under the seq of its last write. Its current state is read
+# now rather than stored in the log, through the same cache as the batch lookups; an
+# entity that no longer exists is reported as deleted, with only its key.
+CHANGE_LINK_COLUMNS = [event_offer_association.c[name] for name in schemas.EventOfferBase.model_fields]
+
+def _load_links(db: Session, keys: List[Tuple[str, str]]) -> dict:
+    # SQLite scans the whole table for a row-value IN list, and an IN per half of the key
+    # probes every event/offer combination; the links of the events asked for are read by
+    # primary key instead and the ones nobody asked for dropped
+    found, wanted = {}, set(keys)
+    event_ids = list(dict.fromkeys(event_id for event_id, _ in keys))
+    for start in range(0, len(event_ids), settings.batch_chunk_size):
+        # Links of an expired event are gone, as in the link reads
+        stmt = _unexpired_links(select(*CHANGE_LINK_COLUMNS).where(event_offer_association.c.event_id.in_(event_ids[start:start + settings.batch_chunk_size])))
+        for row in db.execute(stmt).mappings():
+            if (row["event_id"], row["offer_id"]) in wanted:
+                found[(row["event_id"], row["offer_id"])] = {str(key): value for key, value in row.items()}
+    return found
+
+def get_changes(db: Session, since: int = 0, limit: int = 1000) -> dict:
+    log = EntityChange.__table__.c
+    if since > 0:
+        horizon = read_horizon(db)
+        if since < horizon:
+            raise ChangesCompacted(horizon)
+    rows = db.execute(
+        select(log.seq, log.kind, log.entity_id, log.linked_id)
+        .where(log.seq > since, log.kind != HORIZON_KIND).order_by(log.seq).limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    event_ids = [row.entity_id for row in rows if row.kind == "event"]
+    offer_ids = [row.entity_id for row in rows if row.kind == "offer"]
+    link_keys = [(row.entity_id, row.linked_id) for row in rows if row.kind == "link"]
+    found = {
+        "event": entity_cache.get_entities("event", event_ids, lambda missing: _load_by_ids(db, Event, missing)) if event_ids else {},
+        "offer": entity_cache.get_entities("offer", offer_ids, lambda missing: _load_by_ids(db, Offer, missing)) if offer_ids else {},
+        "link": _load_links(db, link_keys) if link_keys else {},
+    }
+    fields = {"event": list(schemas.Event.model_fields), "offer": list(schemas.Offer.model_fields)}
+    changes = []
+    for row in rows:
+        key = (row.entity_id, row.linked_id) if row.kind == "link" else row.entity_id
+        values = found[row.kind].get(key)
+        if values is not None and _expired(values.get("expires_at")):
+            values = None
+        if values is None:
+            data = {"event_id": row.entity_id, "offer_id": row.linked_id} if row.kind == "link" else {"id": row.entity_id}
+        else:
+            data = values if row.kind == "link" else {name: values[name] for name in fields[row.kind]}
+        changes.append({"seq": row.seq, "kind": row.kind, "op": "deleted" if values is None else "upserted", "data": data})
+    return {"changes": changes, "last_seq": rows[-1].seq if rows else since, "has_more": has_more}
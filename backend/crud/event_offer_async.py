@@ -0,0 +1,39 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from schemas.event_offer import EventCreate, OfferCreate, EventOfferCreate
+from crud import event_offer as crud
+
+# Async counterparts of the crud.event_offer functions used by the async-only routers
+# (the event/offer routes pick their runner in routers.event_offer). The query logic
+# lives in the sync module and runs through AsyncSession.run_sync, so both paths always
+# issue the same SQL while the async driver (aiosqlite/asyncpg) keeps the event loop free.
+
+# Graph reads
+async def get_events_with_offers(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return await db.run_sync(crud.get_events_with_offers, skip, limit, cursor)
+
+async def get_event_with_offers(db: AsyncSession, event_id: str):
+    return await db.run_sync(crud.get_event_with_offers, event_id)
+
+async def get_offers_with_events(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return await db.run_sync(crud.get_offers_with_events, skip, limit, cursor)
+
+async def get_offer_with_events(db: AsyncSession, offer_id: str):
+    return await db.run_sync(crud.get_offer_with_events, offer_id)
+
+async def get_graph(db: AsyncSession) -> dict:
+    return await db.run_sync(crud.get_graph)
+
+# Bulk import operations
+async def bulk_upsert_events(db: AsyncSession, rows: List[Tuple[int, EventCreate]]) -> List[dict]:
+    return await db.run_sync(crud.bulk_upsert_events, rows)
+
+async def bulk_upsert_offers(db: AsyncSession, rows: List[Tuple[int, OfferCreate]]) -> List[dict]:
+    return await db.run_sync(crud.bulk_upsert_offers, rows)
+
+async def bulk_upsert_event_offer_associations(db: AsyncSession, rows: List[Tuple[int, EventOfferCreate]]) -> List[dict]:
+    return await db.run_sync(crud.bulk_upsert_event_offer_associations, rows)
+
+# Change feed
+async def get_changes(db: AsyncSession, since: int = 0, limit: int = 1000) -> dict:
+    return await db.run_sync(crud.get_changes, since, limit)
@@ -1,17 +1,144 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import List
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.dml import UpdateBase
+from config import settings
+from models.base import Base
+
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+
+def to_async_url(url: str) -> str:
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://") or url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.async_database_url or to_async_url(SQLALCHEMY_DATABASE_URL)
+
+POOL_OPTIONS = {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+if SQLALCHEMY_DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    # In-memory SQLite uses a single-connection pool that takes no sizing
+    POOL_OPTIONS = {}
+elif SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # SQLite connections are just file handles with no server-side limit to protect
+    POOL_OPTIONS["max_overflow"] = -1
+
+# Production SQLite: WAL lets readers run alongside the single writer, which every write
+# goes through so writers queue in the pool instead of failing with "database is locked"
+PRODUCTION_SQLITE = (
+    settings.sqlite_profile == "production"
+    and SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+    and bool(POOL_OPTIONS)
+)
+WRITER_POOL_OPTIONS = {"pool_size": 1, "max_overflow": 0, "pool_timeout": settings.sqlite_writer_timeout}
+
+
+def sqlite_pragmas() -> List[str]:
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def use_sqlite_profile(engine, writer: bool = False) -> None:
+    """Apply the production pragmas to every connection of a sync engine (for async
+    engines pass ``async_engine.sync_engine``). Writer connections start each transaction
+    with BEGIN IMMEDIATE so the write lock is taken up front rather than on upgrade."""
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+        cursor.close()
+        if writer:
+            # Let SQLAlchemy's begin event issue BEGIN instead of the driver
+            dbapi_connection.isolation_level = None
+
+    if writer:
+        @event.listens_for(engine, "begin")
+        def begin_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class RoutingSession(Session):
+    """Reads go to the session's bind, flushes and INSERT/UPDATE/DELETE statements to
+    ``info["writer"]``. Once a transaction has written, the rest of it stays on the writer
+    so it reads its own uncommitted changes."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        writer = self.info.get("writer")
+        if writer is not None and (self.info.get("writing") or self._flushing or isinstance(clause, UpdateBase)):
+            self.info["writing"] = True
+            return writer
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _leave_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writing", None)
 
-# Database URL - using SQLite for simplicity
-SQLALCHEMY_DATABASE_URL = "sqlite:///./app.db"
 
 # Create engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {},
+    **POOL_OPTIONS
+)
+
+# aiosqlite defaults to NullPool (a new thread + connection per session), so ask for a real pool
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    **(dict(POOL_OPTIONS, poolclass=AsyncAdaptedQueuePool) if POOL_OPTIONS else {})
 )
 
+if PRODUCTION_SQLITE:
+    writer_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, **WRITER_POOL_OPTIONS
+    )
+    async_writer_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, **WRITER_POOL_OPTIONS
+    )
+    use_sqlite_profile(engine)
+    use_sqlite_profile(writer_engine, writer=True)
+    use_sqlite_profile(async_engine.sync_engine)
+    use_sqlite_profile(async_writer_engine.sync_engine, writer=True)
+    SESSION_OPTIONS = {"class_": RoutingSession, "info": {"writer": writer_engine}}
+    ASYNC_SESSION_OPTIONS = {"sync_session_class": RoutingSession, "info": {"writer": async_writer_engine.sync_engine}}
+else:
+    writer_engine, async_writer_engine = engine, async_engine
+    SESSION_OPTIONS, ASYNC_SESSION_OPTIONS = {}, {}
+
 # Create session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, **SESSION_OPTIONS)
+
+# Objects outlive the commit in async routes, so they must not expire on it
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False, **ASYNC_SESSION_OPTIONS
+)
+
+
+# Dependencies
+# A plain generator: FastAPI runs it in the threadpool, so closing the session (a ROLLBACK
+# on the connection) never blocks the event loop
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 
-# Base class for models
-Base = declarative_base()
\ No newline at end of file
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
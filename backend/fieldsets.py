@@ -0,0 +1,80 @@
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple, Type
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, ConfigDict, create_model
+from config import settings
+
+# Sparse fieldsets (?fields=id,code,name) for the event and offer reads. The crud layer
+# selects only the requested columns, plus the id and updated_at that the cursor and the
+# ETag are derived from, so an unbounded description is never read for a dropdown. The
+# response carries the requested fields and the id, in the schema's field order.
+
+# Selected for every fieldset, returned only when requested (id always is)
+VERSION_FIELDS = ("id", "updated_at")
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class Fieldset:
+    def __init__(self, schema: Type[BaseModel], names: Tuple[str, ...]):
+        self.schema = schema
+        self.names = names
+
+    def __str__(self) -> str:
+        # Part of list cache keys and of the ETags, which differ from the full representation's
+        return ",".join(self.names)
+
+    __repr__ = __str__
+
+    @property
+    def selected(self) -> Tuple[str, ...]:
+        return tuple(name for name in self.schema.model_fields if name in self.names or name in VERSION_FIELDS)
+
+    @property
+    def model(self) -> Type[BaseModel]:
+        return sparse_model(self.schema, self.names)
+
+    def project(self, values: dict) -> dict:
+        item = {name: values[name] for name in self.names}
+        if settings.validate_list_responses:
+            return self.model.model_validate(item).model_dump(mode="json")
+        return item
+
+    def project_all(self, rows: List[dict]) -> List[dict]:
+        return [self.project(values) for values in rows]
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[Fieldset]:
+    """The fieldset named by a comma-separated ``fields`` parameter; None when it is absent
+    or names every field, i.e. for the full representation."""
+    if fields is None:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - set(schema.model_fields)
+    if unknown:
+        raise InvalidFields(", ".join(sorted(unknown)))
+    names.add("id")
+    if names == set(schema.model_fields):
+        return None
+    return Fieldset(schema, tuple(name for name in schema.model_fields if name in names))
+
+
+@lru_cache(maxsize=256)
+def sparse_model(schema: Type[BaseModel], names: Tuple[str, ...]) -> Type[BaseModel]:
+    """The schema cut down to a fieldset, for validate_list_responses."""
+    return create_model(
+        f"{schema.__name__}Fields", __config__=ConfigDict(extra="forbid"),
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names},
+    )
+
+
+def fields_query(schema: Type[BaseModel]) -> Callable[..., Optional[Fieldset]]:
+    """Route dependency parsing ``?fields=`` against ``schema``; unknown names are a 400."""
+    def dependency(fields: Optional[str] = Query(None, description=f"Comma-separated {schema.__name__} fields to return; id is always included")) -> Optional[Fieldset]:
+        try:
+            return parse_fields(fields, schema)
+        except InvalidFields as exc:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {exc}")
+    return dependency
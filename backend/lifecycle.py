@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Awaitable, Callable, Dict, List
+from fastapi import FastAPI
+from config import settings
+from crud import event_offer as crud
+from database import AsyncSessionLocal, SessionLocal, async_engine, async_writer_engine, engine, writer_engine
+from migrations import SCHEMA_REVISION, schema_revision, upgrade_schema, verify_schema
+from services.resolution_index import resolution_index
+
+# Process lifecycle, run as the app's lifespan. Startup, in order:
+#   schema     the database must be at migrations.SCHEMA_REVISION, which takes one read of
+#              alembic_version rather than comparing the whole schema. Alembic owns the
+#              schema (there is no create_all in the app any more), so a database
+#              behind (or ahead of) the code stops the process here instead of failing
+#              requests later; with schema_on_startup="upgrade" it is migrated first
+#   pool       opens warm_pool_connections connections per engine, so the first requests
+#              do not each pay for a connect and the SQLite pragmas
+#   warm       runs the hot reads once, which compiles their statements into the engine's
+#              cache and fills the read cache with the first list pages
+#   index      loads the resolution index
+#   services   the registered startup handlers (scheduler, outbox, change feed, expiry)
+# GET /ready answers 200 only between the end of startup and the start of shutdown; /health
+# stays a liveness check that answers as long as the process serves requests.
+
+logger = logging.getLogger("lifecycle")
+
+
+def warm_pool(bind, connections: int) -> int:
+    # Held open together, or the pool would hand the same connection back each time
+    size = getattr(bind.pool, "size", lambda: 1)()
+    held = [bind.connect() for _ in range(max(1, min(connections, size)))]
+    for connection in held:
+        connection.close()
+    return len(held)
+
+
+async def warm_async_pool(bind, connections: int) -> int:
+    size = getattr(bind.sync_engine.pool, "size", lambda: 1)()
+    async with AsyncExitStack() as stack:
+        held = [await stack.enter_async_context(bind.connect()) for _ in range(max(1, min(connections, size)))]
+    return len(held)
+
+
+def warm_reads(db) -> None:
+    """The statements behind the hot GET routes, run once each; the first pages at the
+    default limit also stay in the read cache."""
+    crud.get_event_rows(db)
+    crud.get_offer_rows(db)
+    crud.get_event_offer_rows(db)
+    crud.get_event_versions(db)
+    crud.get_offer_versions(db)
+    crud.get_cached_event(db, "")
+    crud.get_cached_offer(db, "")
+    crud.get_event_version(db, "")
+    crud.get_offer_version(db, "")
+    crud.get_events_by_ids(db, [""])
+    crud.get_offers_by_ids(db, [""])
+
+
+class Lifecycle:
+    def __init__(self):
+        self.state = "starting"
+        self.timings: Dict[str, float] = {}
+        self.startup: List[Callable[[], Awaitable[None]]] = []
+        self.shutdown: List[Callable[[], Awaitable[None]]] = []
+
+    def on_startup(self, handler: Callable[[], Awaitable[None]]) -> None:
+        self.startup.append(handler)
+
+    def on_shutdown(self, handler: Callable[[], Awaitable[None]]) -> None:
+        self.shutdown.append(handler)
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    async def _step(self, name: str, work: Callable[[], Awaitable[None]]) -> None:
+        started = time.perf_counter()
+        await work()
+        self.timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    async def start(self) -> None:
+        self.state = "starting"
+        started = time.perf_counter()
+        await self._step("schema", self._schema)
+        await self._step("pool", self._pool)
+        if settings.warm_on_startup:
+            await self._step("warm", self._warm)
+        if settings.warm_resolution_index:
+            await self._step("index", lambda: asyncio.to_thread(resolution_index.ensure_loaded))
+        await self._step("services", self._services)
+        self.timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+        self.state = "ready"
+        logger.info("ready in %.0f ms: %s", self.timings["total"], self.timings)
+
+    async def stop(self) -> None:
+        # Not ready from here on, so a load balancer stops sending new requests
+        self.state = "stopping"
+        for handler in self.shutdown:
+            await handler()
+        engine.dispose()
+        writer_engine.dispose()
+        await async_engine.dispose()
+        await async_writer_engine.dispose()
+        self.state = "stopped"
+
+    async def _schema(self) -> None:
+        if settings.schema_on_startup == "off":
+            return
+        if settings.schema_on_startup == "upgrade" and schema_revision(writer_engine) != SCHEMA_REVISION:
+            logger.warning("migrating the database to %s", SCHEMA_REVISION)
+            await asyncio.to_thread(upgrade_schema, writer_engine)
+        verify_schema(engine)
+
+    async def _pool(self) -> None:
+        if settings.db_mode == "sync":
+            await asyncio.to_thread(warm_pool, engine, settings.warm_pool_connections)
+        else:
+            await warm_async_pool(async_engine, settings.warm_pool_connections)
+
+    async def _warm(self) -> None:
+        if settings.db_mode == "sync":
+            with SessionLocal() as db:
+                await asyncio.to_thread(warm_reads, db)
+        else:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(warm_reads)
+
+    async def _services(self) -> None:
+        for handler in self.startup:
+            await handler()
+
+    def readiness(self) -> dict:
+        return {"status": self.state, "startup_ms": self.timings}
+
+
+lifecycle = Lifecycle()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await lifecycle.start()
+    try:
+        yield
+    finally:
+        await lifecycle.stop()
@@ -1,14 +1,79 @@
-from fastapi import FastAPI
-from routers.event_offer import router as event_offer_router
+from fastapi import Depends, FastAPI, Response
+import admission
+from auth import authorize
+from config import settings
+from database import async_engine, async_writer_engine, engine, writer_engine
+import metrics
+from lifecycle import lifecycle, lifespan
+from routers.event_offer import router as event_offer_router, async_router as event_offer_async_router
+from routers.resolution import router as resolution_router
+from routers.bulk import router as bulk_router
+from routers.export import router as export_router
+from routers.cache import router as cache_router
+from routers.graph import router as graph_router
+from routers.ingest import router as ingest_router
+from routers.scheduler import router as scheduler_router
+from routers.outbox import router as outbox_router
+from routers.changes import router as changes_router
+from routers.expiry import router as expiry_router
+from services.changes import change_feed
+from services.expiry import expiry_sweeper
+from services.ingest import ingest_pipeline
+from services.outbox import outbox_dispatcher
+from services.scheduler import action_scheduler
 
 app = FastAPI(
     title="Event-Offer Management API",
     description="A FastAPI application for managing Events, Offers, and their associations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Every /api route requires a valid Keycloak token when auth is enabled
+api_dependencies = [Depends(authorize)] if settings.auth_enabled else []
+
 # Include routers
-app.include_router(event_offer_router)
+if settings.db_mode == "sync":
+    app.include_router(event_offer_router, dependencies=api_dependencies)
+else:
+    app.include_router(event_offer_async_router, dependencies=api_dependencies)
+app.include_router(resolution_router, dependencies=api_dependencies)
+app.include_router(bulk_router, dependencies=api_dependencies)
+app.include_router(export_router, dependencies=api_dependencies)
+app.include_router(cache_router, dependencies=api_dependencies)
+app.include_router(graph_router, dependencies=api_dependencies)
+app.include_router(ingest_router, dependencies=api_dependencies)
+app.include_router(scheduler_router, dependencies=api_dependencies)
+app.include_router(outbox_router, dependencies=api_dependencies)
+app.include_router(changes_router, dependencies=api_dependencies)
+app.include_router(expiry_router, dependencies=api_dependencies)
+
+# Per-route-class concurrency limits with bounded queues; overload is answered 503 +
+# Retry-After. Added before the metrics middleware, so the metrics still see shed requests
+# and the time admitted ones spent queued.
+if settings.admission_enabled:
+    admission.install(app)
+
+# Prometheus scrape endpoint, request and SQL instrumentation
+if settings.metrics_enabled:
+    metrics.install(app, [engine, writer_engine, async_engine.sync_engine, async_writer_engine.sync_engine])
+
+# Started once the schema has been verified and the pools and caches warmed (lifecycle.py)
+# Reload pending offer actions and start firing them
+lifecycle.on_startup(action_scheduler.start)
+# Deliver outbox messages to the offers' target systems
+lifecycle.on_startup(outbox_dispatcher.start)
+# Drop change-log deletions older than the retention window
+lifecycle.on_startup(change_feed.start)
+# Delete expired events and their links, in short batches
+if settings.expiry_enabled:
+    lifecycle.on_startup(expiry_sweeper.start)
+# Write out whatever occurrences are still queued before the process exits
+lifecycle.on_shutdown(ingest_pipeline.stop)
+lifecycle.on_shutdown(action_scheduler.stop)
+lifecycle.on_shutdown(outbox_dispatcher.stop)
+lifecycle.on_shutdown(change_feed.stop)
+lifecycle.on_shutdown(expiry_sweeper.stop)
 
 @app.get("/")
 async def root():
@@ -16,4 +81,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+# Readiness, apart from liveness: 503 until startup has finished and once shutdown begins
+@app.get("/ready")
+async def readiness_check(response: Response):
+    if not lifecycle.ready:
+        response.status_code = 503
+    return lifecycle.readiness()
\ No newline at end of file
@@ -0,0 +1,177 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+import anyio.to_thread
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from config import settings
+
+# Prometheus metrics for what happens behind the gateway: per-route request latency and
+# in-flight requests from an ASGI middleware, threadpool saturation read at scrape time,
+# and per-query timings from SQLAlchemy cursor hooks. Queries are attributed to the
+# request that issued them through a context variable, which follows the request into
+# threadpool calls and AsyncSession greenlets, so each request also reports how many
+# queries it ran and how long it spent in them. Routes are labelled by their path
+# template, never the raw path, to keep the label set bounded.
+
+slow_query_logger = logging.getLogger("sql.slow")
+
+UNMATCHED_ROUTE = "unmatched"
+BACKGROUND_ROUTE = "background"
+# Anything else a client sends is labelled "OTHER", again to keep the label set bounded
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to serve a request, by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Requests being served", ["method"])
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+REQUEST_DB_SECONDS = Histogram("http_request_db_duration_seconds", "Time per request spent in SQL statements", ["route"])
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Time per SQL statement", ["operation"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+SLOW_QUERIES = Counter("db_slow_queries_total", "SQL statements slower than slow_query_seconds", ["route"])
+
+
+class _RequestStats:
+    __slots__ = ("scope", "queries", "seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_current_request: ContextVar[Optional[_RequestStats]] = ContextVar("metrics_request", default=None)
+
+# labels() costs a lock and a tuple per call, so the children are looked up once and kept
+_request_children: Dict[Tuple[str, str, int], tuple] = {}
+_in_progress_children = {method: REQUESTS_IN_PROGRESS.labels(method) for method in METHODS | {"OTHER"}}
+_query_children: Dict[str, object] = {}
+
+
+def _children_for(method: str, route: str, status: int) -> tuple:
+    key = (method, route, status)
+    children = _request_children.get(key)
+    if children is None:
+        children = _request_children[key] = (
+            REQUEST_LATENCY.labels(method, route, str(status)), REQUEST_QUERIES.labels(route), REQUEST_DB_SECONDS.labels(route),
+        )
+    return children
+
+
+def route_label(scope: dict) -> str:
+    # The router stores the matched route in the scope while dispatching
+    route = scope.get("route")
+    return route.path if route is not None else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware (BaseHTTPMiddleware would add a task and a stream per request)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        method = scope["method"] if scope["method"] in METHODS else "OTHER"
+        stats = _RequestStats(scope)
+        token = _current_request.set(stats)
+        in_progress = _in_progress_children[method]
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _current_request.reset(token)
+            latency, queries, db_seconds = _children_for(method, route_label(scope), status)
+            latency.observe(elapsed)
+            queries.observe(stats.queries)
+            db_seconds.observe(stats.seconds)
+
+
+class ThreadpoolCollector:
+    """Saturation of the threadpool that runs sync routes and run_in_threadpool calls.
+    The limiter belongs to the running event loop, so it is read during the scrape."""
+
+    def collect(self):
+        try:
+            limiter = anyio.to_thread.current_default_thread_limiter()
+        except Exception:
+            # Not collected from the event loop (e.g. a registry dump in a script)
+            return
+        statistics = limiter.statistics()
+        yield GaugeMetricFamily("threadpool_threads_limit", "Worker threads the pool may use", value=limiter.total_tokens)
+        yield GaugeMetricFamily("threadpool_threads_busy", "Worker threads running a call", value=statistics.borrowed_tokens)
+        yield GaugeMetricFamily("threadpool_tasks_waiting", "Calls waiting for a free worker thread", value=statistics.tasks_waiting)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    operation = statement.split(None, 1)[0].upper()
+    child = _query_children.get(operation)
+    if child is None:
+        child = _query_children[operation] = QUERY_LATENCY.labels(operation)
+    child.observe(elapsed)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+    threshold = settings.slow_query_seconds
+    if threshold is not None and elapsed >= threshold:
+        route = BACKGROUND_ROUTE if stats is None else f"{stats.scope['method']} {route_label(stats.scope)}"
+        SLOW_QUERIES.labels(route).inc()
+        # Parameters are left out: they carry request data
+        slow_query_logger.warning("Slow query (%.1f ms) from %s: %s", elapsed * 1000, route, statement)
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement of a sync engine (for async engines pass ``async_engine.sync_engine``)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def uninstrument_engine(engine) -> None:
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def read_metrics() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+REGISTRY.register(ThreadpoolCollector())
+
+
+def install(app: FastAPI, engines: Iterable) -> None:
+    app.add_middleware(MetricsMiddleware)
+    for engine in engines:
+        instrument_engine(engine)
+    # Scraped by Prometheus directly, so outside the /api auth and the OpenAPI schema
+    app.add_api_route("/metrics", read_metrics, methods=["GET"], include_in_schema=False)
@@ -0,0 +1,62 @@
+import os
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from models.base import Base
+
+# Which Alembic revision the database is at, checked at startup (lifecycle.py) with one
+# read of alembic_version instead of importing alembic, which alone costs a good part of a
+# second. Alembic itself is only loaded to migrate or stamp.
+
+# The Alembic revision this code expects; test_lifecycle checks it is the head of
+# alembic/versions, so a new migration has to move it along
+SCHEMA_REVISION = "cd35ce87f481"
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class SchemaMismatch(RuntimeError):
+    pass
+
+
+def schema_revision(bind) -> Optional[str]:
+    """The revision the database is stamped with; None for a database Alembic never ran on."""
+    with bind.connect() as conn:
+        try:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except (OperationalError, ProgrammingError):
+            return None
+
+
+def verify_schema(bind) -> str:
+    revision = schema_revision(bind)
+    if revision != SCHEMA_REVISION:
+        raise SchemaMismatch(
+            f"database schema is at {revision or 'no revision'}, this code needs {SCHEMA_REVISION}: run `alembic upgrade head`"
+        )
+    return revision
+
+
+def alembic_config(connection):
+    # Imported here: alembic is only needed when migrating, and costs startup time otherwise.
+    # No ini file, so env.py leaves the app's logging configuration alone.
+    from alembic.config import Config
+    config = Config()
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.attributes["connection"] = connection
+    return config
+
+
+def upgrade_schema(bind) -> None:
+    from alembic import command
+    with bind.begin() as connection:
+        command.upgrade(alembic_config(connection), "head")
+
+
+def create_schema(bind) -> None:
+    """Tables straight from the models, stamped with the current revision: for throwaway
+    databases (tests, benchmarks) that skip the migrations."""
+    from alembic import command
+    import models.change, models.event_offer, models.occurrence, models.outbox  # noqa: F401  (register the tables)
+    Base.metadata.create_all(bind)
+    with bind.begin() as connection:
+        command.stamp(alembic_config(connection), "head")
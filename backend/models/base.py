@@ -1,8 +1,13 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy import DateTime
 from sqlalchemy.sql import func
 
+def utcnow() -> datetime:
+    # Set from Python rather than CURRENT_TIMESTAMP, which SQLite only keeps to the second:
+    # updated_at feeds the ETags and must change on every write
+    return datetime.now(timezone.utc)
+
 class Base(DeclarativeBase):
     pass
 
@@ -11,13 +16,15 @@ class BaseModel(Base):
     
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        default=utcnow,
         server_default=func.now(),
         nullable=False
     )
     
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        default=utcnow,
         server_default=func.now(),
-        onupdate=func.now(),
+        onupdate=utcnow,
         nullable=False
     )
\ No newline at end of file
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from .base import Base
+
+# The change feed's log: the latest committed change of each event, offer and link, written
+# in the same transaction as the change by services.changes. A new change replaces the
+# entity's previous row under a new seq, so the log is compacted as it is written and holds
+# one row per entity; deletions are dropped once they are older than the retention window.
+class EntityChange(Base):
+    __tablename__ = "entity_changes"
+    __table_args__ = (
+        Index("ux_entity_changes_entity", "kind", "entity_id", "linked_id", unique=True),
+        Index("ix_entity_changes_op_changed_at", "op", "changed_at"),
+        # Never hand out a seq again, even the one of a row that has been deleted
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    # event, offer or link ("log" marks the compaction horizon, see services.changes)
+    kind = Column(String, nullable=False)
+    # The event or offer id; for links the event id, with the offer id in linked_id
+    entity_id = Column(String, nullable=False)
+    linked_id = Column(String, nullable=False, default="", server_default="")
+    # upserted or deleted
+    op = Column(String, nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False)
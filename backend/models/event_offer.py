@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, Table
+from sqlalchemy import Column, DateTime, String, Text, Boolean, Integer, ForeignKey, Index, Table
 from sqlalchemy.orm import relationship
 from .base import BaseModel
+from .search import add_search_index
 
 # Association table for many-to-many relationship
 event_offer_association = Table(
@@ -9,7 +10,11 @@ event_offer_association = Table(
     Column('event_id', String, ForeignKey('events.id'), primary_key=True),
     Column('offer_id', String, ForeignKey('offers.id'), primary_key=True),
     Column('delay_minutes', Integer, default=0),
-    Column('action_type', String, default='enable')  # enable or disable
+    Column('action_type', String, default='enable'),  # enable or disable
+    # Covering indexes for the link lists: the links of one offer (the primary key only
+    # serves lookups by event) and the links of one action_type, each in page order
+    Index('ix_event_offer_offer_id_event_id', 'offer_id', 'event_id', 'delay_minutes', 'action_type'),
+    Index('ix_event_offer_action_type_event_id', 'action_type', 'event_id', 'offer_id', 'delay_minutes'),
 )
 
 class Event(BaseModel):
@@ -22,6 +27,19 @@ class Event(BaseModel):
     lifetime_hours = Column(Integer, default=0)
     disable_all_campaigns = Column(Boolean, default=False)
     queue_name = Column(String, default="default_queue")
+    # created_at + lifetime_hours, kept by the write paths; None (lifetime 0) never expires.
+    # Reads hide expired events until the sweeper (services/expiry.py) deletes them
+    expires_at = Column(DateTime(timezone=True))
+
+    # List filters: equality (or a range on the last column) then id, the page order
+    __table_args__ = (
+        Index("ix_events_queue_name_id", "queue_name", "id"),
+        Index("ix_events_disable_all_campaigns_id", "disable_all_campaigns", "id"),
+        Index("ix_events_lifetime_hours_id", "lifetime_hours", "id"),
+        # Only events that expire: the sweeper's oldest-first batches and the expired ids
+        # the link lists leave out are both ranges of it
+        Index("ix_events_expires_at", "expires_at", sqlite_where=expires_at.isnot(None), postgresql_where=expires_at.isnot(None)),
+    )
     
     # Relationship with offers
     offers = relationship(
@@ -39,10 +57,19 @@ class Offer(BaseModel):
     description = Column(Text)
     priority = Column(Integer, default=1)
     target_system = Column(String, default="default_system")
+
+    __table_args__ = (
+        Index("ix_offers_target_system_id", "target_system", "id"),
+        Index("ix_offers_target_system_priority_id", "target_system", "priority", "id"),
+        Index("ix_offers_priority_id", "priority", "id"),
+    )
     
     # Relationship with events
     events = relationship(
         "Event",
         secondary=event_offer_association,
         back_populates="offers"
-    )
\ No newline at end of file
+    )
+
+add_search_index(Event.__table__)
+add_search_index(Offer.__table__)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
+from .base import Base
+
+# One row per ingested event occurrence, written by services.ingest in batches
+class EventOccurrence(Base):
+    __tablename__ = "event_occurrences"
+
+    id = Column(String, primary_key=True)
+    event_id = Column(String, ForeignKey('events.id'), nullable=False, index=True)
+    event_code = Column(String, nullable=False)
+    queue_name = Column(String, nullable=False)
+    occurred_at = Column(DateTime(timezone=True), nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=False)
+    # occurred_at + the event's lifetime_hours; NULL when the event has no lifetime
+    expires_at = Column(DateTime(timezone=True))
+
+# The offer actions an occurrence resolved to, due delay_minutes after it happened. This
+# is also the scheduler's recovery log: pending rows are loaded back into it on startup.
+class OccurrenceAction(Base):
+    __tablename__ = "occurrence_actions"
+    __table_args__ = (Index("ix_occurrence_actions_status_due_at", "status", "due_at"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    occurrence_id = Column(String, ForeignKey('event_occurrences.id'), nullable=False, index=True)
+    offer_id = Column(String, ForeignKey('offers.id'), nullable=False)
+    action_type = Column(String, nullable=False)
+    target_system = Column(String, nullable=False)
+    due_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # pending -> fired, or cancelled when the link is updated or deleted first
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    fired_at = Column(DateTime(timezone=True))
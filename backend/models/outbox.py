@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime
+from .base import Base
+
+# Changes the downstream Offer.target_system needs to hear about, written in the same
+# transaction as the change itself and deleted once services.outbox has delivered them
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    target_system = Column(String, nullable=False)
+    # Messages with the same key describe the same thing, so only the latest is delivered;
+    # NULL (fired offer actions) is never coalesced
+    key = Column(String)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set after a failed delivery; the whole target waits until then so order is kept
+    next_attempt_at = Column(DateTime(timezone=True), index=True)
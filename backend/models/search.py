@@ -0,0 +1,50 @@
+from typing import List
+from sqlalchemy import DDL, Table, event
+
+# Full-text search over name/description on SQLite: one FTS5 table per searchable table,
+# with the table itself as external content (the text is not stored twice), kept in sync
+# by triggers so the bulk upserts and writes made outside the app are covered too. Other
+# dialects search with LIKE instead (see crud.event_offer).
+#
+# The index is keyed on the implicit rowid, which VACUUM may renumber for these
+# string-keyed tables: run rebuild_statement() for each table after a VACUUM.
+
+SEARCH_COLUMNS = ("name", "description")
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+def search_table(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+def create_statements(table_name: str) -> List[str]:
+    fts = search_table(table_name)
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+    insert_new = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new_values});"
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table_name}', content_rowid='rowid', tokenize='{TOKENIZER}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table_name} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table_name} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table_name} BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def drop_statements(table_name: str) -> List[str]:
+    # The triggers go with their table
+    return [f"DROP TABLE IF EXISTS {search_table(table_name)}"]
+
+
+def rebuild_statement(table_name: str) -> str:
+    fts = search_table(table_name)
+    return f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"
+
+
+def add_search_index(table: Table) -> None:
+    """Create (and drop) the FTS5 table and triggers along with ``table`` in create_all/drop_all."""
+    for statement in create_statements(table.name):
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in drop_statements(table.name):
+        event.listen(table, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
@@ -0,0 +1,54 @@
+import base64
+import json
+from typing import Callable, List, Optional, Union
+
+# Header carrying the opaque keyset cursor for the next page of a list endpoint
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_id: Union[str, List[str]]) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def _decode(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def decode_cursor(cursor: str) -> str:
+    # Cursor of a page ordered by id: the last row's id, which is always a string
+    last_id = _decode(cursor)
+    if not isinstance(last_id, str):
+        raise InvalidCursor(cursor)
+    return last_id
+
+
+def decode_key_cursor(cursor: str, size: int) -> List[str]:
+    # Cursor of a page ordered by a composite key: the last row's key parts
+    key = _decode(cursor)
+    if not isinstance(key, list) or len(key) != size or not all(isinstance(part, str) for part in key):
+        raise InvalidCursor(cursor)
+    return key
+
+
+def next_cursor(rows, limit: int, key: Optional[Callable] = None) -> Optional[str]:
+    # A short page means there is nothing after it
+    if limit <= 0 or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if key is not None:
+        return encode_cursor(key(last))
+    return encode_cursor(last["id"] if isinstance(last, dict) else last.id)
+
+
+def next_cursor_headers(rows, limit: int, key: Optional[Callable] = None) -> dict:
+    cursor = next_cursor(rows, limit, key)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
@@ -0,0 +1,79 @@
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Tuple, Type
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database import get_async_db
+from schemas.event_offer import BulkResult, EventCreate, OfferCreate, EventOfferCreate
+from crud.event_offer_async import bulk_upsert_events, bulk_upsert_offers, bulk_upsert_event_offer_associations
+
+router = APIRouter(prefix="/api", tags=["bulk"])
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+# Bodies are either a JSON array or NDJSON (one object per line). NDJSON is parsed while
+# it streams in, so only the current chunk of rows is held in memory.
+async def iter_rows(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_CONTENT_TYPES:
+        index, buffer = 0, b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, line
+                    index += 1
+        if buffer.strip():
+            yield index, buffer
+        return
+
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for index, item in enumerate(payload):
+        yield index, item
+
+def row_error(exc: ValueError) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors())
+    return "Invalid JSON"
+
+async def import_rows(request: Request, schema: Type[BaseModel], upsert: Callable[..., Awaitable[List[dict]]], db: AsyncSession):
+    results, chunk = [], []
+    async for index, item in iter_rows(request):
+        try:
+            if isinstance(item, bytes):
+                item = json.loads(item)
+            chunk.append((index, schema.model_validate(item)))
+        except ValueError as exc:
+            results.append({"index": index, "id": item.get("id") if isinstance(item, dict) else None, "status": "rejected", "error": row_error(exc)})
+        if len(chunk) >= settings.bulk_chunk_size:
+            results.extend(await upsert(db, chunk))
+            chunk = []
+    if chunk:
+        results.extend(await upsert(db, chunk))
+
+    results.sort(key=lambda result: result["index"])
+    counts = {"created": 0, "updated": 0, "rejected": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    # Built as plain dicts: validating hundreds of thousands of result rows would dominate the import
+    return JSONResponse({**counts, "results": results})
+
+@router.post("/events/bulk", response_model=BulkResult)
+async def bulk_import_events(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await import_rows(request, EventCreate, bulk_upsert_events, db)
+
+@router.post("/offers/bulk", response_model=BulkResult)
+async def bulk_import_offers(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await import_rows(request, OfferCreate, bulk_upsert_offers, db)
+
+@router.post("/event-offers/bulk", response_model=BulkResult)
+async def bulk_import_event_offers(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await import_rows(request, EventOfferCreate, bulk_upsert_event_offer_associations, db)
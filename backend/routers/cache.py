@@ -0,0 +1,10 @@
+from typing import Dict
+from fastapi import APIRouter
+from services.cache import entity_cache
+
+router = APIRouter(prefix="/api", tags=["cache"])
+
+@router.get("/cache/stats", response_model=Dict[str, int])
+async def read_cache_stats():
+    # Hit/miss/eviction counters of this process's read cache
+    return entity_cache.stats()
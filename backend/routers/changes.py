@@ -0,0 +1,48 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database import AsyncSessionLocal, get_async_db
+from schemas.event_offer import ChangePage
+from crud.event_offer_async import get_changes
+from serialization import json_response
+from services.changes import ChangesCompacted, change_feed
+
+router = APIRouter(prefix="/api", tags=["changes"])
+
+# Delta sync: a client keeps the last_seq of the page it applied and asks for what changed
+# after it. since=0 returns every entity that exists, so it doubles as the initial sync.
+# 410 means deletions the client has not seen were compacted away: sync again from 0.
+@router.get("/changes", response_model=ChangePage)
+async def read_changes(
+    since: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+):
+    limit = min(limit or settings.changes_page_size, settings.changes_page_size)
+    try:
+        return json_response(await get_changes(db, since, limit))
+    except ChangesCompacted as exc:
+        raise HTTPException(status_code=410, detail=f"Changes before seq {exc.horizon} were compacted, sync again from 0")
+
+async def _read_page(since: int) -> dict:
+    # A session per page, so an open stream holds no connection while it waits
+    async with AsyncSessionLocal() as db:
+        return await get_changes(db, since, settings.changes_page_size)
+
+# The same changes as server-sent events, then new ones as they commit. A reconnecting
+# EventSource resumes from its Last-Event-ID; "reset" events ask for a sync from 0.
+@router.get("/changes/stream")
+async def stream_changes(
+    request: Request,
+    since: int = Query(0, ge=0),
+    last_event_id: Optional[int] = Header(None, ge=0),
+):
+    messages = change_feed.stream(last_event_id if last_event_id is not None else since, _read_page, request.is_disconnected)
+    return StreamingResponse(messages, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/changes/stats")
+async def read_change_stats():
+    return await run_in_threadpool(change_feed.stats)
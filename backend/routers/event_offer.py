@@ -1,124 +1,215 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from database import SessionLocal, engine, Base
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from typing import Callable, List, Optional
+from database import get_async_db, get_db
 from models.event_offer import Event, Offer
-from schemas.event_offer import EventCreate, EventUpdate, Event, OfferCreate, OfferUpdate, Offer, EventOfferCreate, EventOfferUpdate
-from crud.event_offer import (
-    get_event, get_event_by_code, get_events, create_event, update_event, delete_event,
-    get_offer, get_offer_by_code, get_offers, create_offer, update_offer, delete_offer,
-    create_event_offer_association, update_event_offer_association, delete_event_offer_association,
-    get_event_offer_association
-)
-
-# Create tables
-Base.metadata.create_all(bind=engine)
-
-router = APIRouter(prefix="/api", tags=["events-offers"])
-
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-# Event routes
-@router.post("/events/", response_model=Event, status_code=status.HTTP_201_CREATED)
-def create_new_event(event: EventCreate, db: Session = Depends(get_db)):
-    db_event = get_event_by_code(db, code=event.code)
-    if db_event:
-        raise HTTPException(status_code=400, detail="Event with this code already exists")
-    return create_event(db=db, event=event)
-
-@router.get("/events/", response_model=List[Event])
-def read_events(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    events = get_events(db, skip=skip, limit=limit)
-    return events
-
-@router.get("/events/{event_id}", response_model=Event)
-def read_event(event_id: str, db: Session = Depends(get_db)):
-    db_event = get_event(db, event_id=event_id)
-    if db_event is None:
-        raise HTTPException(status_code=404, detail="Event not found")
-    return db_event
-
-@router.put("/events/{event_id}", response_model=Event)
-def update_existing_event(event_id: str, event: EventUpdate, db: Session = Depends(get_db)):
-    db_event = update_event(db, event_id=event_id, event_update=event)
-    if db_event is None:
-        raise HTTPException(status_code=404, detail="Event not found")
-    return db_event
-
-@router.delete("/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_existing_event(event_id: str, db: Session = Depends(get_db)):
-    success = delete_event(db, event_id=event_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Event not found")
-    return None
-
-# Offer routes
-@router.post("/offers/", response_model=Offer, status_code=status.HTTP_201_CREATED)
-def create_new_offer(offer: OfferCreate, db: Session = Depends(get_db)):
-    db_offer = get_offer_by_code(db, code=offer.code)
-    if db_offer:
-        raise HTTPException(status_code=400, detail="Offer with this code already exists")
-    return create_offer(db=db, offer=offer)
-
-@router.get("/offers/", response_model=List[Offer])
-def read_offers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    offers = get_offers(db, skip=skip, limit=limit)
-    return offers
-
-@router.get("/offers/{offer_id}", response_model=Offer)
-def read_offer(offer_id: str, db: Session = Depends(get_db)):
-    db_offer = get_offer(db, offer_id=offer_id)
-    if db_offer is None:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    return db_offer
-
-@router.put("/offers/{offer_id}", response_model=Offer)
-def update_existing_offer(offer_id: str, offer: OfferUpdate, db: Session = Depends(get_db)):
-    db_offer = update_offer(db, offer_id=offer_id, offer_update=offer)
-    if db_offer is None:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    return db_offer
-
-@router.delete("/offers/{offer_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_existing_offer(offer_id: str, db: Session = Depends(get_db)):
-    success = delete_offer(db, offer_id=offer_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    return None
-
-# Event-Offer association routes
-@router.post("/event-offers/", response_model=EventOfferCreate, status_code=status.HTTP_201_CREATED)
-def create_event_offer_link(association: EventOfferCreate, db: Session = Depends(get_db)):
-    # Check if event exists
-    db_event = get_event(db, event_id=association.event_id)
-    if db_event is None:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if offer exists
-    db_offer = get_offer(db, offer_id=association.offer_id)
-    if db_offer is None:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    
-    return create_event_offer_association(db=db, association=association)
-
-@router.put("/event-offers/{event_id}/{offer_id}", response_model=EventOfferUpdate)
-def update_event_offer_link(event_id: str, offer_id: str, association_update: EventOfferUpdate, db: Session = Depends(get_db)):
-    # Check if association exists
-    existing_assoc = get_event_offer_association(db, event_id, offer_id)
-    if existing_assoc is None:
-        raise HTTPException(status_code=404, detail="Event-Offer association not found")
-    
-    return update_event_offer_association(db, event_id, offer_id, association_update)
-
-@router.delete("/event-offers/{event_id}/{offer_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_event_offer_link(event_id: str, offer_id: str, db: Session = Depends(get_db)):
-    success = delete_event_offer_association(db, event_id, offer_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Event-Offer association not found")
-    return None
\ No newline at end of file
+from crud import event_offer as crud
+from crud.event_offer import DuplicateEntity, MissingReference, link_cursor_key
+from etag import PreconditionFailed, entity_etag, list_etag, not_modified, set_etag
+from pagination import InvalidCursor, next_cursor_headers
+from config import settings
+from fieldsets import Fieldset, fields_query
+from serialization import batch_response, entity_response, list_response
+from schemas.event_offer import EventCreate, EventUpdate, Event, EventFilter, OfferCreate, OfferUpdate, Offer, OfferFilter, BatchIds, EventBatch, OfferBatch, EventOfferBase, EventOfferCreate, EventOfferUpdate, EventOfferFilter
+
+event_fields = fields_query(Event)
+offer_fields = fields_query(Offer)
+
+# The routes are written once and built twice, once per DB_MODE. `run(db, fn, *args)`
+# calls a crud.event_offer function with the route's session: a sync Session in the
+# threadpool, an AsyncSession through run_sync (so both modes issue the same SQL).
+async def _in_threadpool(db, fn, *args, **kwargs):
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+async def _run_sync(db, fn, *args, **kwargs):
+    return await db.run_sync(fn, *args, **kwargs)
+
+def build_router(get_session: Callable, run: Callable) -> APIRouter:
+    router = APIRouter(prefix="/api", tags=["events-offers"])
+
+    # Event routes
+    @router.post("/events/", response_model=Event, status_code=status.HTTP_201_CREATED)
+    async def create_new_event(event: EventCreate, response: Response, db=Depends(get_session)):
+        try:
+            db_event = await run(db, crud.create_event, event=event)
+        except DuplicateEntity as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        set_etag(response, entity_etag(db_event.id, db_event.updated_at))
+        return db_event
+
+    @router.get("/events/", response_model=List[Event])
+    async def read_events(request: Request, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: EventFilter = Depends(), fields: Optional[Fieldset] = Depends(event_fields), db=Depends(get_session)):
+        # `cursor` switches to keyset pagination (skip is ignored); the next one is sent in X-Next-Cursor
+        try:
+            if "if-none-match" in request.headers:
+                # Revalidation: compare the page's (id, updated_at) pairs before loading any rows
+                versions = await run(db, crud.get_event_versions, skip=skip, limit=limit, cursor=cursor, filters=filters, fields=fields)
+                cached = not_modified(request, list_etag(versions, fields), next_cursor_headers(versions, limit))
+                if cached is not None:
+                    return cached
+            rows = await run(db, crud.get_event_rows, skip=skip, limit=limit, cursor=cursor, filters=filters, fields=fields)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return list_response(rows, limit, response, fields=fields)
+
+    @router.post("/events/batch", response_model=EventBatch)
+    async def read_events_batch(batch: BatchIds, fields: Optional[Fieldset] = Depends(event_fields), db=Depends(get_session)):
+        # Many ids in one request: the cache, then one chunked IN query for the rest
+        if len(batch.ids) > settings.batch_max_ids:
+            raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_ids} ids per batch")
+        rows, missing = await run(db, crud.get_events_by_ids, batch.ids, fields)
+        return batch_response(rows, missing, Event, fields)
+
+    @router.get("/events/{event_id}", response_model=Event)
+    async def read_event(event_id: str, request: Request, response: Response, fields: Optional[Fieldset] = Depends(event_fields), db=Depends(get_session)):
+        if "if-none-match" in request.headers:
+            version = await run(db, crud.get_event_version, event_id=event_id)
+            cached = version and not_modified(request, entity_etag(version.id, version.updated_at, fields))
+            if cached:
+                return cached
+        db_event = await run(db, crud.get_cached_event, event_id=event_id, fields=fields)
+        if db_event is None:
+            raise HTTPException(status_code=404, detail="Event not found")
+        if fields is not None:
+            return entity_response(vars(db_event), fields)
+        set_etag(response, entity_etag(db_event.id, db_event.updated_at))
+        return db_event
+
+    @router.put("/events/{event_id}", response_model=Event)
+    async def update_existing_event(event_id: str, event: EventUpdate, request: Request, response: Response, db=Depends(get_session)):
+        try:
+            db_event = await run(db, crud.update_event, event_id=event_id, event_update=event, if_match=request.headers.get("if-match"))
+        except PreconditionFailed:
+            raise HTTPException(status_code=412, detail="Event has been modified")
+        except DuplicateEntity as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if db_event is None:
+            raise HTTPException(status_code=404, detail="Event not found")
+        set_etag(response, entity_etag(db_event.id, db_event.updated_at))
+        return db_event
+
+    @router.delete("/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
+    async def delete_existing_event(event_id: str, request: Request, db=Depends(get_session)):
+        try:
+            success = await run(db, crud.delete_event, event_id=event_id, if_match=request.headers.get("if-match"))
+        except PreconditionFailed:
+            raise HTTPException(status_code=412, detail="Event has been modified")
+        if not success:
+            raise HTTPException(status_code=404, detail="Event not found")
+        return None
+
+    # Offer routes
+    @router.post("/offers/", response_model=Offer, status_code=status.HTTP_201_CREATED)
+    async def create_new_offer(offer: OfferCreate, response: Response, db=Depends(get_session)):
+        try:
+            db_offer = await run(db, crud.create_offer, offer=offer)
+        except DuplicateEntity as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        set_etag(response, entity_etag(db_offer.id, db_offer.updated_at))
+        return db_offer
+
+    @router.get("/offers/", response_model=List[Offer])
+    async def read_offers(request: Request, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: OfferFilter = Depends(), fields: Optional[Fieldset] = Depends(offer_fields), db=Depends(get_session)):
+        # `cursor` switches to keyset pagination (skip is ignored); the next one is sent in X-Next-Cursor
+        try:
+            if "if-none-match" in request.headers:
+                # Revalidation: compare the page's (id, updated_at) pairs before loading any rows
+                versions = await run(db, crud.get_offer_versions, skip=skip, limit=limit, cursor=cursor, filters=filters, fields=fields)
+                cached = not_modified(request, list_etag(versions, fields), next_cursor_headers(versions, limit))
+                if cached is not None:
+                    return cached
+            rows = await run(db, crud.get_offer_rows, skip=skip, limit=limit, cursor=cursor, filters=filters, fields=fields)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return list_response(rows, limit, response, fields=fields)
+
+    @router.post("/offers/batch", response_model=OfferBatch)
+    async def read_offers_batch(batch: BatchIds, fields: Optional[Fieldset] = Depends(offer_fields), db=Depends(get_session)):
+        # Many ids in one request: the cache, then one chunked IN query for the rest
+        if len(batch.ids) > settings.batch_max_ids:
+            raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_ids} ids per batch")
+        rows, missing = await run(db, crud.get_offers_by_ids, batch.ids, fields)
+        return batch_response(rows, missing, Offer, fields)
+
+    @router.get("/offers/{offer_id}", response_model=Offer)
+    async def read_offer(offer_id: str, request: Request, response: Response, fields: Optional[Fieldset] = Depends(offer_fields), db=Depends(get_session)):
+        if "if-none-match" in request.headers:
+            version = await run(db, crud.get_offer_version, offer_id=offer_id)
+            cached = version and not_modified(request, entity_etag(version.id, version.updated_at, fields))
+            if cached:
+                return cached
+        db_offer = await run(db, crud.get_cached_offer, offer_id=offer_id, fields=fields)
+        if db_offer is None:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        if fields is not None:
+            return entity_response(vars(db_offer), fields)
+        set_etag(response, entity_etag(db_offer.id, db_offer.updated_at))
+        return db_offer
+
+    @router.put("/offers/{offer_id}", response_model=Offer)
+    async def update_existing_offer(offer_id: str, offer: OfferUpdate, request: Request, response: Response, db=Depends(get_session)):
+        try:
+            db_offer = await run(db, crud.update_offer, offer_id=offer_id, offer_update=offer, if_match=request.headers.get("if-match"))
+        except PreconditionFailed:
+            raise HTTPException(status_code=412, detail="Offer has been modified")
+        except DuplicateEntity as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if db_offer is None:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        set_etag(response, entity_etag(db_offer.id, db_offer.updated_at))
+        return db_offer
+
+    @router.delete("/offers/{offer_id}", status_code=status.HTTP_204_NO_CONTENT)
+    async def delete_existing_offer(offer_id: str, request: Request, db=Depends(get_session)):
+        try:
+            success = await run(db, crud.delete_offer, offer_id=offer_id, if_match=request.headers.get("if-match"))
+        except PreconditionFailed:
+            raise HTTPException(status_code=412, detail="Offer has been modified")
+        if not success:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        return None
+
+    # Event-Offer association routes
+    @router.post("/event-offers/", response_model=EventOfferCreate, status_code=status.HTTP_201_CREATED)
+    async def create_event_offer_link(association: EventOfferCreate, db=Depends(get_session)):
+        try:
+            return await run(db, crud.create_event_offer_association, association=association)
+        except MissingReference as exc:
+            raise HTTPException(status_code=404, detail=str(exc))
+        except DuplicateEntity as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    @router.get("/event-offers/", response_model=List[EventOfferBase])
+    async def read_event_offer_links(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, filters: EventOfferFilter = Depends(), db=Depends(get_session)):
+        # Links by event, by offer and/or by action_type; `cursor` works as for events and offers
+        try:
+            rows = await run(db, crud.get_event_offer_rows, skip=skip, limit=limit, cursor=cursor, filters=filters)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return list_response(rows, limit, response, key=link_cursor_key)
+
+    @router.get("/event-offers/{event_id}/{offer_id}", response_model=EventOfferBase)
+    async def read_event_offer_link(event_id: str, offer_id: str, db=Depends(get_session)):
+        db_association = await run(db, crud.get_event_offer_association, event_id, offer_id)
+        if db_association is None:
+            raise HTTPException(status_code=404, detail="Event-Offer association not found")
+        return db_association
+
+    @router.put("/event-offers/{event_id}/{offer_id}", response_model=EventOfferUpdate)
+    async def update_event_offer_link(event_id: str, offer_id: str, association_update: EventOfferUpdate, db=Depends(get_session)):
+        db_association = await run(db, crud.update_event_offer_association, event_id, offer_id, association_update)
+        if db_association is None:
+            raise HTTPException(status_code=404, detail="Event-Offer association not found")
+        return db_association
+
+    @router.delete("/event-offers/{event_id}/{offer_id}", status_code=status.HTTP_204_NO_CONTENT)
+    async def delete_event_offer_link(event_id: str, offer_id: str, db=Depends(get_session)):
+        success = await run(db, crud.delete_event_offer_association, event_id, offer_id)
+        if not success:
+            raise HTTPException(status_code=404, detail="Event-Offer association not found")
+        return None
+
+    return router
+
+router = build_router(get_db, _in_threadpool)
+async_router = build_router(get_async_db, _run_sync)
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from services.expiry import expiry_sweeper
+
+router = APIRouter(prefix="/api", tags=["expiry"])
+
+@router.get("/expiry/stats")
+async def read_expiry_stats():
+    # Events and links this process has swept, batch timings, and what has expired since
+    return {**expiry_sweeper.stats(), **await run_in_threadpool(expiry_sweeper.pending)}
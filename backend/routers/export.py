@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from services.export import EXPORT_TABLES, MEDIA_TYPES, iter_export
+
+router = APIRouter(prefix="/api", tags=["export"])
+
+@router.get("/export/{entity}")
+def export_entity(entity: str, format: str = "ndjson"):
+    table = EXPORT_TABLES.get(entity)
+    if table is None:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be ndjson or csv")
+    # The generator opens its own session: it outlives the request handler
+    return StreamingResponse(
+        iter_export(table, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{format}"'},
+    )
@@ -0,0 +1,48 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from pagination import InvalidCursor, next_cursor_headers
+from schemas.event_offer import EventOfferGraph, EventWithOffers, OfferWithEvents
+from crud.event_offer_async import (
+    get_events_with_offers, get_event_with_offers, get_offers_with_events, get_offer_with_events, get_graph
+)
+
+router = APIRouter(prefix="/api/graph", tags=["graph"])
+
+# Every route here runs a fixed number of queries (see "Graph reads" in crud.event_offer)
+@router.get("/events", response_model=List[EventWithOffers])
+async def read_events_with_offers(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    try:
+        events = await get_events_with_offers(db, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    response.headers.update(next_cursor_headers(events, limit))
+    return events
+
+@router.get("/events/{event_id}", response_model=EventWithOffers)
+async def read_event_with_offers(event_id: str, db: AsyncSession = Depends(get_async_db)):
+    event = await get_event_with_offers(db, event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return event
+
+@router.get("/offers", response_model=List[OfferWithEvents])
+async def read_offers_with_events(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    try:
+        offers = await get_offers_with_events(db, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    response.headers.update(next_cursor_headers(offers, limit))
+    return offers
+
+@router.get("/offers/{offer_id}", response_model=OfferWithEvents)
+async def read_offer_with_events(offer_id: str, db: AsyncSession = Depends(get_async_db)):
+    offer = await get_offer_with_events(db, offer_id)
+    if offer is None:
+        raise HTTPException(status_code=404, detail="Offer not found")
+    return offer
+
+@router.get("", response_model=EventOfferGraph)
+async def read_graph(db: AsyncSession = Depends(get_async_db)):
+    return await get_graph(db)
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from schemas.event_offer import EventOccurrenceCreate, IngestRejection, IngestResult
+from services.ingest import QueueFull, ingest_pipeline
+from services.resolution_index import resolution_index
+
+router = APIRouter(prefix="/api/occurrences", tags=["ingest"])
+
+def _occurred_at(value: Optional[datetime], received_at: datetime) -> datetime:
+    if value is None:
+        return received_at
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+def _submit(accepted) -> None:
+    try:
+        ingest_pipeline.submit(accepted)
+    except QueueFull as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": "1"})
+
+@router.post("", response_model=IngestResult, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_occurrence(occurrence: EventOccurrenceCreate):
+    if not resolution_index.loaded:
+        await run_in_threadpool(resolution_index.ensure_loaded)
+    compiled = resolution_index.get(occurrence.event_code)
+    if compiled is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    _submit([(compiled, _occurred_at(occurrence.occurred_at, ingest_pipeline.clock()))])
+    return IngestResult(accepted=1)
+
+@router.post("/batch", response_model=IngestResult, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_occurrences(occurrences: List[EventOccurrenceCreate]):
+    # Unknown codes are reported per item; the rest are queued together or, if their
+    # queue is full, the whole request gets 429 and nothing is queued
+    if not resolution_index.loaded:
+        await run_in_threadpool(resolution_index.ensure_loaded)
+    received_at = ingest_pipeline.clock()
+    accepted, rejected = [], []
+    for index, occurrence in enumerate(occurrences):
+        compiled = resolution_index.get(occurrence.event_code)
+        if compiled is None:
+            rejected.append(IngestRejection(index=index, event_code=occurrence.event_code, error="Event not found"))
+        else:
+            accepted.append((compiled, _occurred_at(occurrence.occurred_at, received_at)))
+    _submit(accepted)
+    return IngestResult(accepted=len(accepted), rejected=rejected)
+
+@router.get("/stats")
+async def read_ingest_stats():
+    return ingest_pipeline.stats()
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from services.outbox import outbox_dispatcher
+
+router = APIRouter(prefix="/api", tags=["outbox"])
+
+@router.get("/outbox/stats")
+async def read_outbox_stats():
+    # Delivery counters, throughput and lag of this process plus what is still queued
+    return {**outbox_dispatcher.stats(), **await run_in_threadpool(outbox_dispatcher.pending)}
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from schemas.event_offer import EventActions
+from services.resolution_index import resolution_index
+
+router = APIRouter(prefix="/api", tags=["resolution"])
+
+@router.get("/events/by-code/{code}/actions", response_model=EventActions)
+async def read_event_actions(code: str):
+    # Served from the in-memory index; only the very first call loads it from the database
+    if resolution_index.loaded:
+        compiled = resolution_index.get(code)
+    else:
+        compiled = await run_in_threadpool(resolution_index.get, code)
+    if compiled is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return Response(content=compiled.body, media_type="application/json")
@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from services.scheduler import action_scheduler
+
+router = APIRouter(prefix="/api", tags=["scheduler"])
+
+@router.get("/scheduler/stats")
+async def read_scheduler_stats():
+    # Pending timers in this process plus fired/cancelled/recovered counters
+    return action_scheduler.stats()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 # Event schemas
@@ -27,8 +27,13 @@ class EventInDBBase(EventBase):
 class Event(EventInDBBase):
     pass
 
+class LinkedEvent(Event):
+    # An event as seen from one of its offers, with that link's settings
+    delay_minutes: Optional[int] = 0
+    action_type: Optional[str] = "enable"
+
 class EventWithOffers(Event):
-    offers: List['Offer'] = []
+    offers: List['LinkedOffer'] = []
 
 # Offer schemas
 class OfferBase(BaseModel):
@@ -54,8 +59,40 @@ class OfferInDBBase(OfferBase):
 class Offer(OfferInDBBase):
     pass
 
+class LinkedOffer(Offer):
+    # An offer as seen from one of its events, with that link's settings
+    delay_minutes: Optional[int] = 0
+    action_type: Optional[str] = "enable"
+
 class OfferWithEvents(Offer):
-    events: List['Event'] = []
+    events: List[LinkedEvent] = []
+
+# List filters, taken from the query string of GET /events/ and /offers/. q is a
+# full-text search over name and description: every word must match, as a prefix.
+class EventFilter(BaseModel):
+    queue_name: Optional[str] = None
+    disable_all_campaigns: Optional[bool] = None
+    min_lifetime_hours: Optional[int] = None
+    max_lifetime_hours: Optional[int] = None
+    q: Optional[str] = None
+
+class OfferFilter(BaseModel):
+    target_system: Optional[str] = None
+    min_priority: Optional[int] = None
+    max_priority: Optional[int] = None
+    q: Optional[str] = None
+
+# Batch lookups: found entities in request order (each id once), unknown ids in missing
+class BatchIds(BaseModel):
+    ids: List[str]
+
+class EventBatch(BaseModel):
+    items: List[Event] = []
+    missing: List[str] = []
+
+class OfferBatch(BaseModel):
+    items: List[Offer] = []
+    missing: List[str] = []
 
 # EventOffer association schemas
 class EventOfferBase(BaseModel):
@@ -71,6 +108,11 @@ class EventOfferUpdate(BaseModel):
     delay_minutes: Optional[int] = None
     action_type: Optional[str] = None
 
+class EventOfferFilter(BaseModel):
+    event_id: Optional[str] = None
+    offer_id: Optional[str] = None
+    action_type: Optional[str] = None
+
 class EventOfferInDB(EventOfferBase):
     created_at: datetime
     updated_at: datetime
@@ -78,4 +120,66 @@ class EventOfferInDB(EventOfferBase):
     model_config = ConfigDict(from_attributes=True)
 
 class EventOffer(EventOfferInDB):
-    pass
\ No newline at end of file
+    pass
+
+EventWithOffers.model_rebuild()
+
+# Whole event/offer graph: each node once, links as an edge list referring to node ids
+class EventOfferGraph(BaseModel):
+    events: List[Event] = []
+    offers: List[Offer] = []
+    links: List[EventOfferBase] = []
+# Event -> offer resolution schemas
+class OfferAction(BaseModel):
+    offer_id: str
+    offer_code: str
+    priority: int
+    delay_minutes: int
+    action_type: str
+    target_system: str
+
+class EventActions(BaseModel):
+    event_id: str
+    event_code: str
+    disable_all_campaigns: bool
+    actions: List[OfferAction] = []
+
+# Bulk import schemas
+class BulkRowResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: str  # created, updated or rejected
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    created: int
+    updated: int
+    rejected: int
+    results: List[BulkRowResult] = []
+
+# Event-occurrence ingest schemas
+class EventOccurrenceCreate(BaseModel):
+    event_code: str
+    # Defaults to the time the occurrence is received; naive values are taken as UTC
+    occurred_at: Optional[datetime] = None
+
+class IngestRejection(BaseModel):
+    index: int
+    event_code: str
+    error: str
+
+class IngestResult(BaseModel):
+    accepted: int
+    rejected: List[IngestRejection] = []
+
+# Change feed
+class Change(BaseModel):
+    seq: int
+    kind: str  # event, offer or link
+    op: str  # upserted (data is the current state) or deleted (data is the key)
+    data: Dict[str, Any]
+
+class ChangePage(BaseModel):
+    changes: List[Change] = []
+    last_seq: int  # pass as since= to get the next page
+    has_more: bool
@@ -0,0 +1,75 @@
+from typing import Callable, List, Optional, Type
+import orjson
+from pydantic import BaseModel
+from fastapi import Response
+from config import settings
+from etag import entity_etag, list_etag, set_etag
+from fieldsets import Fieldset
+from pagination import next_cursor_headers
+from services.cache import as_row
+
+# Fast path for list pages. Validating every row through response_model (from_attributes)
+# dominates the CPU time of a large page, so the rows are kept as the column dicts the
+# crud layer selects, already in the schema's field order, and encoded by orjson in one
+# call. Returning a Response skips FastAPI's validation while the route keeps its
+# response_model, so the OpenAPI schema does not change. OPT_UTC_Z writes aware UTC
+# datetimes with a "Z", as pydantic does; naive ones come out identical already.
+
+JSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dump_rows(rows: List[dict]) -> bytes:
+    return orjson.dumps(rows, option=JSON_OPTIONS)
+
+
+def list_response(rows: List[dict], limit: int, response: Response, key: Optional[Callable] = None, fields: Optional[Fieldset] = None):
+    """What a list route returns for one page of column dicts: encoded JSON, or with
+    validate_list_responses the rows as objects for FastAPI to validate. ``key`` gives
+    the cursor of rows not keyed by id; such rows (links) have no updated_at, so their
+    pages carry no ETag. A page read for a sparse fieldset is cut down to its fields
+    (and validated against the cut-down schema rather than the route's response_model)."""
+    headers = next_cursor_headers(rows, limit, key)
+    etag = list_etag(rows, fields) if key is None else None
+    if fields is not None:
+        rows = fields.project_all(rows)
+    elif settings.validate_list_responses:
+        response.headers.update(headers)
+        if etag is not None:
+            set_etag(response, etag)
+        return [as_row(values) for values in rows]
+    encoded = Response(dump_rows(rows), media_type="application/json", headers=headers)
+    if etag is not None:
+        set_etag(encoded, etag)
+    return encoded
+
+
+def batch_response(rows: List[dict], missing: List[str], schema: Type[BaseModel], fields: Optional[Fieldset] = None):
+    """What a batch lookup returns: the found rows (cache entries, so copied into the
+    schema's field order) and the missing ids, encoded like a list page."""
+    if fields is not None:
+        return encoded_response({"items": fields.project_all(rows), "missing": missing})
+    names = list(schema.model_fields)
+    items = [{name: values[name] for name in names} for values in rows]
+    if settings.validate_list_responses:
+        return {"items": [as_row(values) for values in items], "missing": missing}
+    return json_response({"items": items, "missing": missing})
+
+
+def json_response(value):
+    """Encode a response body built from column dicts; with validate_list_responses the
+    value is returned as is, for FastAPI to validate against the route's response_model."""
+    if settings.validate_list_responses:
+        return value
+    return encoded_response(value)
+
+
+def encoded_response(value, etag: Optional[str] = None) -> Response:
+    encoded = Response(orjson.dumps(value, option=JSON_OPTIONS), media_type="application/json")
+    if etag is not None:
+        set_etag(encoded, etag)
+    return encoded
+
+
+def entity_response(values: dict, fields: Fieldset) -> Response:
+    """A single event or offer read for a sparse fieldset, with that fieldset's ETag."""
+    return encoded_response(fields.project(values), entity_etag(values["id"], values["updated_at"], fields))
@@ -0,0 +1,254 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Protocol
+import orjson
+from config import settings
+
+# Read-through cache for event/offer reads. Entries are plain column dicts (never ORM
+# objects) so they can be shared between sessions, threads and, with a shared store,
+# processes. Entity entries are keyed by id and deleted on write to that id, with a
+# per-id version so a fill racing the write is dropped; list entries are keyed by their
+# query parameters plus a per-kind generation that every write bumps, since any write
+# can move rows between pages, which retires the cached pages of that kind at once.
+
+MISSING = object()
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Any: ...
+    def set(self, key: str, value: Any) -> None: ...
+    def delete(self, key: str) -> None: ...
+    def incr(self, key: str) -> int: ...
+    def stats(self) -> Dict[str, int]: ...
+
+
+class InProcessCache:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counts["misses"] += 1
+                return MISSING
+            if entry[1] <= self._clock():
+                del self._entries[key]
+                self._counts["expirations"] += 1
+                self._counts["misses"] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counts["evictions"] += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        # Generations and per-id versions live outside the LRU so they are never evicted
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def generation(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._counts, "entries": len(self._entries)}
+
+
+class SharedStore(Protocol):
+    # The subset of the redis-py client API the shared backend needs
+    def get(self, name: str) -> Optional[bytes]: ...
+    def set(self, name: str, value: bytes, ex: Optional[int] = None) -> Any: ...
+    def delete(self, *names: str) -> Any: ...
+    def incr(self, name: str) -> int: ...
+
+
+def _encode_value(value: Any) -> Any:
+    # orjson has no datetime decoder, so datetimes are tagged to come back as datetimes
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"Cannot cache {type(value).__name__}")
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    if isinstance(value, dict):
+        if value.keys() == {"$datetime"}:
+            return datetime.fromisoformat(value["$datetime"])
+        return {key: _decode_value(item) for key, item in value.items()}
+    return value
+
+
+class SharedStoreCache:
+    # Eviction is left to the store (e.g. Redis maxmemory-policy allkeys-lru). Values are
+    # stored as JSON, never pickled, so whatever sits in the store is data, not code.
+    def __init__(self, store: SharedStore, ttl_seconds: float = 30.0, prefix: str = "eo:"):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: str) -> Any:
+        raw = self.store.get(self.prefix + key)
+        if raw is None:
+            self._counts["misses"] += 1
+            return MISSING
+        self._counts["hits"] += 1
+        return _decode_value(orjson.loads(raw))
+
+    def set(self, key: str, value: Any) -> None:
+        encoded = orjson.dumps(value, default=_encode_value, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        self.store.set(self.prefix + key, encoded, ex=max(1, int(self.ttl_seconds)))
+
+    def delete(self, key: str) -> None:
+        self.store.delete(self.prefix + key)
+
+    def incr(self, key: str) -> int:
+        return int(self.store.incr(self.prefix + key))
+
+    def generation(self, key: str) -> int:
+        raw = self.store.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+
+class NullCache:
+    def get(self, key: str) -> Any:
+        return MISSING
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def incr(self, key: str) -> int:
+        return 0
+
+    def generation(self, key: str) -> int:
+        return 0
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+def as_row(values: Optional[dict]) -> Optional[SimpleNamespace]:
+    # Attribute access keeps cached rows interchangeable with ORM objects for the routes
+    return SimpleNamespace(**values) if values is not None else None
+
+
+class EntityCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.invalidations = 0
+
+    def get_entity(self, kind: str, entity_id: str, load: Callable[[], Optional[dict]]) -> Optional[dict]:
+        key = f"{kind}:id:{entity_id}"
+        values = self.backend.get(key)
+        if values is MISSING:
+            version = self.backend.generation(f"{kind}:ver:{entity_id}")
+            values = load()
+            # Skip the fill if a write to this id landed while loading (the value may
+            # predate it); misses are never cached, so creates only retire list pages
+            if values is not None and self.backend.generation(f"{kind}:ver:{entity_id}") == version:
+                self.backend.set(key, values)
+        return values
+
+    def get_entities(self, kind: str, entity_ids: List[str], load: Callable[[List[str]], Dict[str, dict]]) -> Dict[str, dict]:
+        """get_entity for many ids: the cached ones are read entry by entry, the rest come
+        from one ``load(missing_ids)`` call, which returns values by id."""
+        found, missing = {}, []
+        for entity_id in entity_ids:
+            values = self.backend.get(f"{kind}:id:{entity_id}")
+            if values is MISSING:
+                missing.append(entity_id)
+            else:
+                found[entity_id] = values
+        if missing:
+            versions = {entity_id: self.backend.generation(f"{kind}:ver:{entity_id}") for entity_id in missing}
+            loaded = load(missing)
+            for entity_id, values in loaded.items():
+                if self.backend.generation(f"{kind}:ver:{entity_id}") == versions.get(entity_id):
+                    self.backend.set(f"{kind}:id:{entity_id}", values)
+            found.update(loaded)
+        return found
+
+    def peek_entity(self, kind: str, entity_id: str) -> Optional[dict]:
+        values = self.backend.get(f"{kind}:id:{entity_id}")
+        return None if values is MISSING else values
+
+    def _list_key(self, kind: str, params: tuple) -> str:
+        return f"{kind}:list:{self.backend.generation(kind + ':gen')}:{params!r}"
+
+    def get_list(self, kind: str, params: tuple, load: Callable[[], list]) -> list:
+        key = self._list_key(kind, params)
+        rows = self.backend.get(key)
+        if rows is MISSING:
+            rows = load()
+            self.backend.set(key, rows)
+        return rows
+
+    def peek_list(self, kind: str, params: tuple) -> Optional[list]:
+        rows = self.backend.get(self._list_key(kind, params))
+        return None if rows is MISSING else rows
+
+    def invalidate(self, kind: str, *entity_ids: str) -> None:
+        # Only the written ids leave the entity cache; every list page of the kind goes
+        for entity_id in entity_ids:
+            self.backend.delete(f"{kind}:id:{entity_id}")
+            self.backend.incr(f"{kind}:ver:{entity_id}")
+        self.backend.incr(kind + ":gen")
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.backend.stats(), "invalidations": self.invalidations}
+
+
+def make_backend():
+    if settings.cache_backend == "none":
+        return NullCache()
+    return InProcessCache(settings.cache_max_entries, settings.cache_ttl_seconds)
+
+
+entity_cache = EntityCache(make_backend())
+
+
+def configure_cache(backend) -> None:
+    # e.g. configure_cache(SharedStoreCache(redis.Redis(...))) to share the cache between workers
+    entity_cache.backend = backend
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Set, Tuple
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from models.base import utcnow
+from models.change import EntityChange
+from serialization import JSON_OPTIONS
+
+# Change feed for delta sync. Every CRUD write records what it changed in entity_changes
+# inside its own transaction, so the log holds a change exactly when it commits. Each
+# entity keeps only its latest row, under a seq taken from a counter that never goes
+# back: a client that remembers the last seq it saw gets everything that changed since
+# then by asking for seq > that, and nothing else. That needs seqs to commit in order, or a
+# reader could move past one that commits late and never see it. On SQLite writes are
+# serialized by the database lock; on Postgres the writers of the log take a transaction
+# advisory lock (held until they commit or roll back) before they take a seq.
+#
+# Deleted entities leave a row too, which is dropped after changes_retention_seconds. A
+# client whose last seq is older than the newest dropped deletion could miss it, so it is
+# told to sync again from 0. That horizon is kept as a row of its own (kind "log") whose
+# seq is the seq of the newest dropped deletion; no other row can ever take that seq.
+
+logger = logging.getLogger(__name__)
+
+_table = EntityChange.__table__
+
+HORIZON_KIND = "log"
+HORIZON_ID = "horizon"
+
+
+# pg_advisory_xact_lock key of the change log, any constant no other lock uses
+CHANGES_LOCK_ID = 0x6368616E676573
+
+
+class ChangesCompacted(Exception):
+    def __init__(self, horizon: int):
+        super().__init__(horizon)
+        self.horizon = horizon
+
+
+def _serialize(db: Session) -> None:
+    if db.get_bind().dialect.name != "sqlite":
+        db.execute(select(func.pg_advisory_xact_lock(CHANGES_LOCK_ID)))
+
+
+def _postgres_upsert():
+    from sqlalchemy.dialects.postgresql import insert
+    stmt = insert(_table)
+    # The entity's row moves to a new seq; concurrent writers of the same entity no longer
+    # race between a delete and an insert
+    return stmt.on_conflict_do_update(index_elements=["kind", "entity_id", "linked_id"], set_={
+        "seq": func.nextval(func.pg_get_serial_sequence(_table.name, "seq")),
+        "op": stmt.excluded.op,
+        "changed_at": stmt.excluded.changed_at,
+    })
+
+
+# Writer, called inside the caller's transaction (crud.event_offer)
+def record_changes(
+    db: Session, op: str = "upserted", events: Iterable[str] = (), offers: Iterable[str] = (),
+    links: Iterable[Tuple[str, str]] = (),
+) -> None:
+    now = utcnow()
+    keys = [("event", event_id, "") for event_id in events]
+    keys += [("offer", offer_id, "") for offer_id in offers]
+    keys += [("link", event_id, offer_id) for event_id, offer_id in links]
+    if not keys:
+        return
+    rows = [{"kind": kind, "entity_id": entity_id, "linked_id": linked_id, "op": op, "changed_at": now} for kind, entity_id, linked_id in keys]
+    if db.get_bind().dialect.name == "sqlite":
+        # REPLACE deletes the entity's previous row and inserts this one under a new seq
+        db.execute(insert(_table).prefix_with("OR REPLACE"), rows)
+    else:
+        _serialize(db)
+        db.execute(_postgres_upsert(), rows)
+    db.info["changes_recorded"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_streams(session):
+    if session.info.pop("changes_recorded", False):
+        change_feed.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("changes_recorded", None)
+
+
+def _message(name: str, data: dict, seq: Optional[int] = None) -> str:
+    head = f"id: {seq}\n" if seq is not None else ""
+    return f"{head}event: {name}\ndata: {orjson.dumps(data, option=JSON_OPTIONS).decode()}\n\n"
+
+
+def read_horizon(db: Session) -> int:
+    return db.execute(select(_table.c.seq).where(_table.c.kind == HORIZON_KIND)).scalar() or 0
+
+
+class ChangeFeed:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        retention_seconds: float = 7 * 24 * 3600,
+        compact_seconds: float = 3600.0,
+        poll_seconds: float = 1.0,
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.session_factory = session_factory
+        self.retention_seconds = retention_seconds
+        self.compact_seconds = compact_seconds
+        self.poll_seconds = poll_seconds
+        self.clock = clock
+        self._task: Optional[asyncio.Task] = None
+        # One wake-up event per open stream, with the loop it waits on
+        self._streams: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.counters = Counter()
+
+    def notify(self) -> None:
+        """Wake the streams after a commit; safe from worker threads."""
+        self.counters["notifications"] += 1
+        for loop, wake in list(self._streams):
+            loop.call_soon_threadsafe(wake.set)
+
+    async def stream(self, since: int, read: Callable[[int], Awaitable[dict]], is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[str]:
+        """Server-sent events: every change after ``since`` as an "id: <seq>" event, then
+        new ones as they commit. ``read(since)`` returns a page as GET /api/changes does.
+        Commits in other processes are only seen by polling, every poll_seconds."""
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        self._streams.add(entry)
+        self.counters["streams_opened"] += 1
+        try:
+            while not await is_disconnected():
+                entry[1].clear()
+                try:
+                    page = await read(since)
+                except ChangesCompacted as exc:
+                    # The client must drop what it has and take the full state again
+                    yield _message("reset", {"horizon": exc.horizon})
+                    since = 0
+                    continue
+                for change in page["changes"]:
+                    yield _message("change", change, change["seq"])
+                since = page["last_seq"]
+                if page["has_more"]:
+                    continue
+                try:
+                    await asyncio.wait_for(entry[1].wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._streams.discard(entry)
+
+    def compact(self) -> int:
+        """Drop deletions older than the retention window and move the horizon past them."""
+        cutoff = self.clock() - timedelta(seconds=self.retention_seconds)
+        with self.session_factory() as db:
+            _serialize(db)
+            dropped = db.execute(
+                delete(_table).where(_table.c.op == "deleted", _table.c.changed_at < cutoff).returning(_table.c.seq)
+            ).scalars().all()
+            if dropped:
+                horizon = max(max(dropped), read_horizon(db))
+                db.execute(delete(_table).where(_table.c.kind == HORIZON_KIND))
+                db.execute(insert(_table).values(
+                    seq=horizon, kind=HORIZON_KIND, entity_id=HORIZON_ID, linked_id="", op="compacted", changed_at=self.clock(),
+                ))
+            db.commit()
+        self.counters["compacted"] += len(dropped)
+        return len(dropped)
+
+    async def start(self) -> None:
+        await self.stop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self.compact)
+            except Exception:
+                logger.exception("Change log compaction failed")
+            await asyncio.sleep(self.compact_seconds)
+
+    def stats(self) -> dict:
+        with self.session_factory() as db:
+            rows, last_seq = db.execute(select(func.count(), func.max(_table.c.seq)).where(_table.c.kind != HORIZON_KIND)).one()
+            horizon = read_horizon(db)
+        return {
+            "rows": rows, "last_seq": last_seq or 0, "horizon": horizon, "streams": len(self._streams),
+            **{key: self.counters[key] for key in ("notifications", "streams_opened", "compacted")},
+        }
+
+
+change_feed = ChangeFeed(
+    SessionLocal,
+    retention_seconds=settings.changes_retention_seconds,
+    compact_seconds=settings.changes_compact_seconds,
+    poll_seconds=settings.changes_poll_seconds,
+)
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from config import settings
+from crud import event_offer as crud
+from database import SessionLocal
+from models.base import utcnow
+from models.event_offer import Event
+
+# Deletes expired events (Event.expires_at, created_at + lifetime_hours) with their links.
+# The reads already leave expired events out, so nothing waits on the sweeper; it only
+# keeps them from piling up under every list, join and index. Each batch is one short
+# transaction of at most batch_size events, oldest expiry first off ix_events_expires_at,
+# and the sweeper sleeps pause_seconds between batches: on SQLite a foreground write waits
+# for one batch at most rather than for the whole backlog. A batch records what
+# delete_event does (change-log deletions, outbox messages, cache, resolution index and
+# scheduler), so downstream consumers see an expiry as a delete.
+
+logger = logging.getLogger(__name__)
+
+
+class ExpirySweeper:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = 500,
+        sweep_seconds: float = 60.0,
+        pause_seconds: float = 0.05,
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.sweep_seconds = sweep_seconds
+        self.pause_seconds = pause_seconds
+        self.clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self.counters = Counter()
+        self.batch_seconds = 0.0
+        self.max_batch_seconds = 0.0
+        self.last_sweep: Optional[dict] = None
+
+    def sweep_batch(self, now: Optional[datetime] = None) -> Tuple[int, int]:
+        """One transaction: (events, links) deleted."""
+        started = time.perf_counter()
+        with self.session_factory() as db:
+            event_ids, links = crud.delete_expired_events(db, self.batch_size, now or self.clock())
+        if event_ids:
+            elapsed = time.perf_counter() - started
+            self.counters["batches"] += 1
+            self.counters["events"] += len(event_ids)
+            self.counters["links"] += links
+            self.batch_seconds += elapsed
+            self.max_batch_seconds = max(self.max_batch_seconds, elapsed)
+        return len(event_ids), links
+
+    async def sweep(self) -> dict:
+        """Everything expired by now, batch after batch. The cutoff stays where the sweep
+        started, so events expiring meanwhile wait for the next one."""
+        now = self.clock()
+        started = time.perf_counter()
+        events = links = batches = 0
+        while True:
+            deleted, linked = await run_in_threadpool(self.sweep_batch, now)
+            events += deleted
+            links += linked
+            batches += bool(deleted)
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(self.pause_seconds)
+        elapsed = time.perf_counter() - started
+        self.counters["sweeps"] += 1
+        self.last_sweep = {
+            "events": events, "links": links, "batches": batches, "seconds": round(elapsed, 3),
+            "events_per_second": round(events / elapsed, 1) if elapsed > 0 else None,
+        }
+        return self.last_sweep
+
+    def pending(self) -> dict:
+        """Expired events still in the table."""
+        with self.session_factory() as db:
+            expired = db.execute(select(func.count()).where(Event.expires_at <= self.clock())).scalar_one()
+        return {"expired": expired}
+
+    async def start(self) -> None:
+        await self.stop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Expiry sweep failed")
+            await asyncio.sleep(self.sweep_seconds)
+
+    def stats(self) -> dict:
+        return {
+            **{key: self.counters[key] for key in ("sweeps", "batches", "events", "links")},
+            "batch_seconds": round(self.batch_seconds, 3),
+            "max_batch_seconds": round(self.max_batch_seconds, 3),
+            "last_sweep": self.last_sweep,
+        }
+
+
+class ExpiryCollector:
+    """Sweep throughput for /metrics: rows deleted and time spent in batches."""
+
+    def __init__(self, sweeper: ExpirySweeper):
+        self.sweeper = sweeper
+
+    def collect(self):
+        deleted = CounterMetricFamily("expiry_deleted", "Rows deleted by the expiry sweeper", labels=["table"])
+        deleted.add_metric(["events"], self.sweeper.counters["events"])
+        deleted.add_metric(["event_offer"], self.sweeper.counters["links"])
+        batches = CounterMetricFamily("expiry_batches", "Expiry sweep batches (transactions) that deleted events")
+        batches.add_metric([], self.sweeper.counters["batches"])
+        seconds = CounterMetricFamily("expiry_batch_seconds", "Time spent in expiry sweep batches")
+        seconds.add_metric([], self.sweeper.batch_seconds)
+        longest = GaugeMetricFamily("expiry_max_batch_seconds", "Longest expiry sweep batch, i.e. the longest write lock it held")
+        longest.add_metric([], self.sweeper.max_batch_seconds)
+        yield from (deleted, batches, seconds, longest)
+
+
+expiry_sweeper = ExpirySweeper(
+    SessionLocal,
+    batch_size=settings.expiry_batch_size,
+    sweep_seconds=settings.expiry_sweep_seconds,
+    pause_seconds=settings.expiry_batch_pause_seconds,
+)
+REGISTRY.register(ExpiryCollector(expiry_sweeper))
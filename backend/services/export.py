@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, Iterator
+from sqlalchemy import Table, select
+from sqlalchemy.orm import Session
+from crud.event_offer import _unexpired, _unexpired_links
+from database import SessionLocal
+from models.event_offer import Event, Offer, event_offer_association
+
+# Full-table dumps that stream rows straight from a server-side cursor. Rows are read as
+# plain tuples (no ORM identity map) yield_per at a time and each batch is encoded into
+# one chunk of bytes, so memory stays flat however large the table is.
+
+EXPORT_TABLES = {
+    "events": Event.__table__,
+    "offers": Offer.__table__,
+    "event-offers": event_offer_association,
+}
+
+# Expired events and their links are left out, as in the reads
+EXPORT_FILTERS = {
+    Event.__table__: _unexpired,
+    event_offer_association: _unexpired_links,
+}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _encode_ndjson(columns, rows) -> bytes:
+    dumps = json.JSONEncoder(default=_json_default, separators=(",", ":")).encode
+    return "".join(dumps(dict(zip(columns, row))) + "\n" for row in rows).encode()
+
+def _encode_csv(columns, rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+def iter_export(table: Table, fmt: str, session_factory: Callable[[], Session] = SessionLocal, yield_per: int = 1000) -> Iterator[bytes]:
+    columns = list(table.c.keys())
+    encode = _encode_ndjson if fmt == "ndjson" else _encode_csv
+    if fmt == "csv":
+        yield _encode_csv(columns, [columns])
+
+    primary_key = list(table.primary_key.columns)
+    stmt = select(table)
+    if table in EXPORT_FILTERS:
+        stmt = EXPORT_FILTERS[table](stmt)
+    stmt = stmt.order_by(*primary_key).execution_options(yield_per=yield_per)
+    with session_factory() as db:
+        for partition in db.execute(stmt).partitions():
+            yield encode(columns, partition)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from models.base import utcnow
+from models.occurrence import EventOccurrence, OccurrenceAction
+from services.resolution_index import EventActions, ResolutionIndex, resolution_index
+from services.scheduler import ActionScheduler, ScheduledAction, action_scheduler
+
+# Event-occurrence ingest. Accepted occurrences wait in one bounded asyncio queue per
+# Event.queue_name, so a burst on one queue cannot starve the others and a full queue
+# pushes back (QueueFull -> 429) instead of growing without limit. Each queue has its own
+# workers that take micro-batches, resolve them against the in-memory resolution index
+# and write a whole batch (occurrences plus their offer actions) in one transaction. The
+# committed actions are then handed to the scheduler, which fires them when due.
+#
+# Delivery is at-most-once: queued occurrences live in memory until their batch commits,
+# and a batch whose transaction fails is logged and dropped.
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    def __init__(self, queue_name: str):
+        super().__init__(f"Ingest queue {queue_name} is full")
+        self.queue_name = queue_name
+
+
+class IngestPipeline:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        index: ResolutionIndex,
+        queue_size: int = 50000,
+        batch_size: int = 1000,
+        batch_wait_seconds: float = 0.02,
+        workers_per_queue: int = 1,
+        clock: Callable[[], datetime] = utcnow,
+        scheduler: Optional[ActionScheduler] = None,
+    ):
+        self.session_factory = session_factory
+        self.index = index
+        self.scheduler = scheduler
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait_seconds = batch_wait_seconds
+        self.workers_per_queue = workers_per_queue
+        self.clock = clock
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self.counters = Counter()
+
+    def submit(self, occurrences: Sequence[Tuple[EventActions, datetime]]) -> None:
+        """Queue resolved occurrences, all or none: raises QueueFull if any target queue
+        lacks room for its share. Must be called on the event loop."""
+        self._bind_loop()
+        needed = Counter(compiled.queue_name for compiled, _ in occurrences)
+        for queue_name, count in needed.items():
+            queue = self._queue(queue_name)
+            if queue.maxsize - queue.qsize() < count:
+                self.counters["rejected_full"] += len(occurrences)
+                raise QueueFull(queue_name)
+        for compiled, occurred_at in occurrences:
+            # Only the code travels: the worker resolves again so link changes made while
+            # the occurrence was queued still apply
+            self._queues[compiled.queue_name].put_nowait((compiled.event_code, occurred_at))
+        self.counters["accepted"] += len(occurrences)
+
+    async def drain(self) -> None:
+        # Waits until everything queued so far has been written (or dropped)
+        for queue in list(self._queues.values()):
+            await queue.join()
+
+    async def stop(self) -> None:
+        if self._loop is not asyncio.get_running_loop():
+            return
+        await self.drain()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._loop, self._queues, self._workers = None, {}, []
+
+    def stats(self) -> dict:
+        return {
+            **{key: self.counters[key] for key in ("accepted", "rejected_full", "persisted", "actions", "dropped", "failed", "batches")},
+            "queues": {name: queue.qsize() for name, queue in self._queues.items()},
+        }
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (queues and tasks cannot cross loops)
+            self._loop, self._queues, self._workers = loop, {}, []
+
+    def _queue(self, queue_name: str) -> asyncio.Queue:
+        queue = self._queues.get(queue_name)
+        if queue is None:
+            queue = self._queues[queue_name] = asyncio.Queue(self.queue_size)
+            for _ in range(self.workers_per_queue):
+                self._workers.append(asyncio.create_task(self._work(queue)))
+        return queue
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            self._take(queue, batch)
+            if len(batch) < self.batch_size and self.batch_wait_seconds > 0:
+                # Let a trickle build up into a batch instead of one transaction per item
+                await asyncio.sleep(self.batch_wait_seconds)
+                self._take(queue, batch)
+            try:
+                persisted, actions, dropped = await run_in_threadpool(self._persist, batch)
+                self.counters.update(persisted=persisted, actions=actions, dropped=dropped, batches=1)
+            except Exception:
+                logger.exception("Dropping ingest batch of %d occurrences", len(batch))
+                self.counters["failed"] += len(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _take(self, queue: asyncio.Queue, batch: list) -> None:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    def _persist(self, batch: List[Tuple[str, datetime]]) -> Tuple[int, int, int]:
+        processed_at = self.clock()
+        occurrences, actions = [], []
+        for event_code, occurred_at in batch:
+            compiled = self.index.get(event_code)
+            if compiled is None:
+                # The event was deleted while the occurrence was queued
+                continue
+            occurrence_id = uuid.uuid4().hex
+            occurrences.append({
+                "id": occurrence_id,
+                "event_id": compiled.event_id,
+                "event_code": event_code,
+                "queue_name": compiled.queue_name,
+                "occurred_at": occurred_at,
+                "processed_at": processed_at,
+                "expires_at": occurred_at + timedelta(hours=compiled.lifetime_hours) if compiled.lifetime_hours else None,
+            })
+            actions.extend({
+                "occurrence_id": occurrence_id,
+                "offer_id": action.offer_id,
+                "action_type": action.action_type,
+                "target_system": action.target_system,
+                "due_at": occurred_at + timedelta(minutes=action.delay_minutes),
+            } for action in compiled.actions)
+        if occurrences:
+            with self.session_factory() as db:
+                db.execute(insert(EventOccurrence.__table__), occurrences)
+                if actions:
+                    db.execute(insert(OccurrenceAction.__table__), actions)
+                db.commit()
+        if actions and self.scheduler is not None:
+            event_ids = {occurrence["id"]: occurrence["event_id"] for occurrence in occurrences}
+            self.scheduler.schedule(ScheduledAction(
+                action["occurrence_id"], action["offer_id"], event_ids[action["occurrence_id"]],
+                action["action_type"], action["target_system"], action["due_at"],
+            ) for action in actions)
+        return len(occurrences), len(actions), len(batch) - len(occurrences)
+
+
+ingest_pipeline = IngestPipeline(
+    SessionLocal,
+    resolution_index,
+    queue_size=settings.ingest_queue_size,
+    batch_size=settings.ingest_batch_size,
+    batch_wait_seconds=settings.ingest_batch_wait_seconds,
+    workers_per_queue=settings.ingest_workers_per_queue,
+    scheduler=action_scheduler,
+)
@@ -0,0 +1,437 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from models.base import utcnow
+from models.event_offer import Offer, event_offer_association
+from models.outbox import OutboxMessage
+
+# Transactional outbox for the downstream Offer.target_system. CRUD writes and fired offer
+# actions add their messages to outbox_messages inside their own transaction, so a change
+# is recorded for delivery exactly when it commits and request latency never depends on a
+# downstream system. The dispatcher polls the table, coalesces each target's messages
+# (only the latest per key is sent), POSTs them in batches, and deletes what was
+# acknowledged. Every target has its own delivery loop, so a slow or unreachable target
+# only holds up its own messages, with at most `concurrency` batches in flight.
+#
+# Delivery is at-least-once: a batch whose response is lost is sent again, so receivers
+# should deduplicate on the message id. A failed batch ends its target's round, and the
+# rows after it wait with it until the backoff expires; with the default concurrency of
+# one that keeps each target's messages in order.
+
+logger = logging.getLogger(__name__)
+
+THROUGHPUT_WINDOW_SECONDS = 60.0
+LAG_SAMPLES = 10000
+
+_table = OutboxMessage.__table__
+
+
+def _json(payload: dict) -> str:
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands DateTime(timezone=True) back naive; every stored time is UTC
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+# Messages are only recorded for targets with a delivery URL (settings.outbox_target_urls,
+# or any target once outbox_default_url is set): nothing would ever send, and so delete,
+# the others. None stands for every target.
+def _routed_targets() -> Optional[Tuple[str, ...]]:
+    if settings.outbox_default_url is not None:
+        return None
+    return tuple(sorted(settings.outbox_target_urls))
+
+
+def _routed(target_system: Optional[str], targets: Optional[Tuple[str, ...]]) -> bool:
+    return target_system is not None and (targets is None or target_system in targets)
+
+
+# Writers, called inside the caller's transaction (crud.event_offer, the scheduler's firing batch)
+def enqueue_offers(db: Session, offers: Iterable, op: str = "upserted") -> None:
+    now, rows, targets = utcnow(), [], _routed_targets()
+    for offer in offers:
+        if not _routed(offer.target_system, targets):
+            continue
+        payload = {"type": f"offer.{op}", "offer_id": offer.id}
+        if op != "deleted":
+            payload.update(code=offer.code, priority=offer.priority)
+        rows.append({"target_system": offer.target_system, "key": f"offer:{offer.id}", "payload": _json(payload), "created_at": now})
+    if rows:
+        db.execute(insert(_table), rows)
+
+
+def enqueue_offer(db: Session, offer, op: str = "upserted") -> None:
+    enqueue_offers(db, [offer], op)
+
+
+def _target_filter(targets: Optional[Tuple[str, ...]]) -> tuple:
+    if targets is None:
+        return (Offer.target_system.is_not(None),)
+    return (Offer.target_system.in_(targets),)
+
+
+# The offer's target_system comes from the offers table in the same statement
+@lru_cache(maxsize=16)
+def _link_statement(targets: Optional[Tuple[str, ...]]):
+    return insert(_table).from_select(
+        ["target_system", "key", "payload", "created_at"],
+        select(
+            Offer.target_system,
+            bindparam("o_key", type_=_table.c.key.type),
+            bindparam("o_payload", type_=_table.c.payload.type),
+            bindparam("o_created_at", type_=_table.c.created_at.type),
+        ).where(Offer.id == bindparam("o_offer_id"), *_target_filter(targets)),
+    )
+
+
+def _link_params(event_id: str, offer_id: str, payload: dict, now: datetime) -> dict:
+    return {"o_offer_id": offer_id, "o_key": f"link:{event_id}:{offer_id}", "o_payload": _json(payload), "o_created_at": now}
+
+
+def enqueue_links(db: Session, links: Sequence) -> None:
+    targets = _routed_targets()
+    if links and targets != ():
+        now = utcnow()
+        db.execute(_link_statement(targets), [
+            _link_params(link.event_id, link.offer_id, {
+                "type": "link.upserted", "event_id": link.event_id, "offer_id": link.offer_id,
+                "delay_minutes": link.delay_minutes, "action_type": link.action_type,
+            }, now)
+            for link in links
+        ])
+
+
+def enqueue_link(db: Session, link) -> None:
+    enqueue_links(db, [link])
+
+
+def enqueue_link_deleted(db: Session, event_id: str, offer_id: str) -> None:
+    targets = _routed_targets()
+    if targets != ():
+        payload = {"type": "link.deleted", "event_id": event_id, "offer_id": offer_id}
+        db.execute(_link_statement(targets), _link_params(event_id, offer_id, payload, utcnow()))
+
+
+# One message per target with an offer linked to the event; runs before the links go
+@lru_cache(maxsize=16)
+def _event_deleted_statement(targets: Optional[Tuple[str, ...]]):
+    return insert(_table).from_select(
+        ["target_system", "key", "payload", "created_at"],
+        select(
+            Offer.target_system,
+            bindparam("o_key", type_=_table.c.key.type),
+            bindparam("o_payload", type_=_table.c.payload.type),
+            bindparam("o_created_at", type_=_table.c.created_at.type),
+        )
+        .join(event_offer_association, event_offer_association.c.offer_id == Offer.id)
+        .where(event_offer_association.c.event_id == bindparam("o_event_id"), *_target_filter(targets))
+        .distinct(),
+    )
+
+
+def enqueue_events_deleted(db: Session, event_ids: Sequence[str]) -> None:
+    targets = _routed_targets()
+    if event_ids and targets != ():
+        now = utcnow()
+        db.execute(_event_deleted_statement(targets), [
+            {"o_event_id": event_id, "o_key": f"event:{event_id}", "o_payload": _json({"type": "event.deleted", "event_id": event_id}), "o_created_at": now}
+            for event_id in event_ids
+        ])
+
+
+def enqueue_event_deleted(db: Session, event_id: str) -> None:
+    enqueue_events_deleted(db, [event_id])
+
+
+def enqueue_actions(db: Session, actions: Sequence) -> None:
+    """ActionScheduler handler: one message per fired action, never coalesced."""
+    now, targets = utcnow(), _routed_targets()
+    actions = [action for action in actions if _routed(action.target_system, targets)]
+    if not actions:
+        return
+    db.execute(insert(_table), [
+        {
+            "target_system": action.target_system,
+            "key": None,
+            "payload": _json({
+                "type": "offer.action", "action_type": action.action_type, "offer_id": action.offer_id,
+                "event_id": action.event_id, "occurrence_id": action.occurrence_id,
+                "due_at": _utc(action.due_at).isoformat(),
+            }),
+            "created_at": now,
+        }
+        for action in actions
+    ])
+
+
+class OutboxDispatcher:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        target_urls: Optional[Dict[str, str]] = None,
+        default_url: Optional[str] = None,
+        batch_size: int = 200,
+        fetch_size: int = 5000,
+        concurrency: int = 1,
+        poll_seconds: float = 0.5,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 300.0,
+        timeout_seconds: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.session_factory = session_factory
+        self.target_urls = dict(target_urls or {})
+        self.default_url = default_url
+        self.batch_size = batch_size
+        self.fetch_size = fetch_size
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        # Tests and benchmarks pass a local stand-in (httpx.ASGITransport, MockTransport)
+        self.transport = transport
+        self.clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self._lags: deque = deque(maxlen=LAG_SAMPLES)
+        self._deliveries: deque = deque()
+        self.counters = Counter()
+        self.target_counters: Dict[str, Counter] = defaultdict(Counter)
+
+    def url_for(self, target_system: str) -> Optional[str]:
+        url = self.target_urls.get(target_system)
+        if url is None and self.default_url is not None:
+            url = self.default_url.format(target_system=target_system)
+        return url
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=self.transport, timeout=self.timeout_seconds)
+
+    def _routed(self, stmt):
+        if self.default_url is None:
+            stmt = stmt.where(_table.c.target_system.in_(list(self.target_urls)))
+        return stmt
+
+    def _targets(self) -> List[str]:
+        """Targets with queued messages and somewhere to send them."""
+        if not self.target_urls and self.default_url is None:
+            return []
+        with self.session_factory() as db:
+            return db.execute(self._routed(select(_table.c.target_system).distinct())).scalars().all()
+
+    def _fetch(self, target_system: Optional[str] = None) -> list:
+        if not self.target_urls and self.default_url is None:
+            return []
+        waiting = select(_table.c.target_system).where(_table.c.next_attempt_at > self.clock())
+        stmt = (
+            select(_table.c.id, _table.c.target_system, _table.c.key, _table.c.payload, _table.c.created_at, _table.c.attempts)
+            .where(_table.c.target_system.not_in(waiting))
+            .order_by(_table.c.id)
+            .limit(self.fetch_size)
+        )
+        if target_system is not None:
+            stmt = stmt.where(_table.c.target_system == target_system)
+        with self.session_factory() as db:
+            return db.execute(self._routed(stmt)).all()
+
+    def _coalesce(self, rows: Sequence) -> Dict[str, List[Tuple[list, list]]]:
+        """Group rows by target, keep the latest row per key and cut each target's rows
+        into batches of (rows to send, every row the batch acknowledges), in order."""
+        by_target: Dict[str, dict] = {}
+        for row in rows:
+            latest = by_target.setdefault(row.target_system, {})
+            key = row.id if row.key is None else row.key
+            # Popped and re-added so the survivor keeps the position of the newest row
+            superseded = latest.pop(key, (None, []))[1]
+            latest[key] = (row, superseded + [row])
+        batches = {}
+        for target_system, latest in by_target.items():
+            entries = list(latest.values())
+            batches[target_system] = [
+                ([row for row, _ in chunk], [row for _, covered in chunk for row in covered])
+                for chunk in (entries[start:start + self.batch_size] for start in range(0, len(entries), self.batch_size))
+            ]
+        return batches
+
+    def _acknowledge(self, ids: List[int]) -> None:
+        with self.session_factory() as db:
+            db.execute(delete(_table).where(_table.c.id.in_(ids)))
+            db.commit()
+
+    def _retry(self, covered: Sequence) -> None:
+        attempts = max(row.attempts for row in covered) + 1
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+        with self.session_factory() as db:
+            db.execute(
+                update(_table).where(_table.c.id.in_([row.id for row in covered]))
+                .values(attempts=_table.c.attempts + 1, next_attempt_at=self.clock() + timedelta(seconds=delay))
+            )
+            db.commit()
+
+    async def _deliver(self, client: httpx.AsyncClient, target_system: str, rows: list, covered: list) -> bool:
+        body = {
+            "target_system": target_system,
+            "messages": [{"id": row.id, "created_at": _utc(row.created_at).isoformat(), **json.loads(row.payload)} for row in rows],
+        }
+        counters = self.target_counters[target_system]
+        try:
+            response = await client.post(self.url_for(target_system), json=body)
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            logger.warning("Outbox delivery of %d messages to %s failed: %r", len(rows), target_system, exc)
+            await run_in_threadpool(self._retry, covered)
+            self.counters["failed_batches"] += 1
+            counters["failed_batches"] += 1
+            return False
+        await run_in_threadpool(self._acknowledge, [row.id for row in covered])
+        now = self.clock()
+        self._lags.extend((now - _utc(row.created_at)).total_seconds() for row in covered)
+        self._deliveries.append((time.monotonic(), len(covered)))
+        for counter in (self.counters, counters):
+            counter["delivered"] += len(covered)
+            counter["sent"] += len(rows)
+            counter["batches"] += 1
+        self.counters["coalesced"] += len(covered) - len(rows)
+        return True
+
+    async def _deliver_target(self, client: httpx.AsyncClient, target_system: str, batches: list) -> None:
+        # Up to `concurrency` batches at a time, started in order; after the first failure
+        # no more are started, so the rest stay pending behind its backoff
+        semaphore = asyncio.Semaphore(self.concurrency)
+        failed = False
+
+        async def send(rows: list, covered: list) -> None:
+            nonlocal failed
+            try:
+                if not await self._deliver(client, target_system, rows, covered):
+                    failed = True
+            finally:
+                semaphore.release()
+
+        sending = []
+        for rows, covered in batches:
+            await semaphore.acquire()
+            if failed:
+                semaphore.release()
+                break
+            sending.append(asyncio.create_task(send(rows, covered)))
+        await asyncio.gather(*sending)
+
+    async def dispatch_target(self, client: httpx.AsyncClient, target_system: str) -> int:
+        """Fetch one round of a target's pending messages and deliver it; returns the rows fetched."""
+        rows = await run_in_threadpool(self._fetch, target_system)
+        for batches in self._coalesce(rows).values():
+            await self._deliver_target(client, target_system, batches)
+        return len(rows)
+
+    async def dispatch_once(self, client: Optional[httpx.AsyncClient] = None) -> int:
+        """One round for every target at once; returns the rows fetched."""
+        if client is None:
+            async with self._client() as client:
+                return await self.dispatch_once(client)
+        rows = await run_in_threadpool(self._fetch)
+        if rows:
+            await asyncio.gather(*(
+                self._deliver_target(client, target_system, batches)
+                for target_system, batches in self._coalesce(rows).items()
+            ))
+        return len(rows)
+
+    async def start(self) -> None:
+        await self.stop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        # Starts a delivery loop for each target that has messages; the loops run until stop()
+        loops: Dict[str, asyncio.Task] = {}
+        async with self._client() as client:
+            try:
+                while True:
+                    try:
+                        targets = await run_in_threadpool(self._targets)
+                    except Exception:
+                        logger.exception("Outbox target lookup failed")
+                        targets = []
+                    for target_system in targets:
+                        if target_system not in loops:
+                            loops[target_system] = asyncio.create_task(self._run_target(client, target_system))
+                    await asyncio.sleep(self.poll_seconds)
+            finally:
+                for task in loops.values():
+                    task.cancel()
+                await asyncio.gather(*loops.values(), return_exceptions=True)
+
+    async def _run_target(self, client: httpx.AsyncClient, target_system: str) -> None:
+        while True:
+            try:
+                fetched = await self.dispatch_target(client, target_system)
+            except Exception:
+                logger.exception("Outbox dispatch to %s failed", target_system)
+                fetched = 0
+            # A full fetch means more is waiting, so go again straight away
+            if fetched < self.fetch_size:
+                await asyncio.sleep(self.poll_seconds)
+
+    def pending(self) -> dict:
+        """Queued messages per target and how long the oldest has waited."""
+        stmt = select(_table.c.target_system, func.count(), func.min(_table.c.created_at)).group_by(_table.c.target_system)
+        with self.session_factory() as db:
+            rows = db.execute(stmt).all()
+        now = self.clock()
+        targets = {
+            target_system: {"pending": count, "oldest_age_seconds": round((now - _utc(oldest)).total_seconds(), 3)}
+            for target_system, count, oldest in rows
+        }
+        return {"pending": sum(target["pending"] for target in targets.values()), "pending_by_target": targets}
+
+    def stats(self) -> dict:
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW_SECONDS
+        while self._deliveries and self._deliveries[0][0] < cutoff:
+            self._deliveries.popleft()
+        lags = sorted(self._lags)
+        return {
+            **{key: self.counters[key] for key in ("delivered", "sent", "coalesced", "batches", "failed_batches")},
+            "delivered_per_second": round(sum(count for _, count in self._deliveries) / THROUGHPUT_WINDOW_SECONDS, 3),
+            # Commit-to-acknowledgement time over the most recent deliveries
+            "lag_seconds": {
+                "p50": round(lags[len(lags) // 2], 3),
+                "p99": round(lags[min(len(lags) - 1, len(lags) * 99 // 100)], 3),
+                "max": round(lags[-1], 3),
+            } if lags else None,
+            "targets": {target_system: dict(counters) for target_system, counters in self.target_counters.items()},
+        }
+
+
+outbox_dispatcher = OutboxDispatcher(
+    SessionLocal,
+    target_urls=settings.outbox_target_urls,
+    default_url=settings.outbox_default_url,
+    batch_size=settings.outbox_batch_size,
+    fetch_size=settings.outbox_fetch_size,
+    concurrency=settings.outbox_target_concurrency,
+    poll_seconds=settings.outbox_poll_seconds,
+    backoff_seconds=settings.outbox_backoff_seconds,
+    max_backoff_seconds=settings.outbox_max_backoff_seconds,
+    timeout_seconds=settings.outbox_timeout_seconds,
+)
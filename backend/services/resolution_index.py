@@ -0,0 +1,243 @@
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from models.base import utcnow
+from models.event_offer import Event, Offer, event_offer_association
+
+# In-memory answer to "event code X happened: which offers flip, after what delay, in
+# what order?". The CRUD write functions feed every change in here; only the event
+# codes a change touches are recompiled (lazily, on their next lookup). An expired event
+# (Event.expires_at passed) is not found, as in the database reads, until the expiry
+# sweeper deletes it.
+#
+# The index is per process: with several uvicorn workers, a write is only seen by the
+# worker that handled it until the others call reset().
+
+
+@dataclass(frozen=True)
+class OfferAction:
+    offer_id: str
+    offer_code: str
+    priority: int
+    delay_minutes: int
+    action_type: str
+    target_system: str
+
+
+@dataclass(frozen=True)
+class EventActions:
+    event_id: str
+    event_code: str
+    disable_all_campaigns: bool
+    actions: Tuple[OfferAction, ...]
+    # Routing for occurrences of this event (not part of the response body)
+    queue_name: str
+    lifetime_hours: int
+    expires_at: Optional[datetime]
+    # Pre-rendered JSON response body
+    body: bytes
+
+
+@dataclass(frozen=True)
+class _EventEntry:
+    id: str
+    code: str
+    disable_all_campaigns: bool
+    queue_name: str
+    lifetime_hours: int
+    expires_at: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class _OfferEntry:
+    id: str
+    code: str
+    priority: int
+    target_system: str
+
+
+@dataclass(frozen=True)
+class _LinkEntry:
+    delay_minutes: int
+    action_type: str
+
+
+def _expired(expires_at: Optional[datetime]) -> bool:
+    return expires_at is not None and settings.expiry_enabled and expires_at <= utcnow()
+
+
+class ResolutionIndex:
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._events: Dict[str, _EventEntry] = {}
+        self._event_ids_by_code: Dict[str, str] = {}
+        self._offers: Dict[str, _OfferEntry] = {}
+        self._links: Dict[str, Dict[str, _LinkEntry]] = {}
+        self._events_by_offer: Dict[str, Set[str]] = {}
+        self._compiled: Dict[str, EventActions] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self, code: str) -> Optional[EventActions]:
+        compiled = self._compiled.get(code)
+        if compiled is None:
+            with self._lock:
+                self._ensure_loaded()
+                event_id = self._event_ids_by_code.get(code)
+                if event_id is None:
+                    return None
+                compiled = self._compile(event_id)
+        return None if _expired(compiled.expires_at) else compiled
+
+    def ensure_loaded(self) -> None:
+        with self._lock:
+            self._ensure_loaded()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._loaded = False
+            self._events.clear()
+            self._event_ids_by_code.clear()
+            self._offers.clear()
+            self._links.clear()
+            self._events_by_offer.clear()
+            self._compiled.clear()
+
+    def load(self, db: Session) -> None:
+        with self._lock:
+            self.reset()
+            for row in db.execute(select(
+                Event.id, Event.code, Event.disable_all_campaigns, Event.queue_name, Event.lifetime_hours, Event.expires_at,
+            )):
+                self._put_event(row.id, row.code, row.disable_all_campaigns, row.queue_name, row.lifetime_hours, row.expires_at)
+            for row in db.execute(select(Offer.id, Offer.code, Offer.priority, Offer.target_system)):
+                self._put_offer(row.id, row.code, row.priority, row.target_system)
+            for row in db.execute(select(event_offer_association)):
+                self._put_link(row.event_id, row.offer_id, row.delay_minutes, row.action_type)
+            self._loaded = True
+
+    # Write hooks, called by crud.event_offer after each commit. Until the index is
+    # loaded they do nothing: the first lookup reads the committed state anyway.
+    def event_changed(self, event_id: str, code: str, disable_all_campaigns: Optional[bool],
+                      queue_name: Optional[str], lifetime_hours: Optional[int], expires_at: Optional[datetime]) -> None:
+        with self._lock:
+            if self._loaded:
+                self._put_event(event_id, code, disable_all_campaigns, queue_name, lifetime_hours, expires_at)
+
+    def event_deleted(self, event_id: str) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            entry = self._events.pop(event_id, None)
+            if entry is not None:
+                self._event_ids_by_code.pop(entry.code, None)
+                self._compiled.pop(entry.code, None)
+            for offer_id in self._links.pop(event_id, {}):
+                self._events_by_offer.get(offer_id, set()).discard(event_id)
+
+    def offer_changed(self, offer_id: str, code: str, priority: Optional[int], target_system: Optional[str]) -> None:
+        with self._lock:
+            if self._loaded:
+                self._put_offer(offer_id, code, priority, target_system)
+
+    def offer_deleted(self, offer_id: str) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            self._offers.pop(offer_id, None)
+            for event_id in self._events_by_offer.pop(offer_id, set()):
+                self._links.get(event_id, {}).pop(offer_id, None)
+                self._invalidate(event_id)
+
+    def link_changed(self, event_id: str, offer_id: str, delay_minutes: Optional[int], action_type: Optional[str]) -> None:
+        with self._lock:
+            if self._loaded:
+                self._put_link(event_id, offer_id, delay_minutes, action_type)
+
+    def link_deleted(self, event_id: str, offer_id: str) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            self._links.get(event_id, {}).pop(offer_id, None)
+            self._events_by_offer.get(offer_id, set()).discard(event_id)
+            self._invalidate(event_id)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self.session_factory() as db:
+                self.load(db)
+
+    def _put_event(self, event_id, code, disable_all_campaigns, queue_name, lifetime_hours, expires_at) -> None:
+        previous = self._events.get(event_id)
+        if previous is not None and previous.code != code:
+            self._event_ids_by_code.pop(previous.code, None)
+            self._compiled.pop(previous.code, None)
+        # SQLite hands DateTime(timezone=True) back naive; every stored time is UTC
+        if expires_at is not None and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        self._events[event_id] = _EventEntry(
+            event_id, code, bool(disable_all_campaigns), queue_name or "default_queue", lifetime_hours or 0, expires_at
+        )
+        self._event_ids_by_code[code] = event_id
+        self._compiled.pop(code, None)
+
+    def _put_offer(self, offer_id, code, priority, target_system) -> None:
+        self._offers[offer_id] = _OfferEntry(
+            offer_id, code, 1 if priority is None else priority, target_system or "default_system"
+        )
+        for event_id in self._events_by_offer.get(offer_id, ()):
+            self._invalidate(event_id)
+
+    def _put_link(self, event_id, offer_id, delay_minutes, action_type) -> None:
+        self._links.setdefault(event_id, {})[offer_id] = _LinkEntry(delay_minutes or 0, action_type or "enable")
+        self._events_by_offer.setdefault(offer_id, set()).add(event_id)
+        self._invalidate(event_id)
+
+    def _invalidate(self, event_id: str) -> None:
+        entry = self._events.get(event_id)
+        if entry is not None:
+            self._compiled.pop(entry.code, None)
+
+    def _compile(self, event_id: str) -> EventActions:
+        event = self._events[event_id]
+        actions = []
+        for offer_id, link in self._links.get(event_id, {}).items():
+            offer = self._offers.get(offer_id)
+            if offer is None:
+                continue
+            actions.append(OfferAction(
+                offer_id=offer.id,
+                offer_code=offer.code,
+                priority=offer.priority,
+                delay_minutes=link.delay_minutes,
+                # An event that disables all campaigns switches every linked offer off
+                action_type="disable" if event.disable_all_campaigns else link.action_type,
+                target_system=offer.target_system,
+            ))
+        # Priority 1 first; ties fire in delay order, then by offer code for a stable answer
+        actions.sort(key=lambda action: (action.priority, action.delay_minutes, action.offer_code))
+        body = json.dumps({
+            "event_id": event.id,
+            "event_code": event.code,
+            "disable_all_campaigns": event.disable_all_campaigns,
+            "actions": [action.__dict__ for action in actions],
+        }, separators=(",", ":")).encode()
+        compiled = EventActions(
+            event.id, event.code, event.disable_all_campaigns, tuple(actions), event.queue_name, event.lifetime_hours,
+            event.expires_at, body
+        )
+        self._compiled[event.code] = compiled
+        return compiled
+
+
+resolution_index = ResolutionIndex(SessionLocal)
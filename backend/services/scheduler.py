@@ -0,0 +1,325 @@
+import asyncio
+import logging
+import math
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from models.base import utcnow
+from models.event_offer import event_offer_association
+from models.occurrence import EventOccurrence, OccurrenceAction
+from services.outbox import enqueue_actions
+
+# Executes the delayed offer actions that ingest writes to occurrence_actions. Pending
+# actions sit in a hierarchical timing wheel (O(1) insert and cancel, due actions come out
+# a slot at a time); occurrence_actions is the durable copy, so startup reloads every
+# pending row and nothing is lost across restarts. Firing marks a whole batch as fired in
+# one transaction, together with whatever the handler writes for it.
+#
+# A link update or delete cancels its pending actions: they were resolved under the old
+# settings, and occurrences ingested afterwards pick up the new ones. Cancellations are
+# written with the next firing batch; should the process die first, recovery still
+# drops actions whose link no longer exists.
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch(value: datetime) -> float:
+    # SQLite hands DateTime(timezone=True) back naive; every stored time is UTC
+    return (value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class ScheduledAction:
+    __slots__ = ("occurrence_id", "offer_id", "event_id", "action_type", "target_system", "due_at", "tick", "bucket")
+
+    def __init__(self, occurrence_id: str, offer_id: str, event_id: str, action_type: str, target_system: str, due_at: datetime):
+        self.occurrence_id = occurrence_id
+        self.offer_id = offer_id
+        self.event_id = event_id
+        self.action_type = action_type
+        self.target_system = target_system
+        self.due_at = due_at
+        self.tick = 0
+        self.bucket: Optional[Set["ScheduledAction"]] = None
+
+
+class TimingWheel:
+    """Hierarchical timing wheel over integer ticks. Level ``n`` has ``slots`` buckets of
+    ``slots ** n`` ticks each; a timer goes into the coarsest level its distance needs and
+    moves down a level each time that level's current bucket comes round. Timers further
+    out than the top level wait in an overflow set that is re-sorted once per top-level
+    revolution. ``slots`` must be a power of two so levels and buckets are bit shifts."""
+
+    def __init__(self, now: int, slots: int = 64, levels: int = 4):
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.now = now
+        self.slots = slots
+        self.levels = levels
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._widths = [slots ** level for level in range(levels)]
+        self._wheels: List[List[Optional[Set[ScheduledAction]]]] = [[None] * slots for _ in range(levels)]
+        self._overflow: Set[ScheduledAction] = set()
+        self._ready: Set[ScheduledAction] = set()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, timer: ScheduledAction) -> None:
+        self._place(timer)
+        self._size += 1
+
+    def cancel(self, timer: ScheduledAction) -> None:
+        if timer.bucket is not None:
+            timer.bucket.discard(timer)
+            timer.bucket = None
+            self._size -= 1
+
+    def advance(self, to_tick: int) -> List[ScheduledAction]:
+        """Move the wheel to ``to_tick`` and return every timer due by then."""
+        fired = self._take(self._ready)
+        while self.now < to_tick:
+            self.now += 1
+            for level in range(self.levels - 1, 0, -1):
+                if self.now % self._widths[level] == 0:
+                    slot = (self.now // self._widths[level]) % self.slots
+                    self._cascade(self._wheels[level], slot)
+            if self.now % (self._widths[-1] * self.slots) == 0:
+                overflow, self._overflow = self._overflow, set()
+                for timer in overflow:
+                    self._place(timer)
+            self._cascade(self._wheels[0], self.now % self.slots)
+            fired.extend(self._take(self._ready))
+        self._size -= len(fired)
+        return fired
+
+    def _place(self, timer: ScheduledAction) -> None:
+        distance = timer.tick - self.now
+        if distance <= 0:
+            bucket = self._ready
+        else:
+            # The level is the number of whole slot-widths in the distance's bit length
+            level = (distance.bit_length() - 1) // self._bits
+            if level < self.levels:
+                wheel, slot = self._wheels[level], (timer.tick >> (self._bits * level)) & self._mask
+                bucket = wheel[slot]
+                if bucket is None:
+                    bucket = wheel[slot] = set()
+            else:
+                bucket = self._overflow
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def _cascade(self, wheel: List[Optional[Set[ScheduledAction]]], slot: int) -> None:
+        bucket = wheel[slot]
+        if bucket:
+            wheel[slot] = None
+            for timer in bucket:
+                self._place(timer)
+
+    def _take(self, bucket: Set[ScheduledAction]) -> List[ScheduledAction]:
+        timers = list(bucket)
+        bucket.clear()
+        for timer in timers:
+            timer.bucket = None
+        return timers
+
+
+_table = OccurrenceAction.__table__
+_key = and_(_table.c.occurrence_id == bindparam("o_occurrence_id"), _table.c.offer_id == bindparam("o_offer_id"))
+FIRE_STATEMENT = update(_table).where(_key, _table.c.status == "pending").values(status="fired", fired_at=bindparam("o_fired_at"))
+CANCEL_STATEMENT = update(_table).where(_key, _table.c.status == "pending").values(status="cancelled")
+
+
+class ActionScheduler:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        tick_seconds: float = 1.0,
+        slots: int = 64,
+        levels: int = 4,
+        clock: Callable[[], datetime] = utcnow,
+        handler: Optional[Callable[[Session, List[ScheduledAction]], None]] = None,
+    ):
+        self.session_factory = session_factory
+        self.tick_seconds = tick_seconds
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self.handler = handler
+        self._lock = threading.Lock()
+        self._wheel = TimingWheel(self._tick(clock()), slots, levels)
+        self._by_link: Dict[Tuple[str, str], Set[ScheduledAction]] = {}
+        # Links with pending actions by each half of their key, so deleting an event or an
+        # offer cancels through its own links instead of scanning every pending one
+        self._by_event: Dict[str, Set[str]] = {}
+        self._by_offer: Dict[str, Set[str]] = {}
+        self._cancelled: List[ScheduledAction] = []
+        self._task: Optional[asyncio.Task] = None
+        self.counters = Counter()
+
+    def _tick(self, value: datetime) -> int:
+        # Rounded up so nothing fires before its due time
+        return math.ceil(_epoch(value) / self.tick_seconds)
+
+    def schedule(self, actions: Iterable[ScheduledAction]) -> None:
+        with self._lock:
+            for action in actions:
+                action.tick = self._tick(action.due_at)
+                self._wheel.add(action)
+                link = (action.event_id, action.offer_id)
+                pending = self._by_link.get(link)
+                if pending is None:
+                    pending = self._by_link[link] = set()
+                    self._by_event.setdefault(action.event_id, set()).add(action.offer_id)
+                    self._by_offer.setdefault(action.offer_id, set()).add(action.event_id)
+                pending.add(action)
+                self.counters["scheduled"] += 1
+
+    def _drop_link(self, link: Tuple[str, str]) -> Set[ScheduledAction]:
+        # Called with the lock held; removes the link from all three indexes
+        event_id, offer_id = link
+        for index, key, other in ((self._by_event, event_id, offer_id), (self._by_offer, offer_id, event_id)):
+            linked = index.get(key)
+            if linked is not None:
+                linked.discard(other)
+                if not linked:
+                    del index[key]
+        return self._by_link.pop(link, set())
+
+    # Write hooks, called by crud.event_offer after each commit
+    def link_changed(self, event_id: str, offer_id: str) -> None:
+        self._cancel(event_id, offer_id)
+
+    def link_deleted(self, event_id: str, offer_id: str) -> None:
+        self._cancel(event_id, offer_id)
+
+    def event_deleted(self, event_id: str) -> None:
+        self._cancel(event_id=event_id)
+
+    def offer_deleted(self, offer_id: str) -> None:
+        self._cancel(offer_id=offer_id)
+
+    def _cancel(self, event_id: Optional[str] = None, offer_id: Optional[str] = None) -> None:
+        with self._lock:
+            if event_id is not None and offer_id is not None:
+                links = [(event_id, offer_id)]
+            elif event_id is not None:
+                links = [(event_id, linked) for linked in self._by_event.get(event_id, ())]
+            else:
+                links = [(linked, offer_id) for linked in self._by_offer.get(offer_id, ())]
+            for link in links:
+                for action in self._drop_link(link):
+                    self._wheel.cancel(action)
+                    self._cancelled.append(action)
+                    self.counters["cancelled"] += 1
+
+    def fire_due(self) -> List[ScheduledAction]:
+        """Fire everything due by now in one batch; returns the fired actions."""
+        now = self.clock()
+        with self._lock:
+            due = self._wheel.advance(self._tick(now))
+            for action in due:
+                link = (action.event_id, action.offer_id)
+                pending = self._by_link.get(link)
+                if pending is not None:
+                    pending.discard(action)
+                    if not pending:
+                        self._drop_link(link)
+            cancelled, self._cancelled = self._cancelled, []
+        if not due and not cancelled:
+            return due
+        try:
+            with self.session_factory() as db:
+                if due:
+                    db.execute(FIRE_STATEMENT, [
+                        {"o_occurrence_id": a.occurrence_id, "o_offer_id": a.offer_id, "o_fired_at": now} for a in due
+                    ])
+                if cancelled:
+                    db.execute(CANCEL_STATEMENT, [
+                        {"o_occurrence_id": a.occurrence_id, "o_offer_id": a.offer_id} for a in cancelled
+                    ])
+                if due and self.handler is not None:
+                    # Runs inside the firing transaction, so its writes commit with it
+                    self.handler(db, due)
+                db.commit()
+        except Exception:
+            # Nothing was recorded: put the batch back so the next tick retries it
+            self.schedule(due)
+            with self._lock:
+                self._cancelled.extend(cancelled)
+            raise
+        self.counters["fired"] += len(due)
+        self.counters["batches"] += 1
+        return due
+
+    def recover(self, db: Session) -> int:
+        """Replace the wheel with the pending actions stored in the database."""
+        stmt = (
+            select(
+                _table.c.occurrence_id, _table.c.offer_id, EventOccurrence.event_id,
+                _table.c.action_type, _table.c.target_system, _table.c.due_at,
+            )
+            .join(EventOccurrence, EventOccurrence.id == _table.c.occurrence_id)
+            # Links deleted while the cancellation was still unwritten drop out here
+            .join(event_offer_association, and_(
+                event_offer_association.c.event_id == EventOccurrence.event_id,
+                event_offer_association.c.offer_id == _table.c.offer_id,
+            ))
+            .where(_table.c.status == "pending")
+            .execution_options(yield_per=10000)
+        )
+        with self._lock:
+            self._wheel = TimingWheel(self._tick(self.clock()), self.slots, self.levels)
+            self._by_link.clear()
+            self._by_event.clear()
+            self._by_offer.clear()
+            self._cancelled.clear()
+        self.schedule(ScheduledAction(*row) for row in db.execute(stmt))
+        return len(self._wheel)
+
+    async def start(self) -> None:
+        def recover():
+            with self.session_factory() as db:
+                return self.recover(db)
+
+        await self.stop()
+        self.counters["recovered"] = await run_in_threadpool(recover)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self.fire_due)
+            except Exception:
+                logger.exception("Firing scheduled offer actions failed")
+            await asyncio.sleep(self.tick_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._wheel),
+            **{key: self.counters[key] for key in ("scheduled", "fired", "cancelled", "recovered", "batches")},
+        }
+
+
+action_scheduler = ActionScheduler(
+    SessionLocal,
+    tick_seconds=settings.scheduler_tick_seconds,
+    slots=settings.scheduler_wheel_slots,
+    levels=settings.scheduler_wheel_levels,
+    # Fired actions reach their target systems through the outbox
+    handler=enqueue_actions,
+)
@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from admission import AdaptiveLimiter, AdmissionController, AdmissionMiddleware, route_class
+from test_event_offer import app as main_app
+
+class TestRouteClasses(unittest.TestCase):
+    def test_classes(self):
+        self.assertEqual(route_class("GET", "/api/events/"), "read")
+        self.assertEqual(route_class("GET", "/api/graph"), "read")
+        self.assertEqual(route_class("POST", "/api/events/batch"), "read")
+        self.assertEqual(route_class("POST", "/api/events/"), "write")
+        self.assertEqual(route_class("PUT", "/api/event-offers/e1/o1"), "write")
+        self.assertEqual(route_class("POST", "/api/occurrences/batch"), "write")
+        self.assertEqual(route_class("POST", "/api/event-offers/bulk"), "bulk")
+        self.assertEqual(route_class("GET", "/api/export/events"), "bulk")
+        # An event whose id happens to be "bulk" is still a single read
+        self.assertEqual(route_class("GET", "/api/events/bulk"), "read")
+        for path in ("/health", "/metrics", "/", "/docs", "/api/changes/stream"):
+            self.assertIsNone(route_class("GET", path), path)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_queue_hands_slots_over_in_order(self):
+        async def run():
+            limiter = AdaptiveLimiter("read", 2, queue_size=2, queue_timeout=5, latency_target=1)
+            self.assertTrue(await limiter.acquire())
+            self.assertTrue(await limiter.acquire())
+            first = asyncio.ensure_future(limiter.acquire())
+            second = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            # Queue full: shed without waiting
+            self.assertFalse(await limiter.acquire())
+            limiter.release(0.01)
+            self.assertTrue(await first)
+            self.assertFalse(second.done())
+            limiter.release(0.01)
+            self.assertTrue(await second)
+            self.assertEqual((limiter.in_flight, len(limiter.waiters)), (2, 0))
+            return limiter.stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual((stats["admitted"], stats["queued"], stats["shed_queue_full"]), (4, 2, 1))
+
+    def test_deadline_and_cancelled_waiters(self):
+        async def run():
+            limiter = AdaptiveLimiter("write", 1, queue_size=4, queue_timeout=0.05, latency_target=1)
+            self.assertTrue(await limiter.acquire())
+            self.assertFalse(await limiter.acquire())
+            self.assertEqual(limiter.counters["shed_timeout"], 1)
+            # A client that disconnects while queued gives its place up
+            limiter.queue_timeout = 5
+            gone = asyncio.ensure_future(limiter.acquire())
+            waiting = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            gone.cancel()
+            await asyncio.sleep(0)
+            limiter.release(0.01)
+            self.assertTrue(await waiting)
+            self.assertEqual((limiter.in_flight, len(limiter.waiters)), (1, 0))
+
+        asyncio.run(run())
+
+    def test_limit_follows_latency(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter("read", 10, queue_size=0, queue_timeout=1, latency_target=0.1, clock=clock)
+        limiter.in_flight = 10
+        # Cut once per target interval, however many slow requests finish in it
+        for _ in range(5):
+            limiter.release(0.5)
+            limiter.in_flight += 1
+        self.assertEqual(int(limiter.limit), 9)
+        for _ in range(20):
+            clock.now += 0.1
+            limiter.release(0.5)
+            limiter.in_flight += 1
+        self.assertEqual(int(limiter.limit), 1)
+        # Fast again: back up while the limit is fully used, never past the maximum
+        limiter.in_flight = 1
+        for _ in range(200):
+            limiter.release(0.01)
+            limiter.in_flight = int(limiter.limit)
+        self.assertEqual(limiter.limit, 10.0)
+
+class TestAdmissionMiddleware(unittest.TestCase):
+    def test_sheds_with_retry_after_and_spares_health(self):
+        release = asyncio.Event()
+        app = FastAPI()
+
+        @app.get("/api/slow")
+        async def slow():
+            await release.wait()
+            return {"ok": True}
+
+        @app.get("/health")
+        async def health():
+            return {"status": "healthy"}
+
+        controller = AdmissionController({
+            "read": AdaptiveLimiter("read", 1, queue_size=1, queue_timeout=5, latency_target=4),
+            "write": AdaptiveLimiter("write", 1, queue_size=0, queue_timeout=5, latency_target=10),
+        })
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                running = asyncio.ensure_future(client.get("/api/slow"))
+                queued = asyncio.ensure_future(client.get("/api/slow"))
+                while not controller.limiters["read"].waiters:
+                    await asyncio.sleep(0.01)
+                shed = await client.get("/api/slow")
+                health = await client.get("/health")
+                # Other classes keep their own slots
+                other = await client.post("/api/nothing-here")
+                release.set()
+                return shed, health, other, await running, await queued
+
+        shed, health, other, running, queued = asyncio.run(run())
+        self.assertEqual(shed.status_code, 503)
+        # No latency seen yet, so the queue is expected to drain at the target: 2 x 4 s
+        self.assertEqual(shed.headers["retry-after"], "8")
+        self.assertEqual(shed.json(), {"detail": "Server is overloaded, retry later"})
+        self.assertEqual(health.status_code, 200)
+        self.assertEqual(other.status_code, 404)
+        self.assertEqual((running.status_code, queued.status_code), (200, 200))
+        self.assertEqual(controller.stats()["read"]["in_flight"], 0)
+
+    def test_installed_on_the_app(self):
+        self.assertIn(AdmissionMiddleware, [middleware.cls for middleware in main_app.user_middleware])
+        body = TestClient(main_app).get("/metrics").text
+        self.assertIn('admission_limit{class="read"} 24.0', body)
+        self.assertIn('admission_shed_total{class="write",reason="queue_full"}', body)
+
+if __name__ == "__main__":
+    unittest.main()
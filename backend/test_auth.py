@@ -0,0 +1,127 @@
+import json
+import time
+import unittest
+import urllib.error
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from jose import jwk, jwt
+import auth
+
+ISSUER = "http://keycloak.test/realms/myrealm"
+
+def make_key(kid: str):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    public_jwk = jwk.construct(pem, "RS256").public_key().to_dict()
+    return pem, {**public_jwk, "kid": kid, "use": "sig"}
+
+def make_token(pem: bytes, kid: str, roles=(), expires_in: int = 300, issuer: str = ISSUER) -> str:
+    now = int(time.time())
+    claims = {"sub": "user-1", "iss": issuer, "iat": now, "exp": now + expires_in, "realm_access": {"roles": list(roles)}}
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": kid})
+
+protected_app = FastAPI()
+
+@protected_app.get("/items")
+async def read_items(claims: dict = Depends(auth.get_current_claims)):
+    return {"sub": claims["sub"]}
+
+@protected_app.post("/items")
+async def create_item(claims: dict = Depends(auth.require_roles("offer-admin"))):
+    return {"sub": claims["sub"]}
+
+class TestKeycloakAuth(unittest.TestCase):
+    def setUp(self):
+        self.pem, public_jwk = make_key("k1")
+        self.published_key = public_jwk
+        self.published = {"keys": [public_jwk, {"kid": "enc", "kty": "RSA", "use": "enc", "n": "AQAB", "e": "AQAB"}]}
+        self.fetches = 0
+        self.fetch_error = None
+        self.now = 1000.0
+        self.verifier = auth.TokenVerifier(auth.JWKSCache(self.fetch_jwks, 10.0, clock=lambda: self.now), issuer=ISSUER)
+        self.original_verifier, auth.token_verifier = auth.token_verifier, self.verifier
+        self.client = TestClient(protected_app)
+
+    def tearDown(self):
+        auth.token_verifier = self.original_verifier
+
+    def fetch_jwks(self):
+        self.fetches += 1
+        if self.fetch_error is not None:
+            raise self.fetch_error
+        return self.published
+
+    def get(self, token):
+        return self.client.get("/items", headers={"Authorization": f"Bearer {token}"})
+
+    def test_valid_token_fetches_jwks_once(self):
+        token = make_token(self.pem, "k1")
+        self.assertEqual(self.get(token).json(), {"sub": "user-1"})
+        self.assertEqual(self.get(make_token(self.pem, "k1", roles=["x"])).status_code, 200)
+        self.assertEqual(self.fetches, 1)
+        self.assertIsNotNone(self.verifier.cached(token))
+
+    def test_rejects_missing_expired_and_foreign_tokens(self):
+        self.assertEqual(self.client.get("/items").status_code, 401)
+        self.assertEqual(self.get("garbage").status_code, 401)
+        self.assertEqual(self.get(make_token(self.pem, "k1", expires_in=-10)).status_code, 401)
+        self.assertEqual(self.get(make_token(self.pem, "k1", issuer="http://evil")).status_code, 401)
+        other_pem, _ = make_key("k1")
+        self.assertEqual(self.get(make_token(other_pem, "k1")).status_code, 401)
+        # Signed by the realm key but without an exp claim
+        no_expiry = jwt.encode({"sub": "user-1", "iss": ISSUER}, self.pem, algorithm="RS256", headers={"kid": "k1"})
+        response = self.get(no_expiry)
+        self.assertEqual((response.status_code, response.json()["detail"]), (401, "Invalid token: Token has no expiry"))
+
+    def test_jwks_download_failure_is_503(self):
+        token = make_token(self.pem, "k1")
+        for error in (urllib.error.URLError("connection refused"), json.JSONDecodeError("Expecting value", "<html>", 0)):
+            self.now += 11
+            self.fetch_error = error
+            response = self.get(token)
+            self.assertEqual(response.status_code, 503)
+            self.assertIn("Retry-After", response.headers)
+            # Still failing until the next attempt is allowed, without another download
+            fetches = self.fetches
+            self.assertEqual(self.get(token).status_code, 503)
+            self.assertEqual(self.fetches, fetches)
+        self.fetch_error = None
+        self.published = {"keys": "not a list"}
+        self.now += 11
+        self.assertEqual(self.get(token).status_code, 503)
+
+        self.published = {"keys": [self.published_key]}
+        self.now += 11
+        self.assertEqual(self.get(token).status_code, 200)
+
+    def test_enforces_realm_roles(self):
+        headers = {"Authorization": f"Bearer {make_token(self.pem, 'k1', roles=['viewer'])}"}
+        self.assertEqual(self.client.post("/items", headers=headers).status_code, 403)
+        headers = {"Authorization": f"Bearer {make_token(self.pem, 'k1', roles=['offer-admin'])}"}
+        self.assertEqual(self.client.post("/items", headers=headers).status_code, 200)
+
+    def test_key_rotation_and_refresh_rate_limit(self):
+        self.assertEqual(self.get(make_token(self.pem, "k1")).status_code, 200)
+
+        rotated_pem, rotated_jwk = make_key("k2")
+        self.published = {"keys": [rotated_jwk]}
+        # Within the refresh interval an unknown kid does not trigger another download
+        self.assertEqual(self.get(make_token(rotated_pem, "k2")).status_code, 401)
+        self.assertEqual(self.fetches, 1)
+
+        self.now += 11
+        self.assertEqual(self.get(make_token(rotated_pem, "k2")).status_code, 200)
+        self.assertEqual(self.fetches, 2)
+
+    def test_token_cache_is_bounded(self):
+        self.verifier.cache_size = 2
+        tokens = [make_token(self.pem, "k1", roles=[str(i)]) for i in range(3)]
+        for token in tokens:
+            self.verifier.verify(token)
+        self.assertIsNone(self.verifier.cached(tokens[0]))
+        self.assertIsNotNone(self.verifier.cached(tokens[2]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from fastapi.testclient import TestClient
+from sqlalchemy import event as sa_event
+from test_event_offer import Base, engine, sync_app, async_app
+from config import settings
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+class TestBatchLookups(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(async_app)
+        for i in range(5):
+            self.client.post("/api/events/", json={"id": f"e{i}", "code": f"E{i}", "name": f"Event {i}"})
+            self.client.post("/api/offers/", json={"id": f"o{i}", "code": f"O{i}", "name": f"Offer {i}", "priority": i})
+
+    def tearDown(self):
+        settings.batch_chunk_size = 500
+        settings.batch_max_ids = 1000
+        Base.metadata.drop_all(bind=engine)
+
+    def test_request_order_and_missing_ids(self):
+        for app in (sync_app, async_app):
+            client = TestClient(app)
+            response = client.post("/api/events/batch", json={"ids": ["e3", "nope", "e0", "e3", "e1"]})
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertEqual([item["id"] for item in body["items"]], ["e3", "e0", "e1"])
+            self.assertEqual(body["missing"], ["nope"])
+            # Same fields, same order as a single GET
+            self.assertEqual(body["items"][0], client.get("/api/events/e3").json())
+            self.assertEqual(list(body["items"][0]), list(client.get("/api/events/e3").json()))
+
+            offers = client.post("/api/offers/batch", json={"ids": ["o4", "o2"]}).json()
+            self.assertEqual([(item["id"], item["priority"]) for item in offers["items"]], [("o4", 4), ("o2", 2)])
+            self.assertEqual(offers["missing"], [])
+            self.assertEqual(client.post("/api/offers/batch", json={"ids": []}).json(), {"items": [], "missing": []})
+
+    def test_chunked_queries_and_shared_cache(self):
+        settings.batch_chunk_size = 2
+        statements = []
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("SELECT"):
+                statements.append(statement)
+        sa_event.listen(engine, "before_cursor_execute", count)
+        try:
+            client = TestClient(sync_app)
+            client.get("/api/events/e0")
+            del statements[:]
+            body = client.post("/api/events/batch", json={"ids": ["e0", "e1", "e2", "e3", "e4"]}).json()
+            self.assertEqual(len(body["items"]), 5)
+            # e0 was cached by the single GET; four more ids in chunks of two
+            self.assertEqual(len(statements), 2)
+            del statements[:]
+            client.get("/api/events/e4")
+            client.post("/api/events/batch", json={"ids": ["e1", "e2"]})
+            self.assertEqual(statements, [])
+        finally:
+            sa_event.remove(engine, "before_cursor_execute", count)
+
+    def test_writes_reach_batch_reads(self):
+        self.client.post("/api/events/batch", json={"ids": ["e1", "e2"]})
+        self.client.put("/api/events/e1", json={"code": "E1", "name": "Renamed"})
+        self.client.delete("/api/events/e2")
+        body = self.client.post("/api/events/batch", json={"ids": ["e1", "e2"]}).json()
+        self.assertEqual([item["name"] for item in body["items"]], ["Renamed"])
+        self.assertEqual(body["missing"], ["e2"])
+
+    def test_validated_responses_match(self):
+        encoded = self.client.post("/api/offers/batch", json={"ids": ["o1", "x", "o0"]}).content
+        settings.validate_list_responses = True
+        try:
+            self.assertEqual(self.client.post("/api/offers/batch", json={"ids": ["o1", "x", "o0"]}).content, encoded)
+        finally:
+            settings.validate_list_responses = False
+
+    def test_batch_size_limit(self):
+        settings.batch_max_ids = 3
+        response = self.client.post("/api/offers/batch", json={"ids": ["o1", "o2", "o3", "o4"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post("/api/offers/batch", json={"ids": "o1"}).status_code, 422)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import json
+import unittest
+from unittest import mock
+from fastapi.testclient import TestClient
+from test_event_offer import Base, engine, app
+from crud import event_offer as crud
+from schemas.event_offer import EventCreate
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+class TestBulkImport(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def test_json_array_upsert(self):
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Old"})
+        response = self.client.post("/api/events/bulk", json=[
+            {"id": "e1", "code": "E1", "name": "New"},
+            {"id": "e2", "code": "E2", "name": "Second"},
+            {"id": "e3", "code": "E1", "name": "Code taken"},
+            {"id": "e4", "name": "Missing code"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["created"], data["updated"], data["rejected"]), (1, 1, 2))
+        self.assertEqual([r["status"] for r in data["results"]], ["updated", "created", "rejected", "rejected"])
+        self.assertIn("code", data["results"][3]["error"])
+        self.assertEqual(self.client.get("/api/events/e1").json()["name"], "New")
+
+    def test_ndjson_links(self):
+        self.client.post("/api/events/bulk", json=[{"id": "e1", "code": "E1", "name": "Event"}])
+        body = "\n".join([
+            json.dumps({"id": "o1", "code": "O1", "name": "Offer", "priority": 3}),
+            "not json",
+            json.dumps({"id": "o2", "code": "O2", "name": "Offer"}),
+        ])
+        response = self.client.post("/api/offers/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+        self.assertEqual([r["status"] for r in response.json()["results"]], ["created", "rejected", "created"])
+
+        links = [
+            {"event_id": "e1", "offer_id": "o1", "delay_minutes": 5},
+            {"event_id": "e1", "offer_id": "missing"},
+            {"event_id": "e1", "offer_id": "o1", "delay_minutes": 7},
+        ]
+        body = "\n".join(json.dumps(link) for link in links) + "\n"
+        response = self.client.post("/api/event-offers/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+        self.assertEqual([r["status"] for r in response.json()["results"]], ["created", "rejected", "updated"])
+
+        actions = self.client.get("/api/events/by-code/E1/actions").json()["actions"]
+        self.assertEqual([(a["offer_id"], a["delay_minutes"]) for a in actions], [("o1", 7)])
+
+    def test_code_claimed_by_a_concurrent_writer_is_rejected(self):
+        upsert, claimed = crud._upsert, []
+
+        def claim_code_first(db, *args, **kwargs):
+            # Another writer commits E2 between the chunk's reads and its upsert
+            if not claimed:
+                claimed.append(crud.create_event(db, EventCreate(id="other", code="E2", name="Other")))
+            return upsert(db, *args, **kwargs)
+
+        with mock.patch.object(crud, "_upsert", claim_code_first):
+            response = self.client.post("/api/events/bulk", json=[
+                {"id": "e1", "code": "E1", "name": "First"},
+                {"id": "e2", "code": "E2", "name": "Second"},
+            ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["status"] for r in results], ["created", "rejected"])
+        self.assertIn("other", results[1]["error"])
+        self.assertEqual(self.client.get("/api/events/e1").json()["name"], "First")
+        self.assertEqual(self.client.get("/api/events/other").json()["code"], "E2")
+
+    def test_rejects_non_array_body(self):
+        response = self.client.post("/api/events/bulk", json={"id": "e1"})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import json
+import unittest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from test_event_offer import Base, engine, app
+from services.cache import EntityCache, InProcessCache, MISSING, SharedStoreCache, entity_cache
+from services.resolution_index import resolution_index
+
+class FakeStore:
+    # Just enough of the redis-py client for SharedStoreCache
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None):
+        self.data[name] = value
+
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+
+    def incr(self, name):
+        self.data[name] = int(self.data.get(name, 0)) + 1
+        return self.data[name]
+
+class TestCacheBackends(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = InProcessCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        now = [0.0]
+        cache = InProcessCache(ttl_seconds=5, clock=lambda: now[0])
+        cache.set("a", 1)
+        now[0] = 4.9
+        self.assertEqual(cache.get("a"), 1)
+        now[0] = 5.1
+        self.assertIs(cache.get("a"), MISSING)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_shared_store_generations(self):
+        cache = EntityCache(SharedStoreCache(FakeStore()))
+        loads = []
+        load = lambda: loads.append(1) or [{"id": "e1"}]
+        self.assertEqual(cache.get_list("event", (0, 100, None), load), [{"id": "e1"}])
+        cache.get_list("event", (0, 100, None), load)
+        self.assertEqual(len(loads), 1)
+        cache.invalidate("event", "e1")
+        cache.get_list("event", (0, 100, None), load)
+        self.assertEqual(len(loads), 2)
+
+    def test_fill_skipped_when_write_races_load(self):
+        cache = EntityCache(InProcessCache())
+
+        def load():
+            cache.invalidate("event", "e1")
+            return {"id": "e1"}
+
+        cache.get_entity("event", "e1", load)
+        self.assertIsNone(cache.peek_entity("event", "e1"))
+
+    def test_write_keeps_other_entities_cached(self):
+        cache = EntityCache(InProcessCache())
+        cache.get_entity("event", "e1", lambda: {"id": "e1"})
+        cache.get_list("event", (0, 100, None), lambda: [{"id": "e1"}])
+
+        def load():
+            # A write to another event does not stop this fill
+            cache.invalidate("event", "e1")
+            return {"id": "e2"}
+
+        cache.get_entity("event", "e2", load)
+        self.assertEqual(cache.peek_entity("event", "e2"), {"id": "e2"})
+        self.assertEqual(cache.get_entities("event", ["e2", "e3"], lambda missing: {"e3": {"id": "e3"}}), {"e2": {"id": "e2"}, "e3": {"id": "e3"}})
+        cache.invalidate("event", "e1")
+        self.assertEqual(cache.peek_entity("event", "e2"), {"id": "e2"})
+        self.assertEqual(cache.peek_entity("event", "e3"), {"id": "e3"})
+        self.assertIsNone(cache.peek_entity("event", "e1"))
+        self.assertIsNone(cache.peek_list("event", (0, 100, None)))
+
+    def test_shared_store_holds_json(self):
+        store = FakeStore()
+        cache = SharedStoreCache(store)
+        value = {"id": "e1", "updated_at": datetime(2024, 5, 1, 12, 30), "priority": 3, "tags": None}
+        cache.set("event:id:e1", value)
+        self.assertEqual(json.loads(store.data["eo:event:id:e1"])["id"], "e1")
+        self.assertEqual(cache.get("event:id:e1"), value)
+
+class TestCachedReads(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def stats(self):
+        return self.client.get("/api/cache/stats").json()
+
+    def test_hit_after_miss(self):
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "One"})
+        before = self.stats()
+        self.client.get("/api/events/e1")
+        self.client.get("/api/events/e1")
+        after = self.stats()
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(after["hits"] - before["hits"], 1)
+
+    def test_update_and_delete_invalidate(self):
+        self.client.post("/api/offers/", json={"id": "o1", "code": "O1", "name": "Old"})
+        self.assertEqual(self.client.get("/api/offers/o1").json()["name"], "Old")
+        self.assertEqual(self.client.get("/api/offers/").json()[0]["name"], "Old")
+        self.client.put("/api/offers/o1", json={"code": "O1", "name": "New"})
+        self.assertEqual(self.client.get("/api/offers/o1").json()["name"], "New")
+        self.assertEqual(self.client.get("/api/offers/").json()[0]["name"], "New")
+        self.client.delete("/api/offers/o1")
+        self.assertEqual(self.client.get("/api/offers/o1").status_code, 404)
+        self.assertEqual(self.client.get("/api/offers/").json(), [])
+
+    def test_bulk_invalidates(self):
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Old"})
+        self.client.get("/api/events/e1")
+        self.client.post("/api/events/bulk", json=[{"id": "e1", "code": "E1", "name": "New"}])
+        self.assertEqual(self.client.get("/api/events/e1").json()["name"], "New")
+
+    def test_etag_matches_uncached_read(self):
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "One"})
+        etag = self.client.get("/api/events/e1").headers["etag"]
+        entity_cache.clear()
+        self.assertEqual(self.client.get("/api/events/e1").headers["etag"], etag)
+        response = self.client.get("/api/events/e1", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+if __name__ == "__main__":
+    unittest.main()
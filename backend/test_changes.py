@@ -0,0 +1,168 @@
+import asyncio
+import unittest
+from datetime import timedelta
+from sqlalchemy.dialects import postgresql
+from fastapi.testclient import TestClient
+from test_event_offer import Base, engine, TestingSessionLocal, app
+from crud import event_offer as crud
+from models.base import utcnow
+from schemas.event_offer import EventCreate
+from services.cache import entity_cache
+from services.changes import ChangeFeed, _postgres_upsert, change_feed
+from services.resolution_index import resolution_index
+
+def keys(page):
+    return [(change["kind"], change["op"], change["data"].get("id") or (change["data"]["event_id"], change["data"]["offer_id"]))
+            for change in page["changes"]]
+
+class TestChangeFeed(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(app)
+        for i in (1, 2):
+            self.client.post("/api/events/", json={"id": f"e{i}", "code": f"E{i}", "name": "Event"})
+            self.client.post("/api/offers/", json={"id": f"o{i}", "code": f"O{i}", "name": "Offer"})
+        self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o1"})
+
+    def tearDown(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def changes(self, since=0, **params):
+        response = self.client.get("/api/changes", params={"since": since, **params})
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_delta_sync(self):
+        full = self.changes()
+        self.assertEqual(keys(full), [
+            ("event", "upserted", "e1"), ("offer", "upserted", "o1"), ("event", "upserted", "e2"),
+            ("offer", "upserted", "o2"), ("link", "upserted", ("e1", "o1")),
+        ])
+        self.assertFalse(full["has_more"])
+        # Same fields, same order as a single GET
+        self.assertEqual(list(full["changes"][0]["data"].items()), list(self.client.get("/api/events/e1").json().items()))
+
+        self.client.put("/api/events/e1", json={"code": "E1", "name": "Renamed"})
+        self.client.put("/api/events/e1", json={"code": "E1", "name": "Renamed again"})
+        self.client.post("/api/offers/bulk", json=[{"id": "o3", "code": "O3", "name": "Bulk"}])
+        delta = self.changes(full["last_seq"])
+        # Each entity once, as it is now
+        self.assertEqual(keys(delta), [("event", "upserted", "e1"), ("offer", "upserted", "o3")])
+        self.assertEqual(delta["changes"][0]["data"]["name"], "Renamed again")
+        self.assertEqual(self.changes(delta["last_seq"]), {"changes": [], "last_seq": delta["last_seq"], "has_more": False})
+
+        # Pages of two follow the same order as one page
+        seen, since = [], 0
+        while True:
+            page = self.changes(since, limit=2)
+            seen.extend(keys(page))
+            since = page["last_seq"]
+            if not page["has_more"]:
+                break
+        self.assertEqual(seen, keys(self.changes()))
+
+    def test_deletes_leave_tombstones(self):
+        since = self.changes()["last_seq"]
+        self.client.delete("/api/events/e1")
+        self.client.delete("/api/event-offers/e1/o1")
+        delta = self.changes(since)
+        # The link went with its event; deleting it again changes nothing
+        self.assertEqual(keys(delta), [("event", "deleted", "e1"), ("link", "deleted", ("e1", "o1"))])
+        self.assertEqual(delta["changes"][0]["data"], {"id": "e1"})
+        self.assertEqual(delta["changes"][1]["data"], {"event_id": "e1", "offer_id": "o1"})
+        # A failed write records nothing
+        self.client.post("/api/events/", json={"id": "e2", "code": "E9", "name": "Duplicate"})
+        self.assertEqual(self.changes(delta["last_seq"])["changes"], [])
+
+    def test_compaction(self):
+        since = self.changes()["last_seq"]
+        self.client.delete("/api/offers/o2")
+        deleted_at = self.changes(since)["last_seq"]
+        self.client.put("/api/events/e2", json={"code": "E2", "name": "Later"})
+        feed = ChangeFeed(TestingSessionLocal, retention_seconds=60, clock=lambda: utcnow() + timedelta(seconds=120))
+        self.assertEqual(feed.compact(), 1)
+        self.assertEqual(feed.compact(), 0)
+        self.assertEqual(feed.stats()["horizon"], deleted_at)
+
+        # A client that may have missed the deletion must start over; later ones carry on
+        self.assertEqual(self.client.get("/api/changes", params={"since": since}).status_code, 410)
+        self.assertEqual(keys(self.changes(deleted_at)), [("event", "upserted", "e2")])
+        self.assertNotIn(("offer", "deleted", "o2"), keys(self.changes()))
+
+    def test_postgres_upsert_moves_the_row_to_a_new_seq(self):
+        # No Postgres here: the statement is only compiled
+        sql = " ".join(str(_postgres_upsert().compile(dialect=postgresql.dialect())).split())
+        self.assertIn("ON CONFLICT (kind, entity_id, linked_id) DO UPDATE SET seq = nextval(pg_get_serial_sequence(", sql)
+        self.assertIn("op = excluded.op, changed_at = excluded.changed_at", sql)
+
+    def test_stream(self):
+        since = self.changes()["last_seq"]
+        change_feed.poll_seconds = 30
+        db = TestingSessionLocal()
+
+        async def read(since):
+            return crud.get_changes(db, since, 2)
+
+        def write():
+            with TestingSessionLocal() as writer:
+                crud.create_event(writer, EventCreate(id="e3", code="E3", name="New"))
+
+        async def run():
+            connected = [True]
+            async def is_disconnected():
+                return not connected[0]
+            messages = change_feed.stream(0, read, is_disconnected)
+            first = [await messages.__anext__() for _ in range(5)]
+            # Woken by the commit, well before the next poll
+            loop = asyncio.get_running_loop()
+            pending = asyncio.ensure_future(messages.__anext__())
+            await asyncio.sleep(0)
+            await loop.run_in_executor(None, write)
+            woken = await asyncio.wait_for(pending, 5)
+            # A disconnected client is noticed at the next wake-up
+            connected[0] = False
+            change_feed.notify()
+            rest = [message async for message in messages]
+            return first, woken, rest
+
+        try:
+            first, woken, rest = asyncio.run(run())
+        finally:
+            change_feed.poll_seconds = 1.0
+            db.close()
+        self.assertTrue(first[0].startswith("id: 1\nevent: change\ndata: {\"seq\":1,\"kind\":\"event\""), first[0])
+        self.assertTrue(first[4].startswith(f"id: {since}\n"))
+        self.assertTrue(woken.startswith(f"id: {since + 1}\nevent: change\n"), woken)
+        self.assertIn('"id":"e3"', woken)
+        self.assertEqual(rest, [])
+        self.assertEqual(change_feed.stats()["streams"], 0)
+
+    def test_stream_resets_after_compaction(self):
+        since = self.changes()["last_seq"]
+        self.client.delete("/api/offers/o2")
+        feed = ChangeFeed(TestingSessionLocal, retention_seconds=0, poll_seconds=0.01, clock=lambda: utcnow() + timedelta(seconds=1))
+        feed.compact()
+        db = TestingSessionLocal()
+
+        async def read(since):
+            return crud.get_changes(db, since, 100)
+
+        async def run():
+            calls = []
+            async def is_disconnected():
+                calls.append(None)
+                return len(calls) > 2
+            return [message async for message in feed.stream(since - 1, read, is_disconnected)]
+
+        try:
+            messages = asyncio.run(run())
+        finally:
+            db.close()
+        self.assertEqual(messages[0], f'event: reset\ndata: {{"horizon":{since + 1}}}\n\n')
+        # Then everything that exists, from the start
+        self.assertEqual(len(messages), 1 + 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,21 +1,47 @@
 import unittest
+import os
+import tempfile
+
+# Point the app at a throwaway database before anything imports database.py
+# (conftest.py does the same for pytest runs)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+# The tests build their tables with create_all, unstamped, so app startup skips the
+# revision check (test_lifecycle turns it back on)
+os.environ.setdefault("SCHEMA_ON_STARTUP", "off")
+
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from database import Base
+from sqlalchemy.pool import NullPool
+from database import Base, get_db, get_async_db, to_async_url
 from models.event_offer import Event, Offer, event_offer_association
 from main import app
-import os
+from routers.event_offer import router as sync_router, async_router
+from routers.resolution import router as resolution_router
+from routers.bulk import router as bulk_router
+from config import settings
+from services.cache import entity_cache
+from crud import event_offer as crud
+from etag import entity_etag
+from pagination import encode_cursor
+from schemas.event_offer import EventCreate, EventUpdate, OfferCreate, EventOfferCreate, EventOfferUpdate
+from services.resolution_index import resolution_index
 
-# Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Use a temporary file-backed SQLite for testing so the sync and async engines share it
+SQLALCHEMY_DATABASE_URL = os.environ["DATABASE_URL"]
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
     connect_args={"check_same_thread": False}
 )
 
+# TestClient may run each request on a fresh event loop, so never reuse async connections
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 def override_get_db():
     try:
@@ -24,15 +50,37 @@ def override_get_db():
     finally:
         db.close()
 
+async def override_get_async_db():
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+
+def override_dependencies(target_app):
+    target_app.dependency_overrides[get_db] = override_get_db
+    target_app.dependency_overrides[get_async_db] = override_get_async_db
+    return target_app
+
 # Override the database dependency for testing
-from routers.event_offer import get_db
-app.dependency_overrides[get_db] = override_get_db
+override_dependencies(app)
+
+sync_app = override_dependencies(FastAPI())
+sync_app.include_router(sync_router)
+sync_app.include_router(resolution_router)
+sync_app.include_router(bulk_router)
+
+async_app = override_dependencies(FastAPI())
+async_app.include_router(async_router)
+async_app.include_router(resolution_router)
+async_app.include_router(bulk_router)
 
 class TestEventOfferAPI(unittest.TestCase):
+    app = app
+
     def setUp(self):
         # Create tables for testing
         Base.metadata.create_all(bind=engine)
-        self.client = TestClient(app)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(self.app)
         
     def tearDown(self):
         # Drop tables after each test
@@ -83,5 +131,142 @@ class TestEventOfferAPI(unittest.TestCase):
         data = response.json()
         self.assertIsInstance(data, list)
 
+class TestSyncEventOfferAPI(TestEventOfferAPI):
+    app = sync_app
+
+    def test_event_offer_link_lifecycle(self):
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Event"})
+        self.client.post("/api/offers/", json={"id": "o1", "code": "O1", "name": "Offer"})
+
+        response = self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o1", "delay_minutes": 5})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post("/api/event-offers/", json={"event_id": "missing", "offer_id": "o1"})
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.delete("/api/event-offers/e1/o1")
+        self.assertEqual(response.status_code, 204)
+
+    def test_update_and_delete_event(self):
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Event"})
+        response = self.client.post("/api/events/", json={"id": "e2", "code": "E1", "name": "Duplicate"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.put("/api/events/e1", json={"code": "E1", "name": "Renamed"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Renamed")
+
+        self.assertEqual(self.client.delete("/api/events/e1").status_code, 204)
+        self.assertEqual(self.client.get("/api/events/e1").status_code, 404)
+
+    def test_cursor_pagination_walks_all_events(self):
+        for i in range(5):
+            self.client.post("/api/events/", json={"id": f"e{i}", "code": f"E{i}", "name": "Event"})
+
+        seen = []
+        response = self.client.get("/api/events/?limit=2")
+        while True:
+            seen.extend(event["id"] for event in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            response = self.client.get(f"/api/events/?limit=2&cursor={cursor}")
+        self.assertEqual(seen, ["e0", "e1", "e2", "e3", "e4"])
+
+        self.assertEqual(self.client.get("/api/events/?cursor=not-a-cursor").status_code, 400)
+        # Well-formed, but the id is not a string
+        for last_id in ([1], None, {}, 1):
+            cursor = encode_cursor(last_id)
+            self.assertEqual(self.client.get(f"/api/events/?cursor={cursor}").status_code, 400)
+            self.assertEqual(self.client.get(f"/api/offers/?cursor={cursor}").status_code, 400)
+
+    def test_conditional_requests(self):
+        etag = self.client.post("/api/offers/", json={"id": "o1", "code": "O1", "name": "Offer"}).headers["ETag"]
+        response = self.client.get("/api/offers/o1")
+        self.assertEqual(response.headers["ETag"], etag)
+        self.assertEqual(self.client.get("/api/offers/o1", headers={"If-None-Match": etag}).status_code, 304)
+
+        list_etag = self.client.get("/api/offers/").headers["ETag"]
+        self.assertEqual(self.client.get("/api/offers/", headers={"If-None-Match": list_etag}).status_code, 304)
+
+        response = self.client.put("/api/offers/o1", json={"code": "O1", "name": "Renamed"}, headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        new_etag = response.headers["ETag"]
+        self.assertNotEqual(new_etag, etag)
+
+        # Stale validators: the list and the detail changed, and the old If-Match no longer applies
+        self.assertEqual(self.client.get("/api/offers/o1", headers={"If-None-Match": etag}).status_code, 200)
+        self.assertEqual(self.client.get("/api/offers/", headers={"If-None-Match": list_etag}).status_code, 200)
+        response = self.client.put("/api/offers/o1", json={"code": "O1", "name": "Lost update"}, headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(self.client.delete("/api/offers/o1", headers={"If-Match": etag}).status_code, 412)
+        self.assertEqual(self.client.delete("/api/offers/o1", headers={"If-Match": new_etag}).status_code, 204)
+
+    def test_constraint_errors_map_to_client_errors(self):
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Event"})
+        self.client.post("/api/events/", json={"id": "e2", "code": "E2", "name": "Event"})
+        self.client.post("/api/offers/", json={"id": "o1", "code": "O1", "name": "Offer"})
+
+        response = self.client.post("/api/events/", json={"id": "e1", "code": "E9", "name": "Same id"})
+        self.assertEqual((response.status_code, response.json()["detail"]), (400, "Event with this id already exists"))
+        response = self.client.put("/api/events/e2", json={"code": "E1", "name": "Taken code"})
+        self.assertEqual((response.status_code, response.json()["detail"]), (400, "Event with this code already exists"))
+        self.assertEqual(self.client.put("/api/events/missing", json={"code": "E7", "name": "x"}).status_code, 404)
+
+        response = self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "missing"})
+        self.assertEqual((response.status_code, response.json()["detail"]), (404, "Offer not found"))
+        self.assertEqual(self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o1"}).status_code, 201)
+        self.assertEqual(self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o1"}).status_code, 400)
+        self.assertEqual(self.client.put("/api/event-offers/e2/o1", json={"delay_minutes": 3}).status_code, 404)
+        response = self.client.put("/api/event-offers/e1/o1", json={"delay_minutes": 3})
+        self.assertEqual((response.status_code, response.json()["delay_minutes"]), (200, 3))
+
+class TestAsyncEventOfferAPI(TestSyncEventOfferAPI):
+    app = async_app
+
+class TestWriteRoundTrips(unittest.TestCase):
+    # Statement budget per write; raising one of these needs a reason
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.db = TestingSessionLocal()
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def tearDown(self):
+        event.remove(engine, "before_cursor_execute", self._record)
+        self.db.close()
+        Base.metadata.drop_all(bind=engine)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def assertStatements(self, count, fn, *args, **kwargs):
+        del self.statements[:]
+        result = fn(self.db, *args, **kwargs)
+        self.assertEqual(len(self.statements), count, self.statements)
+        return result
+
+    def test_write_budget(self):
+        # A target to record outbox messages for
+        settings.outbox_default_url = "http://targets/{target_system}"
+        self.addCleanup(setattr, settings, "outbox_default_url", None)
+        # Every successful write also records its change-feed entry in the same transaction
+        event_row = self.assertStatements(2, crud.create_event, EventCreate(id="e1", code="E1", name="Event"))
+        # Offer and link writes add their outbox message in the same transaction
+        self.assertStatements(3, crud.create_offer, OfferCreate(id="o1", code="O1", name="Offer"))
+        self.assertStatements(2, crud.update_event, "e1", EventUpdate(code="E1", name="Renamed"))
+        self.assertStatements(1, crud.update_event, "missing", EventUpdate(code="E2", name="Missing"))
+        etag = entity_etag(event_row.id, self.db.execute(select(Event.updated_at)).scalar_one())
+        # If-Match needs the current version first (one lookup, skipped on a cache hit)
+        self.assertStatements(3, crud.update_event, "e1", EventUpdate(code="E1", name="Again"), if_match=etag)
+        self.assertStatements(3, crud.create_event_offer_association, EventOfferCreate(event_id="e1", offer_id="o1"))
+        self.assertStatements(3, crud.update_event_offer_association, "e1", "o1", EventOfferUpdate(delay_minutes=5))
+        self.assertStatements(3, crud.delete_event_offer_association, "e1", "o1")
+        self.assertStatements(1, crud.delete_event_offer_association, "e1", "o1")
+        # The entity row plus its links, which have no ON DELETE CASCADE, plus the outbox message
+        self.assertStatements(4, crud.delete_offer, "o1")
+        self.assertStatements(1, crud.delete_event, "missing")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
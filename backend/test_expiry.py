@@ -0,0 +1,292 @@
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta, timezone
+from alembic import command
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert, select, text, update
+from sqlalchemy.orm import sessionmaker
+from test_event_offer import Base, engine, app, TestingSessionLocal
+from config import settings
+from crud import event_offer as crud
+from database import RoutingSession, WRITER_POOL_OPTIONS, use_sqlite_profile
+from migrations import alembic_config
+from pagination import encode_cursor
+from models.base import utcnow
+from models.event_offer import Event, Offer, event_offer_association
+from models.outbox import OutboxMessage
+from schemas.event_offer import EventUpdate
+from services.cache import entity_cache
+from services.expiry import ExpiryCollector, ExpirySweeper
+from services.resolution_index import resolution_index
+
+def utc(value):
+    return value.replace(tzinfo=timezone.utc) if value is not None and value.tzinfo is None else value
+
+def expire(bind, *event_ids):
+    # Backdated rather than waited for
+    with bind.begin() as conn:
+        conn.execute(update(Event.__table__).where(Event.id.in_(event_ids)).values(expires_at=utcnow() - timedelta(seconds=1)))
+    entity_cache.invalidate("event", *event_ids)
+
+class TestExpiry(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(app)
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Forever"})
+        self.client.post("/api/events/", json={"id": "e2", "code": "E2", "name": "A day", "lifetime_hours": 24})
+        self.client.post("/api/offers/", json={"id": "o1", "code": "O1", "name": "Offer"})
+        self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o1"})
+        self.client.post("/api/event-offers/", json={"event_id": "e2", "offer_id": "o1"})
+
+    def tearDown(self):
+        settings.expiry_enabled = True
+        settings.outbox_default_url = None
+        Base.metadata.drop_all(bind=engine)
+
+    def stored(self, event_id):
+        with engine.connect() as conn:
+            row = conn.execute(select(Event.created_at, Event.expires_at).where(Event.id == event_id)).one()
+        return utc(row.created_at), utc(row.expires_at)
+
+    def stored_name(self, event_id):
+        with engine.connect() as conn:
+            return conn.execute(select(Event.name).where(Event.id == event_id)).scalar_one()
+
+    def test_expires_at_follows_lifetime(self):
+        self.assertIsNone(self.stored("e1")[1])
+        created_at, expires_at = self.stored("e2")
+        self.assertEqual(expires_at, created_at + timedelta(hours=24))
+
+        # An update counts the new lifetime from creation (SQLite date functions keep milliseconds)
+        self.client.put("/api/events/e2", json={"code": "E2", "name": "Two days", "lifetime_hours": 48})
+        created_at, expires_at = self.stored("e2")
+        self.assertAlmostEqual((expires_at - created_at).total_seconds(), 48 * 3600, delta=0.001)
+        self.client.put("/api/events/e2", json={"code": "E2", "name": "Kept"})
+        self.assertAlmostEqual((self.stored("e2")[1] - created_at).total_seconds(), 48 * 3600, delta=0.001)
+        self.client.put("/api/events/e2", json={"code": "E2", "name": "Forever", "lifetime_hours": 0})
+        self.assertIsNone(self.stored("e2")[1])
+
+        self.client.post("/api/events/bulk", json=[
+            {"id": "e2", "code": "E2", "name": "Bulk", "lifetime_hours": 2},
+            {"id": "e3", "code": "E3", "name": "Bulk", "lifetime_hours": 1},
+        ])
+        created_at, expires_at = self.stored("e2")
+        self.assertAlmostEqual((expires_at - created_at).total_seconds(), 2 * 3600, delta=0.001)
+        created_at, expires_at = self.stored("e3")
+        self.assertEqual(expires_at, created_at + timedelta(hours=1))
+
+    def test_reads_leave_out_expired_events(self):
+        expire(engine, "e2")
+
+        self.assertEqual([event["id"] for event in self.client.get("/api/events/").json()], ["e1"])
+        # The second read finds the row in the cache, which is checked again
+        self.assertEqual(self.client.get("/api/events/e2").status_code, 404)
+        self.assertEqual(self.client.get("/api/events/e2").status_code, 404)
+        self.assertEqual(self.client.get("/api/events/e2", params={"fields": "id,name"}).status_code, 404)
+        batch = self.client.post("/api/events/batch", json={"ids": ["e2", "e1"]}).json()
+        self.assertEqual(([item["id"] for item in batch["items"]], batch["missing"]), (["e1"], ["e2"]))
+        batch = self.client.post("/api/events/batch", params={"fields": "id"}, json={"ids": ["e2", "e1"]}).json()
+        self.assertEqual(batch, {"items": [{"id": "e1"}], "missing": ["e2"]})
+        self.assertEqual([link["event_id"] for link in self.client.get("/api/event-offers/").json()], ["e1"])
+        self.assertEqual(self.client.get("/api/event-offers/e2/o1").status_code, 404)
+        self.assertEqual(self.client.get("/api/graph/events/e2").status_code, 404)
+        self.assertEqual([event["id"] for event in self.client.get("/api/graph/offers/o1").json()["events"]], ["e1"])
+        graph = self.client.get("/api/graph").json()
+        self.assertEqual(([event["id"] for event in graph["events"]], [link["event_id"] for link in graph["links"]]), (["e1"], ["e1"]))
+        changes = self.client.get("/api/changes").json()["changes"]
+        ops = {change["data"].get("id"): change["op"] for change in changes if change["kind"] == "event"}
+        self.assertEqual((ops["e1"], ops["e2"]), ("upserted", "deleted"))
+        ops = {(change["data"]["event_id"], change["data"]["offer_id"]): change["op"] for change in changes if change["kind"] == "link"}
+        self.assertEqual(ops, {("e1", "o1"): "upserted", ("e2", "o1"): "deleted"})
+
+        settings.expiry_enabled = False
+        entity_cache.clear()
+        self.assertEqual([event["id"] for event in self.client.get("/api/events/").json()], ["e1", "e2"])
+        self.assertEqual(self.client.get("/api/events/e2").status_code, 200)
+
+    def test_writes_treat_expired_events_as_missing(self):
+        self.client.post("/api/offers/", json={"id": "o2", "code": "O2", "name": "Offer"})
+        expire(engine, "e2")
+
+        self.assertEqual(self.client.put("/api/events/e2", json={"code": "E2", "name": "Renamed"}).status_code, 404)
+        self.assertEqual(self.stored_name("e2"), "A day")
+        # Neither a new link nor the existing one, whose conflict is not reported either
+        response = self.client.post("/api/event-offers/", json={"event_id": "e2", "offer_id": "o2"})
+        self.assertEqual((response.status_code, response.json()["detail"]), (404, "Event not found"))
+        self.assertEqual(self.client.post("/api/event-offers/", json={"event_id": "e2", "offer_id": "o1"}).status_code, 404)
+        self.assertEqual(self.client.put("/api/event-offers/e2/o1", json={"delay_minutes": 5}).status_code, 404)
+        results = self.client.post("/api/event-offers/bulk", json=[{"event_id": "e2", "offer_id": "o2"}]).json()["results"]
+        self.assertEqual([result["error"] for result in results], ["Event not found"])
+        with engine.connect() as conn:
+            links = conn.execute(select(event_offer_association).where(event_offer_association.c.event_id == "e2")).all()
+        self.assertEqual([(link.offer_id, link.delay_minutes) for link in links], [("o1", 0)])
+
+        self.assertEqual(self.client.put("/api/events/e1", json={"code": "E1", "name": "Renamed"}).status_code, 200)
+        self.assertEqual(self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o2"}).status_code, 201)
+
+    def test_resolution_and_ingest_leave_out_expired_events(self):
+        expire(engine, "e2")
+        self.assertEqual(self.client.get("/api/events/by-code/E2/actions").status_code, 404)
+        self.assertEqual(self.client.post("/api/occurrences", json={"event_code": "E2"}).status_code, 404)
+        response = self.client.post("/api/occurrences/batch", json=[{"event_code": "E2"}])
+        self.assertEqual(response.json(), {"accepted": 0, "rejected": [{"index": 0, "event_code": "E2", "error": "Event not found"}]})
+
+        # An entry compiled before its event expired is checked on every lookup
+        with engine.begin() as conn:
+            conn.execute(update(Event.__table__).where(Event.id == "e1").values(expires_at=utcnow() + timedelta(seconds=0.5)))
+        resolution_index.reset()
+        self.assertEqual(self.client.get("/api/events/by-code/E1/actions").status_code, 200)
+        time.sleep(0.5)
+        self.assertEqual(self.client.get("/api/events/by-code/E1/actions").status_code, 404)
+
+    def test_export_leaves_out_expired_events(self):
+        expire(engine, "e2")
+        rows = [json.loads(line) for line in self.client.get("/api/export/events").text.splitlines()]
+        self.assertEqual([row["id"] for row in rows], ["e1"])
+        rows = [json.loads(line) for line in self.client.get("/api/export/event-offers").text.splitlines()]
+        self.assertEqual([row["event_id"] for row in rows], ["e1"])
+
+    def test_sweeper_deletes_in_batches(self):
+        settings.outbox_default_url = "http://targets/{target_system}"
+        self.client.post("/api/events/", json={"id": "e3", "code": "E3", "name": "Not yet", "lifetime_hours": 24})
+        for i in range(5):
+            self.client.post("/api/events/", json={"id": f"x{i}", "code": f"X{i}", "name": "Gone", "lifetime_hours": 1})
+            self.client.post("/api/event-offers/", json={"event_id": f"x{i}", "offer_id": "o1"})
+        expire(engine, "e2", *(f"x{i}" for i in range(5)))
+        sweeper = ExpirySweeper(TestingSessionLocal, batch_size=2, pause_seconds=0)
+        self.assertEqual(sweeper.pending(), {"expired": 6})
+
+        summary = asyncio.run(sweeper.sweep())
+        self.assertEqual((summary["events"], summary["links"], summary["batches"]), (6, 6, 3))
+        self.assertEqual(asyncio.run(sweeper.sweep())["events"], 0)
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(select(Event.id).order_by(Event.id)).scalars().all(), ["e1", "e3"])
+            self.assertEqual(conn.execute(select(event_offer_association.c.event_id)).scalars().all(), ["e1"])
+            # Told downstream like a delete
+            self.assertEqual(conn.execute(select(func.count()).where(OutboxMessage.key == "event:e2")).scalar(), 1)
+        ops = {change["data"].get("id") or change["data"]["event_id"]: change["op"] for change in self.client.get("/api/changes").json()["changes"]}
+        self.assertEqual((ops["e2"], ops["x4"]), ("deleted", "deleted"))
+        self.assertEqual(sweeper.pending(), {"expired": 0})
+
+        stats = sweeper.stats()
+        self.assertEqual({key: stats[key] for key in ("sweeps", "batches", "events", "links")}, {"sweeps": 2, "batches": 3, "events": 6, "links": 6})
+        samples = {(sample.name, tuple(sample.labels.values())): sample.value
+                   for family in ExpiryCollector(sweeper).collect() for sample in family.samples}
+        self.assertEqual(samples[("expiry_deleted_total", ("events",))], 6)
+        self.assertEqual(samples[("expiry_deleted_total", ("event_offer",))], 6)
+        self.assertEqual(samples[("expiry_batches_total", ())], 3)
+        self.assertIn("expiry_deleted_total", self.client.get("/metrics").text)
+        self.assertEqual(self.client.get("/api/expiry/stats").json()["expired"], 0)
+
+class TestBackfill(unittest.TestCase):
+    def test_upgrade_sets_expires_at(self):
+        scratch = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'backfill.db')}")
+        with scratch.begin() as conn:
+            command.upgrade(alembic_config(conn), "a8c41e7f3d95")
+            conn.execute(text(
+                "INSERT INTO events (id, code, name, lifetime_hours, created_at, updated_at) VALUES "
+                "('e1', 'E1', 'Event', 0, '2026-01-01 00:00:00.250000', CURRENT_TIMESTAMP), "
+                "('e2', 'E2', 'Event', 36, '2026-01-01 00:00:00.250000', CURRENT_TIMESTAMP), "
+                "('e3', 'E3', 'Event', 2, '2026-01-01 00:00:00', CURRENT_TIMESTAMP)"
+            ))
+            command.upgrade(alembic_config(conn), "head")
+        with sessionmaker(bind=scratch)() as db:
+            stored = dict(db.execute(select(Event.id, Event.expires_at)).all())
+        self.assertIsNone(stored["e1"])
+        self.assertEqual(utc(stored["e2"]).isoformat(), "2026-01-02T12:00:00.250000+00:00")
+        self.assertEqual(utc(stored["e3"]).isoformat(), "2026-01-01T02:00:00+00:00")
+        scratch.dispose()
+
+class TestSweepUnderLoad(unittest.TestCase):
+    """A sweep of 10k expired events (and 20k links) out of 20k, against the production
+    SQLite setup (WAL, one writer connection), while the foreground keeps reading pages
+    and writing events."""
+    EVENTS = 20000
+    LINKS_PER_EVENT = 2
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(self.tmpdir.name, 'expiry.db')}"
+        self.reader = create_engine(url, connect_args={"check_same_thread": False}, pool_size=8, max_overflow=-1)
+        self.writer = create_engine(url, connect_args={"check_same_thread": False}, **WRITER_POOL_OPTIONS)
+        use_sqlite_profile(self.reader)
+        use_sqlite_profile(self.writer, writer=True)
+        Base.metadata.create_all(self.writer)
+        self.Session = sessionmaker(bind=self.reader, autoflush=False, class_=RoutingSession, info={"writer": self.writer})
+        resolution_index.reset()
+        entity_cache.clear()
+
+        now, past = utcnow(), utcnow() - timedelta(hours=1)
+        self.expired = {f"event-{i:06d}" for i in range(0, self.EVENTS, 2)}
+        with self.writer.begin() as conn:
+            conn.execute(insert(Offer.__table__), [{"id": f"offer-{i}", "code": f"O{i}", "name": "Offer"} for i in range(50)])
+            conn.execute(insert(Event.__table__), [
+                {"id": f"event-{i:06d}", "code": f"E{i:06d}", "name": f"Event {i}", "lifetime_hours": 1,
+                 "created_at": now, "updated_at": now, "expires_at": past if f"event-{i:06d}" in self.expired else now + timedelta(hours=1)}
+                for i in range(self.EVENTS)
+            ])
+            conn.execute(insert(event_offer_association), [
+                {"event_id": f"event-{i:06d}", "offer_id": f"offer-{(i + j) % 50}"}
+                for i in range(self.EVENTS) for j in range(self.LINKS_PER_EVENT)
+            ])
+
+    def tearDown(self):
+        self.reader.dispose()
+        self.writer.dispose()
+        self.tmpdir.cleanup()
+
+    def foreground(self, rng: random.Random, reads: list, writes: list, stop) -> None:
+        while not stop():
+            cursor = f"event-{rng.randrange(self.EVENTS - 200):06d}"
+            started = time.perf_counter()
+            with self.Session() as db:
+                page = crud.get_events(db, limit=100, cursor=encode_cursor(cursor))
+            reads.append(time.perf_counter() - started)
+            self.assertFalse({event.id for event in page} & self.expired)
+            if len(reads) % 5 == 0:
+                event_id = f"event-{rng.randrange(1, self.EVENTS, 2):06d}"
+                started = time.perf_counter()
+                with self.Session() as db:
+                    self.assertIsNotNone(crud.update_event(db, event_id, EventUpdate(code=f"E{event_id[6:]}", name="Renamed")))
+                writes.append(time.perf_counter() - started)
+
+    def test_foreground_latency_during_sweep(self):
+        rng = random.Random(3)
+        baseline_reads, baseline_writes = [], []
+        self.foreground(rng, baseline_reads, baseline_writes, lambda: len(baseline_reads) >= 100)
+
+        sweeper = ExpirySweeper(self.Session, batch_size=500, pause_seconds=0.01)
+        done = threading.Event()
+        summary = {}
+        def sweep():
+            summary.update(asyncio.run(sweeper.sweep()))
+            done.set()
+        thread = threading.Thread(target=sweep)
+        reads, writes = [], []
+        thread.start()
+        self.foreground(rng, reads, writes, done.is_set)
+        thread.join()
+
+        self.assertEqual((summary["events"], summary["links"]), (len(self.expired), len(self.expired) * self.LINKS_PER_EVENT))
+        self.assertEqual(summary["batches"], len(self.expired) // 500)
+        with self.reader.connect() as conn:
+            self.assertEqual(conn.execute(select(func.count()).select_from(Event)).scalar(), self.EVENTS - len(self.expired))
+        # The foreground kept going through the sweep rather than waiting for its end
+        self.assertGreaterEqual(len(writes), 5)
+        # A write waits for one batch at most, never for the whole sweep
+        self.assertLess(max(writes), sweeper.max_batch_seconds + max(baseline_writes) + 0.25)
+        self.assertLess(max(writes), summary["seconds"] / 3)
+        # Reads never wait on the writer (WAL); they only share the CPU with it
+        self.assertLess(statistics.median(reads), 3 * statistics.median(baseline_reads) + 0.005)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+import os
+import unittest
+from fastapi.testclient import TestClient
+from test_event_offer import Base, engine, app, TestingSessionLocal
+from models.event_offer import event_offer_association
+from services.export import iter_export
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+# Rows for the constant-memory test; override with EXPORT_TEST_ROWS for a quicker run
+EXPORT_TEST_ROWS = int(os.environ.get("EXPORT_TEST_ROWS", 1_000_000))
+RSS_CEILING_BYTES = 64 * 1024 * 1024
+
+def current_rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def test_ndjson_and_csv(self):
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Event, with comma"})
+        self.client.post("/api/events/", json={"id": "e2", "code": "E2", "name": "Second"})
+
+        response = self.client.get("/api/export/events")
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([row["id"] for row in rows], ["e1", "e2"])
+        self.assertIn("created_at", rows[0])
+
+        response = self.client.get("/api/export/events?format=csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        self.assertEqual(rows[0]["name"], "Event, with comma")
+
+        self.assertEqual(self.client.get("/api/export/users").status_code, 404)
+        self.assertEqual(self.client.get("/api/export/events?format=xml").status_code, 400)
+
+    @unittest.skipUnless(os.path.exists("/proc/self/statm"), "needs /proc to read RSS")
+    def test_association_export_memory_is_constant(self):
+        with engine.begin() as conn:
+            for start in range(0, EXPORT_TEST_ROWS, 100_000):
+                conn.execute(event_offer_association.insert(), [
+                    {"event_id": f"event-{i // 100}", "offer_id": f"offer-{i % 100}", "delay_minutes": i % 60, "action_type": "enable"}
+                    for i in range(start, min(start + 100_000, EXPORT_TEST_ROWS))
+                ])
+
+        baseline = current_rss()
+        peak, lines = baseline, 0
+        for chunk in iter_export(event_offer_association, "ndjson", TestingSessionLocal):
+            lines += chunk.count(b"\n")
+            peak = max(peak, current_rss())
+
+        self.assertEqual(lines, EXPORT_TEST_ROWS)
+        self.assertLess(peak - baseline, RSS_CEILING_BYTES)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from fastapi.testclient import TestClient
+from sqlalchemy import event as sa_event
+from test_event_offer import Base, engine, sync_app, async_app
+from config import settings
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+EVENTS = [
+    {"id": f"e{i}", "code": f"E{i}", "name": f"Event {i}", "description": "x" * 2000, "queue_name": "fast"}
+    for i in range(4)
+]
+
+class TestSparseFieldsets(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(async_app)
+        self.client.post("/api/events/bulk", json=EVENTS)
+        self.client.post("/api/offers/", json={"id": "o1", "code": "O1", "name": "Offer 1", "priority": 3})
+        self.statements = []
+        sa_event.listen(engine, "before_cursor_execute", self._record)
+
+    def tearDown(self):
+        sa_event.remove(engine, "before_cursor_execute", self._record)
+        Base.metadata.drop_all(bind=engine)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT"):
+            self.statements.append(statement)
+
+    def test_list_detail_and_batch(self):
+        for app in (sync_app, async_app):
+            client = TestClient(app)
+            # Schema order, and id whether asked for or not
+            page = client.get("/api/events/?fields=name,code&limit=2")
+            self.assertEqual(page.json(), [{"id": "e0", "code": "E0", "name": "Event 0"}, {"id": "e1", "code": "E1", "name": "Event 1"}])
+            self.assertIn("x-next-cursor", page.headers)
+            self.assertEqual(client.get("/api/events/e2?fields=queue_name").json(), {"id": "e2", "queue_name": "fast"})
+            self.assertEqual(client.get("/api/offers/o1?fields=priority,updated_at").json().keys(), {"id", "priority", "updated_at"})
+            body = client.post("/api/events/batch?fields=code", json={"ids": ["e3", "nope", "e1"]}).json()
+            self.assertEqual(body, {"items": [{"id": "e3", "code": "E3"}, {"id": "e1", "code": "E1"}], "missing": ["nope"]})
+            # Every field is the full representation
+            full = client.get("/api/events/e0").json()
+            self.assertEqual(client.get(f"/api/events/e0?fields={','.join(full)}").json(), full)
+
+    def test_select_is_projected(self):
+        # The sync routes run on the engine the statements are recorded from
+        client = TestClient(sync_app)
+        entity_cache.clear()
+        del self.statements[:]
+        client.get("/api/events/?fields=code,name")
+        client.get("/api/events/e1?fields=code,name")
+        client.post("/api/events/batch?fields=code,name", json={"ids": ["e2", "e3"]})
+        self.assertEqual(len(self.statements), 3, self.statements)
+        for statement in self.statements:
+            self.assertIn("events.code", statement)
+            self.assertNotIn("description", statement.split("FROM")[0])
+
+    def test_partial_rows_stay_out_of_the_cache(self):
+        client = TestClient(sync_app)
+        client.get("/api/events/e1?fields=code")
+        self.assertEqual(client.get("/api/events/e1").json()["description"], "x" * 2000)
+        # A full row already cached answers a fieldset read without a query
+        del self.statements[:]
+        self.assertEqual(client.get("/api/events/e1?fields=name").json(), {"id": "e1", "name": "Event 1"})
+        self.assertEqual(self.statements, [])
+
+    def test_etags_and_invalidation(self):
+        full = self.client.get("/api/events/?limit=2")
+        sparse = self.client.get("/api/events/?limit=2&fields=code")
+        self.assertNotEqual(full.headers["etag"], sparse.headers["etag"])
+        revalidated = self.client.get("/api/events/?limit=2&fields=code", headers={"If-None-Match": sparse.headers["etag"]})
+        self.assertEqual(revalidated.status_code, 304)
+        detail = self.client.get("/api/events/e0?fields=name")
+        self.assertNotEqual(detail.headers["etag"], self.client.get("/api/events/e0").headers["etag"])
+        self.assertEqual(self.client.get("/api/events/e0?fields=name", headers={"If-None-Match": detail.headers["etag"]}).status_code, 304)
+
+        self.client.put("/api/events/e0", json={"code": "E0", "name": "Renamed"})
+        self.assertEqual(self.client.get("/api/events/?limit=2&fields=code,name").json()[0]["name"], "Renamed")
+        self.assertEqual(self.client.get("/api/events/e0?fields=name", headers={"If-None-Match": detail.headers["etag"]}).json(), {"id": "e0", "name": "Renamed"})
+
+    def test_unknown_fields(self):
+        for url in ("/api/events/?fields=code,price", "/api/offers/o1?fields=nope"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("Unknown fields", response.json()["detail"])
+
+    def test_validated_responses(self):
+        settings.validate_list_responses = True
+        try:
+            self.assertEqual(self.client.get("/api/events/?fields=code&limit=1").json(), [{"id": "e0", "code": "E0"}])
+            self.assertEqual(self.client.post("/api/events/batch?fields=name", json={"ids": ["e1"]}).json()["items"], [{"id": "e1", "name": "Event 1"}])
+        finally:
+            settings.validate_list_responses = False
+
+if __name__ == "__main__":
+    unittest.main()
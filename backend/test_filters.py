@@ -0,0 +1,92 @@
+import unittest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from test_event_offer import Base, engine, sync_app, async_app
+from crud.event_offer import _filter_offers
+from models.event_offer import Offer
+from schemas.event_offer import OfferFilter
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+EVENTS = [
+    {"id": "e1", "code": "E1", "name": "Summer Sale", "description": "Café weekend deals", "queue_name": "fast", "lifetime_hours": 24},
+    {"id": "e2", "code": "E2", "name": "Winter Sale", "queue_name": "fast", "lifetime_hours": 72, "disable_all_campaigns": True},
+    {"id": "e3", "code": "E3", "name": "Loyalty Bonus", "description": "Summer points", "queue_name": "slow", "lifetime_hours": 168},
+]
+OFFERS = [
+    {"id": "o1", "code": "O1", "name": "Gold coupon", "priority": 1, "target_system": "crm"},
+    {"id": "o2", "code": "O2", "name": "Silver coupon", "priority": 5, "target_system": "crm"},
+    {"id": "o3", "code": "O3", "name": "SMS blast", "description": "gold members only", "priority": 9, "target_system": "sms"},
+]
+
+def ids(response):
+    assert response.status_code == 200, response.text
+    return [row["id"] for row in response.json()]
+
+class TestListFilters(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(async_app)
+        self.client.post("/api/events/bulk", json=EVENTS)
+        for offer in OFFERS:
+            self.client.post("/api/offers/", json=offer)
+
+    def tearDown(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def test_event_filters(self):
+        for app in (sync_app, async_app):
+            client = TestClient(app)
+            self.assertEqual(ids(client.get("/api/events/?queue_name=fast")), ["e1", "e2"])
+            self.assertEqual(ids(client.get("/api/events/?disable_all_campaigns=false")), ["e1", "e3"])
+            self.assertEqual(ids(client.get("/api/events/?min_lifetime_hours=48&max_lifetime_hours=168")), ["e2", "e3"])
+            self.assertEqual(ids(client.get("/api/events/?queue_name=fast&max_lifetime_hours=24")), ["e1"])
+
+    def test_offer_filters(self):
+        for app in (sync_app, async_app):
+            client = TestClient(app)
+            self.assertEqual(ids(client.get("/api/offers/?target_system=crm")), ["o1", "o2"])
+            self.assertEqual(ids(client.get("/api/offers/?min_priority=2")), ["o2", "o3"])
+            self.assertEqual(ids(client.get("/api/offers/?target_system=crm&min_priority=2&max_priority=5")), ["o2"])
+
+    def test_filtered_pages_and_revalidation(self):
+        first = self.client.get("/api/events/?queue_name=fast&limit=1")
+        self.assertEqual(ids(first), ["e1"])
+        cursor = first.headers["x-next-cursor"]
+        self.assertEqual(ids(self.client.get(f"/api/events/?queue_name=fast&limit=1&cursor={cursor}")), ["e2"])
+        # Each filter has its own cached pages
+        self.assertEqual(ids(self.client.get("/api/events/?queue_name=slow&limit=1")), ["e3"])
+        self.assertEqual(ids(self.client.get("/api/events/?limit=1")), ["e1"])
+        cached = self.client.get("/api/events/?queue_name=fast&limit=1", headers={"If-None-Match": first.headers["etag"]})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_search(self):
+        self.assertEqual(ids(self.client.get("/api/events/?q=summer")), ["e1", "e3"])
+        # Prefix match, case and accents ignored, every word required
+        self.assertEqual(ids(self.client.get("/api/events/?q=cafe WEEK")), ["e1"])
+        self.assertEqual(ids(self.client.get("/api/events/?q=summer&queue_name=slow")), ["e3"])
+        self.assertEqual(ids(self.client.get("/api/offers/?q=gold")), ["o1", "o3"])
+        # Operators and quotes are searched as plain words
+        self.assertEqual(ids(self.client.get('/api/offers/?q="gold" OR NEAR(')), [])
+        self.assertEqual(ids(self.client.get("/api/offers/?q=%20-*")), ["o1", "o2", "o3"])
+
+    def test_search_index_follows_writes(self):
+        self.client.put("/api/events/e1", json={"code": "E1", "name": "Autumn Sale"})
+        self.client.delete("/api/events/e3")
+        self.client.post("/api/events/bulk", json=[{"id": "e2", "code": "E2", "name": "Summer Flash"}])
+        self.assertEqual(ids(self.client.get("/api/events/?q=summer")), ["e2"])
+        self.assertEqual(ids(self.client.get("/api/events/?q=autumn")), ["e1"])
+
+    def test_search_without_fts5_uses_like(self):
+        db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()))
+        stmt = _filter_offers(db, select(Offer.id), OfferFilter(q="50%_off"))
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        self.assertIn("ILIKE", sql)
+        self.assertNotIn("MATCH", sql)
+
+if __name__ == "__main__":
+    unittest.main()
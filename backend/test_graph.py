@@ -0,0 +1,82 @@
+import unittest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from test_event_offer import Base, engine, async_engine, app, TestingSessionLocal
+from crud import event_offer as crud
+from models.event_offer import Event, Offer, event_offer_association
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+class TestGraphEndpoints(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(app)
+        self.statements = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._record)
+
+    def tearDown(self):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self._record)
+        Base.metadata.drop_all(bind=engine)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def seed(self, events, offers):
+        with engine.begin() as conn:
+            conn.execute(Event.__table__.insert(), [{"id": f"e{i}", "code": f"E{i}", "name": "Event"} for i in range(events)])
+            conn.execute(Offer.__table__.insert(), [{"id": f"o{i}", "code": f"O{i}", "name": "Offer"} for i in range(offers)])
+            conn.execute(event_offer_association.insert(), [
+                {"event_id": f"e{e}", "offer_id": f"o{o}", "delay_minutes": e + o, "action_type": "enable" if o % 2 else "disable"}
+                for e in range(events) for o in range(offers)
+            ])
+
+    def get(self, url):
+        del self.statements[:]
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(self.statements)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.seed(2, 2)
+        small = [self.get(url)[1] for url in ("/api/graph/events", "/api/graph/offers", "/api/graph", "/api/graph/events/e1")]
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        self.seed(30, 20)
+        large = [self.get(url)[1] for url in ("/api/graph/events", "/api/graph/offers", "/api/graph", "/api/graph/events/e1")]
+        self.assertEqual(small, large)
+        self.assertEqual(large, [2, 2, 3, 2])
+
+    def test_links_carry_association_fields(self):
+        self.seed(2, 3)
+        event_with_offers, _ = self.get("/api/graph/events/e1")
+        self.assertEqual([o["id"] for o in event_with_offers["offers"]], ["o0", "o1", "o2"])
+        self.assertEqual([o["delay_minutes"] for o in event_with_offers["offers"]], [1, 2, 3])
+        self.assertEqual(event_with_offers["offers"][0]["action_type"], "disable")
+        self.assertEqual(event_with_offers["offers"][0]["code"], "O0")
+
+        # Exactly the far side's columns plus the association's own fields
+        with TestingSessionLocal() as db:
+            offer = vars(crud.get_event_with_offers(db, "e1").offers[0])
+            event_ = vars(crud.get_offer_with_events(db, "o1").events[0])
+        self.assertEqual(set(offer), set(Offer.__table__.c.keys()) | {"delay_minutes", "action_type"})
+        self.assertEqual(set(event_), set(Event.__table__.c.keys()) | {"delay_minutes", "action_type"})
+
+        offers, _ = self.get("/api/graph/offers?limit=2")
+        self.assertEqual([[e["id"] for e in o["events"]] for o in offers], [["e0", "e1"], ["e0", "e1"]])
+        self.assertIn("X-Next-Cursor", self.client.get("/api/graph/offers?limit=2").headers)
+
+        graph, _ = self.get("/api/graph")
+        self.assertEqual((len(graph["events"]), len(graph["offers"]), len(graph["links"])), (2, 3, 6))
+        self.assertEqual(graph["links"][0], {"event_id": "e0", "offer_id": "o0", "delay_minutes": 0, "action_type": "disable"})
+
+    def test_missing_and_unlinked(self):
+        self.client.post("/api/events/", json={"id": "lonely", "code": "L", "name": "No offers"})
+        self.assertEqual(self.client.get("/api/graph/events/lonely").json()["offers"], [])
+        self.assertEqual(self.client.get("/api/graph/events/missing").status_code, 404)
+        self.assertEqual(self.client.get("/api/graph/offers/missing").status_code, 404)
+        self.assertEqual(self.client.get("/api/graph/events?cursor=bad").status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
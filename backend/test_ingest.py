@@ -0,0 +1,77 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from test_event_offer import Base, engine, app, TestingSessionLocal
+from models.occurrence import EventOccurrence, OccurrenceAction
+from services.cache import entity_cache
+from services.ingest import ingest_pipeline
+from services.resolution_index import resolution_index
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.saved = (ingest_pipeline.session_factory, ingest_pipeline.queue_size, ingest_pipeline.batch_wait_seconds)
+        ingest_pipeline.session_factory = TestingSessionLocal
+        ingest_pipeline.counters.clear()
+        self.client = TestClient(app).__enter__()
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Signup", "lifetime_hours": 2, "queue_name": "fast"})
+        self.client.post("/api/events/", json={"id": "e2", "code": "E2", "name": "Churn", "disable_all_campaigns": True})
+        self.client.post("/api/offers/", json={"id": "o1", "code": "O1", "name": "Welcome", "target_system": "crm"})
+        self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o1", "delay_minutes": 30})
+        self.client.post("/api/event-offers/", json={"event_id": "e2", "offer_id": "o1"})
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+        ingest_pipeline.session_factory, ingest_pipeline.queue_size, ingest_pipeline.batch_wait_seconds = self.saved
+        Base.metadata.drop_all(bind=engine)
+
+    def drain(self):
+        self.client.portal.call(ingest_pipeline.drain)
+
+    def test_single_and_batch_are_persisted_with_actions(self):
+        occurred_at = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+        response = self.client.post("/api/occurrences", json={"event_code": "E1", "occurred_at": occurred_at.isoformat()})
+        self.assertEqual((response.status_code, response.json()["accepted"]), (202, 1))
+        response = self.client.post("/api/occurrences/batch", json=[{"event_code": "E2"}, {"event_code": "NOPE"}, {"event_code": "E1"}])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["accepted"], 2)
+        self.assertEqual(response.json()["rejected"], [{"index": 1, "event_code": "NOPE", "error": "Event not found"}])
+        self.drain()
+
+        with TestingSessionLocal() as db:
+            occurrences = db.execute(select(EventOccurrence).order_by(EventOccurrence.occurred_at)).scalars().all()
+            actions = {a.occurrence_id: a for a in db.execute(select(OccurrenceAction)).scalars()}
+        self.assertEqual(len(occurrences), 3)
+        first = occurrences[0]
+        self.assertEqual((first.event_id, first.queue_name), ("e1", "fast"))
+        self.assertEqual(first.expires_at.replace(tzinfo=timezone.utc), occurred_at + timedelta(hours=2))
+        self.assertEqual(actions[first.id].due_at.replace(tzinfo=timezone.utc), occurred_at + timedelta(minutes=30))
+        self.assertEqual(actions[first.id].target_system, "crm")
+        churn = next(o for o in occurrences if o.event_id == "e2")
+        self.assertEqual(actions[churn.id].action_type, "disable")
+        self.assertIsNone(churn.expires_at)
+
+        stats = self.client.get("/api/occurrences/stats").json()
+        self.assertEqual((stats["accepted"], stats["persisted"], stats["actions"]), (3, 3, 3))
+        self.assertEqual(set(stats["queues"]), {"fast", "default_queue"})
+
+    def test_unknown_code_is_404(self):
+        self.assertEqual(self.client.post("/api/occurrences", json={"event_code": "NOPE"}).status_code, 404)
+
+    def test_full_queue_answers_429_and_queues_nothing(self):
+        ingest_pipeline.queue_size = 2
+        # A long batch wait keeps the worker from emptying the queue during the test
+        ingest_pipeline.batch_wait_seconds = 0.5
+        response = self.client.post("/api/occurrences/batch", json=[{"event_code": "E1"}] * 3)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertEqual(self.client.post("/api/occurrences/batch", json=[{"event_code": "E1"}] * 2).status_code, 202)
+        self.drain()
+        self.assertEqual(ingest_pipeline.stats()["persisted"], 2)
+        self.assertEqual(ingest_pipeline.stats()["rejected_full"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
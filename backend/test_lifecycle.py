@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from alembic.script import ScriptDirectory
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+from test_event_offer import Base, engine, app
+from config import settings
+from lifecycle import lifecycle
+from migrations import BACKEND_DIR, SCHEMA_REVISION, SchemaMismatch, create_schema, schema_revision, upgrade_schema, verify_schema
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+def scratch_engine():
+    return create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'lifecycle.db')}")
+
+class TestSchemaRevision(unittest.TestCase):
+    def test_revision_is_the_migration_head(self):
+        self.assertEqual(ScriptDirectory(os.path.join(BACKEND_DIR, "alembic")).get_heads(), [SCHEMA_REVISION])
+
+    def test_verify(self):
+        scratch = scratch_engine()
+        self.assertIsNone(schema_revision(scratch))
+        with self.assertRaisesRegex(SchemaMismatch, "no revision"):
+            verify_schema(scratch)
+        create_schema(scratch)
+        self.assertEqual(verify_schema(scratch), SCHEMA_REVISION)
+        with scratch.begin() as conn:
+            conn.execute(text("UPDATE alembic_version SET version_num = '1a90a4dcde94'"))
+        with self.assertRaisesRegex(SchemaMismatch, "1a90a4dcde94"):
+            verify_schema(scratch)
+        scratch.dispose()
+
+    def test_upgrade_from_empty(self):
+        scratch = scratch_engine()
+        upgrade_schema(scratch)
+        self.assertEqual(verify_schema(scratch), SCHEMA_REVISION)
+        self.assertTrue({"events", "offers", "event_offer", "entity_changes", "outbox_messages"} <= set(inspect(scratch).get_table_names()))
+        scratch.dispose()
+
+class TestLifespan(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        TestClient(app).post("/api/events/", json={"id": "e1", "code": "E1", "name": "Event 1"})
+        resolution_index.reset()
+        entity_cache.clear()
+
+    def tearDown(self):
+        settings.schema_on_startup = "off"
+        Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+    def test_refuses_an_unstamped_database(self):
+        settings.schema_on_startup = "verify"
+        with self.assertRaises(SchemaMismatch):
+            with TestClient(app):
+                pass
+        self.assertFalse(lifecycle.ready)
+
+    def test_ready_after_startup_only(self):
+        settings.schema_on_startup = "verify"
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"))
+            conn.execute(text("INSERT INTO alembic_version VALUES (:revision)"), {"revision": SCHEMA_REVISION})
+        self.assertEqual(TestClient(app).get("/ready").status_code, 503)
+        with TestClient(app) as client:
+            ready = client.get("/ready")
+            self.assertEqual(ready.status_code, 200)
+            self.assertEqual(ready.json()["status"], "ready")
+            self.assertEqual(set(ready.json()["startup_ms"]), {"schema", "pool", "warm", "index", "services", "total"})
+            # Warmed: the first page is cached and the resolution index loaded
+            self.assertEqual([row["id"] for row in entity_cache.peek_list("event", (0, 100, None))], ["e1"])
+            self.assertTrue(resolution_index.loaded)
+        self.assertEqual(lifecycle.state, "stopped")
+        self.assertEqual(TestClient(app).get("/ready").json()["status"], "stopped")
+        self.assertEqual(TestClient(app).get("/health").status_code, 200)
+
+if __name__ == "__main__":
+    unittest.main()
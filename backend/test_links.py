@@ -0,0 +1,99 @@
+import unittest
+from fastapi.testclient import TestClient
+from test_event_offer import Base, engine, TestingSessionLocal, sync_app, async_app
+from crud.event_offer import _link_page, _link_statement
+from schemas.event_offer import EventOfferFilter
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+LINKS = [
+    ("e1", "o1", "enable"), ("e1", "o2", "disable"), ("e1", "o3", "enable"),
+    ("e2", "o1", "disable"), ("e2", "o3", "enable"), ("e3", "o1", "enable"),
+]
+
+def pairs(response):
+    assert response.status_code == 200, response.text
+    return [(row["event_id"], row["offer_id"]) for row in response.json()]
+
+class TestLinkLists(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(async_app)
+        for i in (1, 2, 3):
+            self.client.post("/api/events/", json={"id": f"e{i}", "code": f"E{i}", "name": "Event"})
+            self.client.post("/api/offers/", json={"id": f"o{i}", "code": f"O{i}", "name": "Offer"})
+        for event_id, offer_id, action_type in LINKS:
+            self.client.post("/api/event-offers/", json={"event_id": event_id, "offer_id": offer_id, "action_type": action_type})
+
+    def tearDown(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def test_lists_by_event_offer_and_action_type(self):
+        for app in (sync_app, async_app):
+            client = TestClient(app)
+            self.assertEqual(pairs(client.get("/api/event-offers/")), [(e, o) for e, o, _ in LINKS])
+            self.assertEqual(pairs(client.get("/api/event-offers/?event_id=e1")), [("e1", "o1"), ("e1", "o2"), ("e1", "o3")])
+            self.assertEqual(pairs(client.get("/api/event-offers/?offer_id=o1")), [("e1", "o1"), ("e2", "o1"), ("e3", "o1")])
+            self.assertEqual(pairs(client.get("/api/event-offers/?action_type=disable")), [("e1", "o2"), ("e2", "o1")])
+            self.assertEqual(pairs(client.get("/api/event-offers/?offer_id=o1&action_type=enable")), [("e1", "o1"), ("e3", "o1")])
+            self.assertEqual(pairs(client.get("/api/event-offers/?event_id=e2&offer_id=o3")), [("e2", "o3")])
+            row = client.get("/api/event-offers/?event_id=e1&limit=1").json()[0]
+            self.assertEqual(row, {"event_id": "e1", "offer_id": "o1", "delay_minutes": 0, "action_type": "enable"})
+
+    def test_cursor_pages(self):
+        for query in ("", "offer_id=o1&", "action_type=enable&", "event_id=e1&"):
+            expected = pairs(self.client.get(f"/api/event-offers/?{query}"))
+            seen, cursor = [], None
+            while True:
+                url = f"/api/event-offers/?{query}limit=2" + (f"&cursor={cursor}" if cursor else "")
+                response = self.client.get(url)
+                seen.extend(pairs(response))
+                cursor = response.headers.get("x-next-cursor")
+                if cursor is None:
+                    break
+            self.assertEqual(seen, expected, query)
+        self.assertEqual(self.client.get("/api/event-offers/?cursor=bogus").status_code, 400)
+        # An entity cursor is not a link cursor
+        offers_cursor = self.client.get("/api/offers/?limit=1").headers["x-next-cursor"]
+        self.assertEqual(self.client.get(f"/api/event-offers/?cursor={offers_cursor}").status_code, 400)
+
+    def test_lists_follow_link_writes(self):
+        self.assertEqual(pairs(self.client.get("/api/event-offers/?offer_id=o2")), [("e1", "o2")])
+        self.client.put("/api/event-offers/e1/o2", json={"action_type": "enable"})
+        self.client.post("/api/event-offers/", json={"event_id": "e3", "offer_id": "o2"})
+        self.assertEqual(pairs(self.client.get("/api/event-offers/?offer_id=o2&action_type=enable")), [("e1", "o2"), ("e3", "o2")])
+        self.client.delete("/api/offers/o2")
+        self.assertEqual(pairs(self.client.get("/api/event-offers/?offer_id=o2")), [])
+
+    def test_read_single_link(self):
+        for app in (sync_app, async_app):
+            client = TestClient(app)
+            response = client.get("/api/event-offers/e1/o2")
+            self.assertEqual(response.json()["action_type"], "disable")
+            # Both halves of the key must match, not just the event
+            self.assertEqual(client.get("/api/event-offers/e3/o2").status_code, 404)
+
+    def test_plans_use_covering_indexes(self):
+        db = TestingSessionLocal()
+        try:
+            def plan(filters):
+                sql = str(_link_statement(db, 0, 100, None, filters).compile(compile_kwargs={"literal_binds": True}))
+                steps = " ".join(row[3] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+                # Read in page order, never sorted afterwards
+                self.assertNotIn("TEMP B-TREE", steps)
+                return steps
+
+            self.assertIn("COVERING INDEX ix_event_offer_offer_id_event_id (offer_id=?)", plan(EventOfferFilter(offer_id="o1")))
+            self.assertIn("COVERING INDEX ix_event_offer_offer_id_event_id (offer_id=?)", plan(EventOfferFilter(offer_id="o1", action_type="enable")))
+            self.assertIn("COVERING INDEX ix_event_offer_action_type_event_id (action_type=?)", plan(EventOfferFilter(action_type="enable")))
+            # A later page seeks within the offer's range instead of rereading it
+            cursor = TestClient(sync_app).get("/api/event-offers/?offer_id=o1&limit=1").headers["x-next-cursor"]
+            self.assertEqual(_link_page(db, 0, 5, cursor, EventOfferFilter(offer_id="o1")),
+                             [{"event_id": e, "offer_id": "o1", "delay_minutes": 0, "action_type": a} for e, a in (("e2", "disable"), ("e3", "enable"))])
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from test_event_offer import Base, engine, async_engine, app, sync_app
+import metrics
+from config import settings
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        # The test engines stand in for the ones main.py instruments
+        metrics.instrument_engine(engine)
+        metrics.instrument_engine(async_engine.sync_engine)
+        self.client = TestClient(app)
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Event"})
+
+    def tearDown(self):
+        metrics.uninstrument_engine(engine)
+        metrics.uninstrument_engine(async_engine.sync_engine)
+        settings.slow_query_seconds = None
+        settings.outbox_default_url = None
+        Base.metadata.drop_all(bind=engine)
+
+    def test_requests_are_labelled_by_route_template(self):
+        route = "/api/events/{event_id}"
+        before = sample("http_request_duration_seconds_count", method="GET", route=route, status="200")
+        queries = sample("http_request_db_queries_sum", route=route)
+        self.client.get("/api/events/e1")
+        self.client.get("/api/events/e1")
+        self.assertEqual(sample("http_request_duration_seconds_count", method="GET", route=route, status="200"), before + 2)
+        # One lookup, then a cache hit
+        self.assertEqual(sample("http_request_db_queries_sum", route=route), queries + 1)
+        self.assertEqual(sample("http_requests_in_progress", method="GET"), 0)
+
+        unmatched = sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+        self.client.get("/no/such/path")
+        self.assertEqual(sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404"), unmatched + 1)
+
+    def test_threadpool_queries_are_attributed_to_their_request(self):
+        settings.outbox_default_url = "http://targets/{target_system}"
+        client = TestClient(metrics.MetricsMiddleware(sync_app))
+        route = "/api/offers/"
+        queries = sample("http_request_db_queries_sum", route=route)
+        self.assertEqual(client.post(route, json={"id": "o1", "code": "O1", "name": "Offer"}).status_code, 201)
+        # The offer row, its outbox message and its change-feed entry
+        self.assertEqual(sample("http_request_db_queries_sum", route=route), queries + 3)
+
+    def test_slow_query_log_names_the_route(self):
+        settings.slow_query_seconds = 0
+        slow = sample("db_slow_queries_total", route="DELETE /api/events/{event_id}")
+        with self.assertLogs("sql.slow", "WARNING") as logs:
+            self.client.delete("/api/events/e1")
+        self.assertIn("from DELETE /api/events/{event_id}: DELETE FROM events", logs.output[0])
+        self.assertGreater(sample("db_slow_queries_total", route="DELETE /api/events/{event_id}"), slow)
+
+    def test_metrics_endpoint(self):
+        with TestClient(app) as client:
+            response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        for name in ("http_request_duration_seconds_bucket", "db_query_duration_seconds_bucket", "threadpool_threads_limit", "threadpool_tasks_waiting"):
+            self.assertIn(name, response.text)
+        self.assertNotIn("/metrics", self.client.get("/openapi.json").json()["paths"])
+
+if __name__ == "__main__":
+    unittest.main()
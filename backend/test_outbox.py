@@ -0,0 +1,238 @@
+import asyncio
+import json
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from test_event_offer import Base, engine, app, TestingSessionLocal
+from models.outbox import OutboxMessage
+from config import settings
+from services.cache import entity_cache
+from services.outbox import OutboxDispatcher, enqueue_actions
+from services.resolution_index import resolution_index
+from services.scheduler import ScheduledAction
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def stand_in(received, failing, delay=0.0, fail_requests=(), delays=None):
+    """Local HTTP stand-in for the target systems: records each batch, answers 503 for
+    the targets in ``failing`` and for the (target, n) pairs in ``fail_requests`` (the nth
+    request to that target, from 1), takes ``delay`` seconds to answer (or the target's
+    entry in ``delays``) and tracks how many requests per target were in flight at once."""
+    target = FastAPI()
+    requests, in_flight, target.state.max_in_flight = Counter(), Counter(), Counter()
+
+    @target.post("/{target_system}")
+    async def receive(target_system: str, request: Request):
+        requests[target_system] += 1
+        nth = requests[target_system]
+        in_flight[target_system] += 1
+        target.state.max_in_flight[target_system] = max(target.state.max_in_flight[target_system], in_flight[target_system])
+        try:
+            await asyncio.sleep((delays or {}).get(target_system, delay))
+            if target_system in failing or (target_system, nth) in fail_requests:
+                return Response(status_code=503)
+            received.append((target_system, json.loads(await request.body())))
+            return Response(status_code=204)
+        finally:
+            in_flight[target_system] -= 1
+
+    return target
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        settings.outbox_default_url = "http://targets/{target_system}"
+        self.now = START
+        self.received, self.failing = [], set()
+        self.target = stand_in(self.received, self.failing)
+        self.client = TestClient(app)
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Event"})
+        for offer, target_system in (("o1", "crm"), ("o2", "sms")):
+            self.client.post("/api/offers/", json={"id": offer, "code": offer.upper(), "name": "Offer", "target_system": target_system})
+            self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": offer})
+
+    def tearDown(self):
+        settings.outbox_default_url = None
+        settings.outbox_target_urls = {}
+        Base.metadata.drop_all(bind=engine)
+
+    def dispatcher(self, **options):
+        options.setdefault("default_url", "http://targets/{target_system}")
+        return OutboxDispatcher(
+            TestingSessionLocal, transport=httpx.ASGITransport(app=self.target), clock=lambda: self.now, **options,
+        )
+
+    def messages(self):
+        with TestingSessionLocal() as db:
+            return [(row.target_system, json.loads(row.payload)["type"]) for row in db.execute(select(OutboxMessage).order_by(OutboxMessage.id)).scalars()]
+
+    def test_writes_record_messages_in_their_transaction(self):
+        self.assertEqual(self.messages(), [
+            ("crm", "offer.upserted"), ("crm", "link.upserted"), ("sms", "offer.upserted"), ("sms", "link.upserted"),
+        ])
+        # Rejected writes leave nothing behind
+        self.assertEqual(self.client.post("/api/offers/", json={"id": "o3", "code": "O1", "name": "Dup"}).status_code, 400)
+        self.assertEqual(self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "missing"}).status_code, 404)
+        self.assertEqual(self.client.delete("/api/event-offers/e1/missing").status_code, 404)
+        self.assertEqual(len(self.messages()), 4)
+
+        self.client.put("/api/event-offers/e1/o1", json={"delay_minutes": 5})
+        self.client.delete("/api/event-offers/e1/o1")
+        self.client.delete("/api/events/e1")
+        self.client.delete("/api/offers/o2")
+        self.client.post("/api/offers/bulk", json=[{"id": "o4", "code": "O4", "name": "Bulk", "target_system": "crm"}])
+        with TestingSessionLocal() as db:
+            enqueue_actions(db, [ScheduledAction("occ", "o4", "e1", "disable", "crm", START)])
+            db.commit()
+        self.assertEqual(self.messages()[4:], [
+            ("crm", "link.upserted"), ("crm", "link.deleted"),
+            # e1 only has the sms offer left by then
+            ("sms", "event.deleted"), ("sms", "offer.deleted"),
+            ("crm", "offer.upserted"), ("crm", "offer.action"),
+        ])
+
+    def clear(self):
+        with TestingSessionLocal() as db:
+            db.execute(OutboxMessage.__table__.delete())
+            db.commit()
+
+    def write_everything(self):
+        self.client.put("/api/event-offers/e1/o1", json={"delay_minutes": 5})
+        self.client.put("/api/event-offers/e1/o2", json={"delay_minutes": 5})
+        self.client.post("/api/offers/bulk", json=[{"id": "o3", "code": "O3", "name": "Bulk", "target_system": "sms"}])
+        self.client.post("/api/event-offers/bulk", json=[{"event_id": "e1", "offer_id": "o3"}])
+        with TestingSessionLocal() as db:
+            enqueue_actions(db, [ScheduledAction("occ", offer, "e1", "disable", target, START) for offer, target in (("o1", "crm"), ("o2", "sms"))])
+            db.commit()
+        self.client.delete("/api/event-offers/e1/o2")
+        self.client.delete("/api/events/e1")
+        self.client.delete("/api/offers/o1")
+
+    def test_records_messages_only_for_targets_with_a_url(self):
+        # sms messages would never be sent, and so never deleted
+        self.clear()
+        settings.outbox_default_url, settings.outbox_target_urls = None, {"crm": "http://targets/crm"}
+        self.write_everything()
+        self.assertEqual(self.messages(), [
+            ("crm", "link.upserted"), ("crm", "offer.action"), ("crm", "event.deleted"), ("crm", "offer.deleted"),
+        ])
+
+    def test_records_nothing_without_any_url(self):
+        self.clear()
+        settings.outbox_default_url = None
+        self.write_everything()
+        self.assertEqual(self.messages(), [])
+
+    def test_coalesces_per_target_and_deletes_delivered(self):
+        for minutes in (1, 2, 3):
+            self.client.put("/api/event-offers/e1/o1", json={"delay_minutes": minutes})
+        dispatcher = self.dispatcher()
+        self.assertEqual(asyncio.run(dispatcher.dispatch_once()), 7)
+        batches = dict(self.received)
+        self.assertEqual(len(self.received), 2)
+        self.assertEqual([m["type"] for m in batches["crm"]["messages"]], ["offer.upserted", "link.upserted"])
+        # Only the last of the four link versions is sent, in the position of the newest
+        self.assertEqual(batches["crm"]["messages"][1]["delay_minutes"], 3)
+        self.assertEqual(self.messages(), [])
+
+        stats = dispatcher.stats()
+        self.assertEqual((stats["delivered"], stats["sent"], stats["coalesced"], stats["batches"]), (7, 4, 3, 2))
+        self.assertEqual(stats["targets"]["crm"]["delivered"], 5)
+        self.assertIsNotNone(stats["lag_seconds"])
+        self.assertEqual(asyncio.run(dispatcher.dispatch_once()), 0)
+
+    def test_failed_target_backs_off_without_blocking_others(self):
+        self.failing.add("crm")
+        dispatcher = self.dispatcher(backoff_seconds=10, max_backoff_seconds=60)
+        asyncio.run(dispatcher.dispatch_once())
+        self.assertEqual([target for target, _ in self.received], ["sms"])
+        self.assertEqual(dispatcher.pending()["pending_by_target"]["crm"]["pending"], 2)
+        with TestingSessionLocal() as db:
+            retry_at = {row.next_attempt_at.replace(tzinfo=timezone.utc) for row in db.execute(select(OutboxMessage)).scalars()}
+        self.assertEqual(len(retry_at), 1)
+        self.assertTrue(START + timedelta(seconds=5) <= retry_at.pop() <= START + timedelta(seconds=10))
+
+        # Newer crm messages wait with the failed ones so the target keeps its order
+        self.failing.clear()
+        self.client.put("/api/event-offers/e1/o1", json={"delay_minutes": 9})
+        self.assertEqual(asyncio.run(dispatcher.dispatch_once()), 0)
+        self.now += timedelta(seconds=10)
+        self.assertEqual(asyncio.run(dispatcher.dispatch_once()), 3)
+        crm = self.received[-1][1]["messages"]
+        self.assertEqual([(m["type"], m.get("delay_minutes")) for m in crm], [("offer.upserted", None), ("link.upserted", 9)])
+        self.assertEqual(dispatcher.stats()["failed_batches"], 1)
+        self.assertEqual(dispatcher.pending()["pending"], 0)
+
+    def add_crm_offers(self, count):
+        for i in range(count):
+            self.client.post("/api/offers/", json={"id": f"x{i}", "code": f"X{i}", "name": "Offer", "target_system": "crm"})
+
+    def test_sends_one_batch_at_a_time_per_target(self):
+        self.target = stand_in(self.received, self.failing, delay=0.01)
+        self.add_crm_offers(10)
+        dispatcher = self.dispatcher(batch_size=1)
+        asyncio.run(dispatcher.dispatch_once())
+        self.assertEqual(len(self.received), 14)
+        # The targets run side by side, each target's batches one after another
+        self.assertEqual(self.target.state.max_in_flight, {"crm": 1, "sms": 1})
+        crm = [batch["messages"][0]["offer_id"] for target, batch in self.received if target == "crm"]
+        self.assertEqual(crm, ["o1", "o1"] + [f"x{i}" for i in range(10)])
+
+    def test_limits_batches_in_flight_per_target(self):
+        self.target = stand_in(self.received, self.failing, delay=0.01)
+        self.add_crm_offers(10)
+        dispatcher = self.dispatcher(batch_size=1, concurrency=3)
+        asyncio.run(dispatcher.dispatch_once())
+        self.assertEqual(len(self.received), 14)
+        self.assertEqual(self.target.state.max_in_flight, {"crm": 3, "sms": 2})
+
+    def test_slow_target_does_not_hold_up_the_others(self):
+        self.target = stand_in(self.received, self.failing, delays={"crm": 30})
+        dispatcher = self.dispatcher(poll_seconds=0.01)
+
+        async def delivered(count):
+            for _ in range(300):
+                if len(self.received) >= count:
+                    return
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await dispatcher.start()
+            try:
+                await delivered(1)
+                # The sms loop keeps going while crm's first request hangs
+                await asyncio.to_thread(self.client.put, "/api/event-offers/e1/o2", json={"delay_minutes": 5})
+                await delivered(2)
+            finally:
+                await dispatcher.stop()
+
+        asyncio.run(run())
+        self.assertEqual([target for target, _ in self.received], ["sms", "sms"])
+        self.assertEqual(self.received[1][1]["messages"][0]["delay_minutes"], 5)
+        self.assertEqual(dispatcher.pending()["pending_by_target"]["crm"]["pending"], 2)
+
+    def test_failed_batch_holds_back_the_later_batches_of_its_target(self):
+        # The third crm batch fails; the ones after it would succeed
+        self.target = stand_in(self.received, self.failing, fail_requests={("crm", 3)})
+        self.add_crm_offers(3)
+        dispatcher = self.dispatcher(batch_size=1, backoff_seconds=10, max_backoff_seconds=60)
+        asyncio.run(dispatcher.dispatch_once())
+        crm = [batch["messages"][0] for target, batch in self.received if target == "crm"]
+        self.assertEqual([m["type"] for m in crm], ["offer.upserted", "link.upserted"])
+        self.assertEqual({target: counts["pending"] for target, counts in dispatcher.pending()["pending_by_target"].items()}, {"crm": 3})
+        self.assertEqual(dispatcher.stats()["failed_batches"], 1)
+
+        self.now += timedelta(seconds=10)
+        asyncio.run(dispatcher.dispatch_once())
+        crm = [batch["messages"][0].get("offer_id") for target, batch in self.received if target == "crm"]
+        self.assertEqual(crm, ["o1", "o1", "x0", "x1", "x2"])
+        self.assertEqual(dispatcher.pending()["pending"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from fastapi.testclient import TestClient
+from test_event_offer import Base, engine, app, sync_app, TestingSessionLocal
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+class TestResolutionIndex(unittest.TestCase):
+    app = app
+
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.client = TestClient(self.app)
+        self.client.post("/api/events/", json={"id": "e1", "code": "SIGNUP", "name": "Signup"})
+        self.client.post("/api/offers/", json={"id": "o1", "code": "WELCOME", "name": "Welcome", "priority": 2, "target_system": "crm"})
+        self.client.post("/api/offers/", json={"id": "o2", "code": "BONUS", "name": "Bonus", "priority": 1})
+        self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o1", "delay_minutes": 10})
+        self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o2", "action_type": "disable"})
+
+    def tearDown(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def actions(self, code="SIGNUP"):
+        response = self.client.get(f"/api/events/by-code/{code}/actions")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_actions_sorted_by_priority(self):
+        data = self.actions()
+        self.assertEqual(data["event_id"], "e1")
+        self.assertEqual([a["offer_code"] for a in data["actions"]], ["BONUS", "WELCOME"])
+        self.assertEqual(data["actions"][0]["action_type"], "disable")
+        self.assertEqual(data["actions"][1]["delay_minutes"], 10)
+        self.assertEqual(data["actions"][1]["target_system"], "crm")
+
+    def test_unknown_code(self):
+        self.assertEqual(self.client.get("/api/events/by-code/NOPE/actions").status_code, 404)
+
+    def test_writes_update_loaded_index(self):
+        self.actions()
+        self.assertTrue(resolution_index.loaded)
+
+        self.client.put("/api/offers/o1", json={"code": "WELCOME", "name": "Welcome", "priority": 0})
+        self.assertEqual([a["offer_code"] for a in self.actions()["actions"]], ["WELCOME", "BONUS"])
+
+        self.client.put("/api/events/e1", json={"code": "REGISTERED", "name": "Signup", "disable_all_campaigns": True})
+        self.assertEqual(self.client.get("/api/events/by-code/SIGNUP/actions").status_code, 404)
+        data = self.actions("REGISTERED")
+        self.assertTrue(data["disable_all_campaigns"])
+        self.assertEqual({a["action_type"] for a in data["actions"]}, {"disable"})
+
+        self.client.delete("/api/offers/o2")
+        self.assertEqual([a["offer_id"] for a in self.actions("REGISTERED")["actions"]], ["o1"])
+
+    def test_index_matches_fresh_load(self):
+        self.actions()
+        self.client.post("/api/offers/", json={"id": "o3", "code": "LATE", "name": "Late", "priority": 5})
+        self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": "o3", "delay_minutes": 60})
+        incremental = self.actions()
+
+        with TestingSessionLocal() as db:
+            resolution_index.load(db)
+        self.assertEqual(self.actions(), incremental)
+
+class TestSyncResolutionIndex(TestResolutionIndex):
+    app = sync_app
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import random
+import unittest
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from test_event_offer import Base, engine, app, TestingSessionLocal
+from models.occurrence import EventOccurrence, OccurrenceAction
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+from services.scheduler import ActionScheduler, ScheduledAction, TimingWheel, action_scheduler
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def timer(tick):
+    action = ScheduledAction("occ", "offer", "event", "enable", "crm", START)
+    action.tick = tick
+    return action
+
+class TestTimingWheel(unittest.TestCase):
+    def test_fires_each_timer_once_and_never_early(self):
+        rng = random.Random(7)
+        # A tiny wheel (4 slots x 3 levels = 64 ticks) so cascades and the overflow get exercised
+        wheel = TimingWheel(now=1000, slots=4, levels=3)
+        timers = [timer(1000 + rng.randrange(0, 300)) for _ in range(2000)]
+        for t in timers:
+            wheel.add(t)
+        self.assertEqual(len(wheel), 2000)
+        fired_at = {}
+        previous = now = 1000
+        while now < 1400:
+            previous, now = now, now + rng.choice([1, 1, 2, 5, 17])
+            for t in wheel.advance(now):
+                self.assertNotIn(id(t), fired_at)
+                # Due within this step: not before, and not held back from an earlier one
+                self.assertTrue(previous < t.tick <= now or t.tick <= 1000, (previous, t.tick, now))
+                fired_at[id(t)] = now
+        self.assertEqual(len(fired_at), 2000)
+        self.assertEqual(len(wheel), 0)
+
+    def test_cancel(self):
+        wheel = TimingWheel(now=0, slots=8, levels=2)
+        keep, drop = timer(5), timer(5)
+        wheel.add(keep)
+        wheel.add(drop)
+        wheel.cancel(drop)
+        wheel.cancel(drop)
+        self.assertEqual(len(wheel), 1)
+        self.assertEqual(wheel.advance(10), [keep])
+
+class TestActionScheduler(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        self.now = START
+        self.handled = []
+        self.scheduler = ActionScheduler(TestingSessionLocal, clock=lambda: self.now, handler=self.handle)
+        self.client = TestClient(app)
+        self.client.post("/api/events/", json={"id": "e1", "code": "E1", "name": "Event"})
+        for offer in ("o1", "o2"):
+            self.client.post("/api/offers/", json={"id": offer, "code": offer.upper(), "name": "Offer"})
+            self.client.post("/api/event-offers/", json={"event_id": "e1", "offer_id": offer})
+
+    def tearDown(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def handle(self, db, actions):
+        self.handled.append(sorted(a.offer_id for a in actions))
+
+    def add_pending(self, occurrence_id, delays):
+        rows = []
+        with TestingSessionLocal() as db:
+            db.add(EventOccurrence(id=occurrence_id, event_id="e1", event_code="E1", queue_name="default_queue",
+                                   occurred_at=START, processed_at=START))
+            for offer_id, minutes in delays.items():
+                due_at = START + timedelta(minutes=minutes)
+                db.add(OccurrenceAction(occurrence_id=occurrence_id, offer_id=offer_id, action_type="enable",
+                                        target_system="crm", due_at=due_at))
+                rows.append(ScheduledAction(occurrence_id, offer_id, "e1", "enable", "crm", due_at))
+            db.commit()
+        return rows
+
+    def statuses(self):
+        with TestingSessionLocal() as db:
+            return dict(db.execute(select(OccurrenceAction.offer_id, OccurrenceAction.status)).all())
+
+    def test_fires_in_batches_when_due(self):
+        self.scheduler.schedule(self.add_pending("occ1", {"o1": 5, "o2": 5}))
+        self.now = START + timedelta(minutes=4, seconds=59)
+        self.assertEqual(self.scheduler.fire_due(), [])
+        self.now = START + timedelta(minutes=5)
+        self.assertEqual(len(self.scheduler.fire_due()), 2)
+        self.assertEqual(self.handled, [["o1", "o2"]])
+        self.assertEqual(self.statuses(), {"o1": "fired", "o2": "fired"})
+        self.assertEqual(self.scheduler.stats()["pending"], 0)
+
+    def test_link_changes_cancel_pending_actions(self):
+        self.scheduler.schedule(self.add_pending("occ1", {"o1": 5, "o2": 10}))
+        self.scheduler.link_deleted("e1", "o1")
+        self.now = START + timedelta(minutes=10)
+        fired = self.scheduler.fire_due()
+        self.assertEqual([a.offer_id for a in fired], ["o2"])
+        self.assertEqual(self.statuses(), {"o1": "cancelled", "o2": "fired"})
+        self.assertEqual(self.scheduler.stats()["cancelled"], 1)
+
+    def test_event_and_offer_deletes_cancel_through_their_links(self):
+        due_at = START + timedelta(minutes=5)
+        self.scheduler.schedule(
+            ScheduledAction(f"occ-{event}", offer, event, "enable", "crm", due_at)
+            for event in ("e1", "e2", "e3") for offer in ("o1", "o2")
+        )
+        self.scheduler.event_deleted("e1")
+        self.scheduler.offer_deleted("o2")
+        self.assertEqual(self.scheduler.stats()["pending"], 2)
+        self.assertEqual(self.scheduler._by_event, {"e2": {"o1"}, "e3": {"o1"}})
+        self.assertEqual(self.scheduler._by_offer, {"o1": {"e2", "e3"}})
+        self.now = due_at
+        fired = self.scheduler.fire_due()
+        self.assertEqual(sorted((a.event_id, a.offer_id) for a in fired), [("e2", "o1"), ("e3", "o1")])
+        self.assertEqual((self.scheduler._by_link, self.scheduler._by_event, self.scheduler._by_offer), ({}, {}, {}))
+
+    def test_recovery_reloads_pending_and_skips_deleted_links(self):
+        self.add_pending("occ1", {"o1": 5, "o2": 10})
+        # The link went away without the scheduler hearing of it (e.g. while it was down)
+        self.client.delete("/api/event-offers/e1/o2")
+        with TestingSessionLocal() as db:
+            self.assertEqual(self.scheduler.recover(db), 1)
+        self.now = START + timedelta(hours=1)
+        self.assertEqual([a.offer_id for a in self.scheduler.fire_due()], ["o1"])
+
+    def test_crud_hooks_reach_the_scheduler(self):
+        pending = ScheduledAction("occ9", "o1", "e1", "enable", "crm", datetime.now(timezone.utc) + timedelta(days=1))
+        action_scheduler.schedule([pending])
+        before = action_scheduler.stats()["cancelled"]
+        self.client.put("/api/event-offers/e1/o1", json={"delay_minutes": 30})
+        self.assertEqual(action_scheduler.stats()["cancelled"], before + 1)
+        self.assertIsNone(pending.bucket)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import os
+import unittest
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from test_event_offer import Base, engine, app, sync_app, async_app
+from config import settings
+from schemas.event_offer import Event
+from serialization import dump_rows
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+class TestListSerialization(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        resolution_index.reset()
+        entity_cache.clear()
+        client = TestClient(async_app)
+        for i in range(5):
+            client.post("/api/events/", json={"id": f"e{i}", "code": f"E{i}", "name": f"Événement {i}", "description": None if i % 2 else "x"})
+            client.post("/api/offers/", json={"id": f"o{i}", "code": f"O{i}", "name": "Offer", "priority": i})
+
+    def tearDown(self):
+        settings.validate_list_responses = False
+        Base.metadata.drop_all(bind=engine)
+
+    def fetch(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content, response.headers.get("etag"), response.headers.get("x-next-cursor")
+
+    def test_fast_path_matches_validated_path(self):
+        for app in (sync_app, async_app):
+            client = TestClient(app)
+            for url in ("/api/events/?limit=3", "/api/offers/?limit=10", "/api/events/?cursor=" + client.get("/api/events/?limit=2").headers["x-next-cursor"]):
+                fast = self.fetch(client, url)
+                settings.validate_list_responses = True
+                validated = self.fetch(client, url)
+                settings.validate_list_responses = False
+                self.assertEqual(fast, validated, url)
+            self.assertEqual(client.get("/api/events/?limit=3").headers["content-type"], "application/json")
+
+    def test_aware_datetimes_match_pydantic(self):
+        row = {name: None for name in Event.model_fields}
+        row.update(id="e1", code="E1", name="Event", created_at=datetime(2026, 1, 1, 12, 30, 0, 5000, tzinfo=timezone.utc),
+                   updated_at=datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc))
+        self.assertEqual(json.loads(dump_rows([row])), [json.loads(Event(**row).model_dump_json())])
+
+    def test_openapi_schema_unchanged(self):
+        with open(os.path.join(os.path.dirname(__file__), "openapi.json")) as stored:
+            published = json.load(stored)
+        current = TestClient(app).get("/openapi.json").json()
+        # openapi.json is regenerated with every API change, so new routes and parameters show up here too
+        self.assertEqual(sorted(current["paths"]), sorted(published["paths"]))
+        for path, operations in published["paths"].items():
+            for method, operation in operations.items():
+                for part in ("parameters", "requestBody", "responses"):
+                    self.assertEqual(current["paths"][path][method].get(part), operation.get(part), f"{part} of {method} {path}")
+        for name, schema in published["components"]["schemas"].items():
+            self.assertEqual(current["components"]["schemas"][name], schema, name)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import threading
+import unittest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from crud import event_offer as crud
+from database import Base, RoutingSession, WRITER_POOL_OPTIONS, use_sqlite_profile
+from schemas.event_offer import EventCreate, EventUpdate
+from services.cache import entity_cache
+from services.resolution_index import resolution_index
+
+class TestProductionSQLiteProfile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(self.tmpdir.name, 'profile.db')}"
+        self.reader = create_engine(url, connect_args={"check_same_thread": False}, pool_size=8, max_overflow=-1)
+        self.writer = create_engine(url, connect_args={"check_same_thread": False}, **WRITER_POOL_OPTIONS)
+        use_sqlite_profile(self.reader)
+        use_sqlite_profile(self.writer, writer=True)
+        Base.metadata.create_all(self.writer)
+        self.Session = sessionmaker(bind=self.reader, autoflush=False, class_=RoutingSession, info={"writer": self.writer})
+        self.statements = {"reader": [], "writer": []}
+        for name, engine in (("reader", self.reader), ("writer", self.writer)):
+            event.listen(engine, "before_cursor_execute", self._recorder(name))
+        resolution_index.reset()
+        entity_cache.clear()
+
+    def tearDown(self):
+        self.reader.dispose()
+        self.writer.dispose()
+        self.tmpdir.cleanup()
+
+    def _recorder(self, name):
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements[name].append(statement.split()[0].upper())
+        return record
+
+    def test_pragmas_applied(self):
+        with self.reader.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)
+            self.assertEqual(conn.execute(text("PRAGMA temp_store")).scalar(), 2)
+            self.assertGreater(conn.execute(text("PRAGMA busy_timeout")).scalar(), 0)
+
+    def test_writes_use_writer(self):
+        with self.Session() as db:
+            crud.create_event(db, EventCreate(id="e1", code="E1", name="One"))
+            crud.update_event(db, "e1", EventUpdate(code="E1", name="Two"))
+            self.assertEqual(crud.get_event(db, "e1").name, "Two")
+            self.assertTrue(crud.delete_event(db, "e1"))
+        self.assertEqual(self.statements["writer"].count("BEGIN"), 3)
+        self.assertIn("INSERT", self.statements["writer"])
+        self.assertIn("UPDATE", self.statements["writer"])
+        self.assertIn("DELETE", self.statements["writer"])
+        self.assertNotIn("INSERT", self.statements["reader"])
+        self.assertNotIn("UPDATE", self.statements["reader"])
+        self.assertNotIn("DELETE", self.statements["reader"])
+
+    def test_concurrent_writers_do_not_lock(self):
+        with self.Session() as db:
+            crud.create_event(db, EventCreate(id="e1", code="E1", name="Start"))
+        errors = []
+
+        def work(n):
+            try:
+                for i in range(20):
+                    with self.Session() as db:
+                        crud.update_event(db, "e1", EventUpdate(code="E1", name=f"{n}-{i}"))
+                        crud.get_events(db)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.statements["writer"].count("UPDATE"), 160)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 import React, { useState } from 'react'
 import {
-  useGetEventsQuery,
-  useGetOffersQuery,
+  useGetEventOptionsQuery,
+  useGetOfferOptionsQuery,
   useCreateEventOfferLinkMutation,
 } from '../services/api'
 import type { EventOfferCreate } from '../services/api'
@@ -22,8 +22,8 @@ const toaster = createToaster({
 })
 
 const EventOfferLinks: React.FC = () => {
-  const { data: events } = useGetEventsQuery({})
-  const { data: offers } = useGetOffersQuery({})
+  const { data: events } = useGetEventOptionsQuery({})
+  const { data: offers } = useGetOfferOptionsQuery({})
   const [createLink] = useCreateEventOfferLinkMutation()
   
   const [newLink, setNewLink] = useState<Omit<EventOfferCreate, 'event_id' | 'offer_id'>>({
@@ -32,6 +32,22 @@ export interface EventUpdate {
   queue_name?: string | null
 }
 
+// Server-side list filters; q is a full-text search over name and description
+export interface EventFilters {
+  queue_name?: string
+  disable_all_campaigns?: boolean
+  min_lifetime_hours?: number
+  max_lifetime_hours?: number
+  q?: string
+}
+
+export interface OfferFilters {
+  target_system?: string
+  min_priority?: number
+  max_priority?: number
+  q?: string
+}
+
 export interface Offer {
   id: string
   code: string
@@ -60,6 +76,16 @@ export interface OfferUpdate {
   target_system?: string | null
 }
 
+// What the pickers need, read with ?fields= so descriptions stay on the server
+export type EventOption = Pick<Event, 'id' | 'code' | 'name'>
+export type OfferOption = Pick<Offer, 'id' | 'code' | 'name'>
+
+// Batch lookups: found entities in request order, unknown ids in missing
+export interface Batch<T> {
+  items: T[]
+  missing: string[]
+}
+
 export interface EventOfferCreate {
   event_id: string
   offer_id: string
@@ -72,6 +98,35 @@ export interface EventOfferUpdate {
   action_type?: string | null
 }
 
+export interface EventOfferLink {
+  event_id: string
+  offer_id: string
+  delay_minutes?: number | null
+  action_type?: string | null
+}
+
+// Links of one event, one offer and/or one action type
+export interface EventOfferFilters {
+  event_id?: string
+  offer_id?: string
+  action_type?: string
+}
+
+// Change feed: the latest change of each entity after a seq. Deleted entities carry only
+// their key in data. Keep last_seq and pass it back as since; a 410 means sync from 0.
+export interface Change {
+  seq: number
+  kind: 'event' | 'offer' | 'link'
+  op: 'upserted' | 'deleted'
+  data: Event | Offer | EventOfferLink | { id: string } | { event_id: string; offer_id: string }
+}
+
+export interface ChangePage {
+  changes: Change[]
+  last_seq: number
+  has_more: boolean
+}
+
 // Custom base query that adds the auth token to requests
 const baseQueryWithAuth = fetchBaseQuery({
   baseUrl: '/api',
@@ -105,11 +160,18 @@ const baseQueryWithAuth = fetchBaseQuery({
 
 export const api = createApi({
   baseQuery: baseQueryWithAuth,
-  tagTypes: ['Event', 'Offer'],
+  tagTypes: ['Event', 'Offer', 'EventOffer'],
   endpoints: (builder) => ({
     // Events endpoints
-    getEvents: builder.query<Event[], { skip?: number; limit?: number }>({
-      query: ({ skip = 0, limit = 100 }) => `events/?skip=${skip}&limit=${limit}`,
+    getEvents: builder.query<Event[], { skip?: number; limit?: number } & EventFilters>({
+      query: ({ skip = 0, limit = 100, ...filters }) => ({ url: 'events/', params: { skip, limit, ...filters } }),
+      providesTags: (_result) =>
+        _result
+          ? [..._result.map(({ id }) => ({ type: 'Event' as const, id })), 'Event']
+          : ['Event'],
+    }),
+    getEventOptions: builder.query<EventOption[], { skip?: number; limit?: number }>({
+      query: ({ skip = 0, limit = 100 }) => ({ url: 'events/', params: { skip, limit, fields: 'id,code,name' } }),
       providesTags: (_result) =>
         _result
           ? [..._result.map(({ id }) => ({ type: 'Event' as const, id })), 'Event']
@@ -119,6 +181,10 @@ export const api = createApi({
       query: (eventId) => `events/${eventId}`,
       providesTags: (_result, _error, id) => [{ type: 'Event', id }],
     }),
+    getEventsByIds: builder.query<Batch<Event>, string[]>({
+      query: (ids) => ({ url: 'events/batch', method: 'POST', body: { ids } }),
+      providesTags: (_result, _error, ids) => ids.map((id) => ({ type: 'Event' as const, id })),
+    }),
     createEvent: builder.mutation<Event, EventCreate>({
       query: (newEvent) => ({
         url: 'events/',
@@ -140,12 +206,20 @@ export const api = createApi({
         url: `events/${id}`,
         method: 'DELETE',
       }),
-      invalidatesTags: (_result, _error, id) => [{ type: 'Event', id }],
+      // Its links go with it
+      invalidatesTags: (_result, _error, id) => [{ type: 'Event', id }, 'EventOffer'],
     }),
 
     // Offers endpoints
-    getOffers: builder.query<Offer[], { skip?: number; limit?: number }>({
-      query: ({ skip = 0, limit = 100 }) => `offers/?skip=${skip}&limit=${limit}`,
+    getOffers: builder.query<Offer[], { skip?: number; limit?: number } & OfferFilters>({
+      query: ({ skip = 0, limit = 100, ...filters }) => ({ url: 'offers/', params: { skip, limit, ...filters } }),
+      providesTags: (_result) =>
+        _result
+          ? [..._result.map(({ id }) => ({ type: 'Offer' as const, id })), 'Offer']
+          : ['Offer'],
+    }),
+    getOfferOptions: builder.query<OfferOption[], { skip?: number; limit?: number }>({
+      query: ({ skip = 0, limit = 100 }) => ({ url: 'offers/', params: { skip, limit, fields: 'id,code,name' } }),
       providesTags: (_result) =>
         _result
           ? [..._result.map(({ id }) => ({ type: 'Offer' as const, id })), 'Offer']
@@ -155,6 +229,10 @@ export const api = createApi({
       query: (offerId) => `offers/${offerId}`,
       providesTags: (_result, _error, id) => [{ type: 'Offer', id }],
     }),
+    getOffersByIds: builder.query<Batch<Offer>, string[]>({
+      query: (ids) => ({ url: 'offers/batch', method: 'POST', body: { ids } }),
+      providesTags: (_result, _error, ids) => ids.map((id) => ({ type: 'Offer' as const, id })),
+    }),
     createOffer: builder.mutation<Offer, OfferCreate>({
       query: (newOffer) => ({
         url: 'offers/',
@@ -176,16 +254,24 @@ export const api = createApi({
         url: `offers/${id}`,
         method: 'DELETE',
       }),
-      invalidatesTags: (_result, _error, id) => [{ type: 'Offer', id }],
+      invalidatesTags: (_result, _error, id) => [{ type: 'Offer', id }, 'EventOffer'],
     }),
 
     // Event-Offer endpoints
+    getEventOfferLinks: builder.query<EventOfferLink[], { skip?: number; limit?: number } & EventOfferFilters>({
+      query: ({ skip = 0, limit = 100, ...filters }) => ({ url: 'event-offers/', params: { skip, limit, ...filters } }),
+      providesTags: (_result) =>
+        _result
+          ? [..._result.map(({ event_id, offer_id }) => ({ type: 'EventOffer' as const, id: `${event_id}/${offer_id}` })), 'EventOffer']
+          : ['EventOffer'],
+    }),
     createEventOfferLink: builder.mutation<EventOfferCreate, EventOfferCreate>({
       query: (link) => ({
         url: 'event-offers/',
         method: 'POST',
         body: link,
       }),
+      invalidatesTags: ['EventOffer'],
     }),
     updateEventOfferLink: builder.mutation<
       EventOfferUpdate,
@@ -196,6 +282,7 @@ export const api = createApi({
         method: 'PUT',
         body: data,
       }),
+      invalidatesTags: (_result, _error, { eventId, offerId }) => [{ type: 'EventOffer', id: `${eventId}/${offerId}` }],
     }),
     deleteEventOfferLink: builder.mutation<
       void,
@@ -205,22 +292,34 @@ export const api = createApi({
         url: `event-offers/${eventId}/${offerId}`,
         method: 'DELETE',
       }),
+      invalidatesTags: (_result, _error, { eventId, offerId }) => [{ type: 'EventOffer', id: `${eventId}/${offerId}` }],
+    }),
+
+    // Change feed
+    getChanges: builder.query<ChangePage, { since?: number; limit?: number }>({
+      query: ({ since = 0, limit }) => ({ url: 'changes', params: limit === undefined ? { since } : { since, limit } }),
     }),
   }),
 })
 
 export const {
   useGetEventsQuery,
+  useGetEventOptionsQuery,
   useGetEventQuery,
+  useGetEventsByIdsQuery,
   useCreateEventMutation,
   useUpdateEventMutation,
   useDeleteEventMutation,
   useGetOffersQuery,
+  useGetOfferOptionsQuery,
   useGetOfferQuery,
+  useGetOffersByIdsQuery,
   useCreateOfferMutation,
   useUpdateOfferMutation,
   useDeleteOfferMutation,
+  useGetEventOfferLinksQuery,
   useCreateEventOfferLinkMutation,
   useUpdateEventOfferLinkMutation,
   useDeleteEventOfferLinkMutation,
+  useGetChangesQuery,
 } = api
\ No newline at end of file